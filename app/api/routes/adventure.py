@@ -1,19 +1,72 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.models.adventure import AdventurePrompt, Adventure, SimilarAdventureRequest, SimilarAdventuresResponse
+import asyncio
+import orjson
+from typing import Any, AsyncIterator, Union
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from app.models.adventure import (
+    AdventurePrompt, Adventure, SimilarAdventureRequest, SimilarAdventuresResponse,
+    BatchGenerateRequest, BatchGenerateResponse, BatchGenerateItem, BatchGenerateError,
+    GenerationJobRequest, GenerationJob,
+    IndexAdventureRequest, IndexAdventureResponse,
+    SimilarAdventureBatchRequest, SimilarAdventuresBatchItem, SimilarAdventuresBatchResponse, SimilarityFilters
+)
+from app.core.responses import JSON_MEDIA_TYPE, json_bytes
 from app.services.adventure_generator import AdventureGenerator
+from app.services.facet_index import SearchFilters
+from app.services.job_queue import Job, JobQueue, create_job_queue
 from app.services.similarity_search import SimilaritySearch
-from app.core.exceptions import PromptProcessingError, OpenAIError, InvalidPromptError, AdventureNotFoundError
+from app.core.config import settings
+from app.core.exceptions import EmaAIException, PromptProcessingError, OpenAIError, InvalidPromptError, AdventureNotFoundError, IndexReadOnlyError
 from loguru import logger
 
 # Créer le router
 router = APIRouter(tags=["adventures"])
 
 # Dépendances pour injecter les services
-def get_adventure_generator():
-    return AdventureGenerator()
+# Les instances sont créées une seule fois au démarrage (voir lifespan dans main.py)
+# et partagées par toutes les requêtes du processus.
+async def resolve_adventure_generator(app: FastAPI) -> AdventureGenerator:
+    warmup = getattr(app.state, "warmup", None)
+    if warmup is not None and not warmup.done():
+        # Chargement en cours au démarrage : l'attendre plutôt que créer un second générateur
+        await asyncio.shield(warmup)
+    generator = getattr(app.state, "adventure_generator", None)
+    if generator is None:
+        # Démarrage sans lifespan (ex: TestClient hors contexte) : créer l'instance à la demande
+        generator = AdventureGenerator(
+            http_client=getattr(app.state, "http_client", None),
+            on_generated=resolve_similarity_search(app).add_adventure if settings.SIMILARITY_INDEX_WRITES else None
+        )
+        app.state.adventure_generator = generator
+    return generator
 
-def get_similarity_search():
-    return SimilaritySearch()
+def resolve_similarity_search(app: FastAPI) -> SimilaritySearch:
+    similarity_search = getattr(app.state, "similarity_search", None)
+    if similarity_search is None:
+        similarity_search = SimilaritySearch()
+        app.state.similarity_search = similarity_search
+    return similarity_search
+
+def resolve_job_queue(app: FastAPI) -> JobQueue:
+    job_queue = getattr(app.state, "job_queue", None)
+    if job_queue is None:
+        async def run(prompt: str) -> Adventure:
+            generator = await resolve_adventure_generator(app)
+            # Tâche de fond : attendre une place sous la limite de concurrence plutôt qu'échouer
+            return await generator.generate_adventure(prompt, slot_timeout=settings.LLM_SLOT_WAIT_SECONDS)
+        
+        job_queue = create_job_queue(run)
+        app.state.job_queue = job_queue
+    return job_queue
+
+async def get_adventure_generator(request: Request) -> AdventureGenerator:
+    return await resolve_adventure_generator(request.app)
+
+def get_similarity_search(request: Request) -> SimilaritySearch:
+    return resolve_similarity_search(request.app)
+
+def get_job_queue(request: Request) -> JobQueue:
+    return resolve_job_queue(request.app)
 
 @router.post("/generate", response_model=Adventure, summary="Générer une aventure à partir d'un prompt")
 async def generate_adventure(
@@ -24,6 +77,7 @@ async def generate_adventure(
     Génère une aventure personnalisée basée sur le prompt de l'utilisateur.
     
     - **prompt**: Le texte décrivant l'aventure souhaitée
+    - **max_tokens**: Plafond de tokens générés pour cette requête (optionnel)
     
     Retourne un objet Adventure contenant tous les détails de l'aventure générée.
     
@@ -32,8 +86,224 @@ async def generate_adventure(
     - 500 Internal Server Error: Si une erreur se produit lors du traitement
     - 503 Service Unavailable: Si l'API OpenAI est indisponible
     """
-    logger.info(f"Requête de génération d'aventure reçue: {prompt.prompt}")
-    return await generator.generate_adventure(prompt.prompt)
+    logger.debug("Requête de génération d'aventure reçue: {}", prompt.prompt)
+    # Aventure déjà validée par le service (ou JSON lu dans le cache) : renvoyée sans revalidation
+    payload = await generator.generate_adventure_json(prompt.prompt, prompt.max_tokens)
+    return Response(content=payload, media_type=JSON_MEDIA_TYPE)
+
+def _format_sse(event: str, data: Any) -> str:
+    """Formate un événement Server-Sent Events"""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+@router.post("/generate/stream", summary="Générer une aventure en streaming (Server-Sent Events)")
+async def stream_adventure(
+    request: Request,
+    prompt: AdventurePrompt,
+    generator: AdventureGenerator = Depends(get_adventure_generator)
+):
+    """
+    Génère une aventure et diffuse chaque champ dès qu'il est disponible.
+    
+    - **prompt**: Le texte décrivant l'aventure souhaitée
+    - **max_tokens**: Plafond de tokens générés pour cette requête (optionnel)
+    
+    Retourne un flux `text/event-stream` contenant :
+    - un événement `field` par champ terminé (`{"name": ..., "value": ...}`)
+    - un événement `adventure` final avec l'objet Adventure validé
+    - un événement `error` si la génération échoue en cours de route
+    
+    Peut lever les exceptions suivantes (avant l'ouverture du flux):
+    - 400 Bad Request: Si le prompt est invalide
+    """
+    logger.debug("Requête de génération d'aventure en streaming reçue: {}", prompt.prompt)
+    # Valider avant d'ouvrir le flux pour pouvoir encore répondre avec un code HTTP d'erreur
+    generator.validate_prompt(prompt.prompt)
+    
+    async def event_stream() -> AsyncIterator[str]:
+        try:
+            async for event, data in generator.stream_adventure(prompt.prompt, prompt.max_tokens):
+                if event == "adventure":
+                    data = data.model_dump()
+                yield _format_sse(event, data)
+        except EmaAIException as exc:
+            yield _format_sse("error", {
+                "error": True,
+                "code": exc.error_code,
+                "message": exc.detail,
+                "path": request.url.path
+            })
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _batch_item(index: int, result: Union[Adventure, EmaAIException]) -> BatchGenerateItem:
+    """Convertit le résultat d'un élément de lot en réponse"""
+    if isinstance(result, EmaAIException):
+        return BatchGenerateItem(
+            index=index,
+            error=BatchGenerateError(code=result.error_code, message=result.detail)
+        )
+    return BatchGenerateItem(index=index, adventure=result)
+
+@router.post("/generate/batch", response_model=BatchGenerateResponse, summary="Générer des aventures par lots")
+async def generate_adventures_batch(
+    batch: BatchGenerateRequest,
+    generator: AdventureGenerator = Depends(get_adventure_generator)
+):
+    """
+    Génère une aventure pour chaque prompt, avec une concurrence bornée.
+    
+    - **prompts**: La liste des textes décrivant les aventures souhaitées
+    - **concurrency**: Nombre maximal de générations simultanées (optionnel)
+    - **stream**: Si vrai, renvoie un flux NDJSON avec un résultat par ligne dès qu'il est prêt
+    
+    Chaque résultat contient son `index` dans la liste d'entrée et soit une `adventure`,
+    soit une `error` : l'échec d'un prompt n'interrompt pas les autres.
+    Sans streaming, les résultats sont renvoyés dans l'ordre des prompts.
+    """
+    logger.info("Requête de génération par lots reçue: {} prompts", len(batch.prompts))
+    
+    if batch.stream:
+        async def ndjson_stream() -> AsyncIterator[str]:
+            async for index, result in generator.iter_many(batch.prompts, batch.concurrency):
+                yield _batch_item(index, result).model_dump_json() + "\n"
+        
+        return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+    
+    results = await generator.generate_many(batch.prompts, batch.concurrency)
+    response = BatchGenerateResponse(
+        results=[_batch_item(index, result) for index, result in enumerate(results)]
+    )
+    return Response(content=json_bytes(response), media_type=JSON_MEDIA_TYPE)
+
+def _job_response(job: Job) -> GenerationJob:
+    """Convertit une tâche de génération en réponse"""
+    return GenerationJob(
+        id=job.id,
+        status=job.status,
+        priority=job.priority,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        adventure=Adventure.model_validate_json(job.result) if job.result is not None else None,
+        error=BatchGenerateError(code=job.error_code, message=job.error_message) if job.error_code else None
+    )
+
+@router.post("/generate/jobs", response_model=GenerationJob, status_code=202, summary="Créer une tâche de génération")
+async def create_generation_job(
+    job_request: GenerationJobRequest,
+    job_queue: JobQueue = Depends(get_job_queue)
+):
+    """
+    Met une génération en file et retourne immédiatement l'ID de la tâche.
+    
+    - **prompt**: Le texte décrivant l'aventure souhaitée
+    - **priority**: Priorité de 0 à 9 (optionnel, 0 par défaut)
+    
+    Le résultat se consulte ensuite avec `GET /generate/jobs/{job_id}`.
+    Répond 503 avec un en-tête Retry-After si trop de tâches sont déjà en attente.
+    """
+    AdventureGenerator.validate_prompt(job_request.prompt)
+    job = await job_queue.submit(job_request.prompt, job_request.priority)
+    logger.debug("Tâche de génération {} créée pour le prompt: {}", job.id, job_request.prompt)
+    return _job_response(job)
+
+@router.get("/generate/jobs/stats", summary="Statistiques de la file de génération")
+async def get_generation_job_stats(
+    job_queue: JobQueue = Depends(get_job_queue)
+):
+    """
+    Retourne la profondeur de la file de tâches et les tâches terminées depuis le démarrage.
+    """
+    return await job_queue.stats()
+
+@router.get("/generate/jobs/{job_id}", response_model=GenerationJob, summary="Consulter une tâche de génération")
+async def get_generation_job(
+    job_id: str,
+    wait: float = Query(
+        0,
+        ge=0,
+        le=settings.JOB_MAX_WAIT_SECONDS,
+        description="Secondes d'attente maximale de la fin de la tâche (long polling)"
+    ),
+    job_queue: JobQueue = Depends(get_job_queue)
+):
+    """
+    Retourne l'état d'une tâche de génération, avec l'aventure une fois la tâche réussie.
+    
+    - **wait**: Si positif, attend jusqu'à ce nombre de secondes que la tâche se termine
+    
+    Peut lever les exceptions suivantes:
+    - 404 Not Found: Si la tâche n'existe pas ou a expiré
+    """
+    job = await job_queue.wait(job_id, wait) if wait > 0 else await job_queue.get(job_id)
+    return _job_response(job)
+
+@router.get("/generate/cache/stats", summary="Statistiques du cache de génération")
+async def get_generation_cache_stats(
+    generator: AdventureGenerator = Depends(get_adventure_generator)
+):
+    """
+    Retourne les compteurs du cache sémantique (succès exacts, succès par similarité, échecs).
+    
+    Permet d'ajuster le seuil de similarité CACHE_SIMILARITY_THRESHOLD.
+    """
+    if generator.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **generator.cache.stats()}
+
+@router.get("/generate/tokens/stats", summary="Consommation de tokens de la génération")
+async def get_generation_token_stats(
+    generator: AdventureGenerator = Depends(get_adventure_generator)
+):
+    """
+    Retourne les tokens envoyés à OpenAI et reçus depuis le démarrage, au total et par requête.
+    """
+    return {"prompt_mode": generator.prompt_mode, **generator.token_usage.stats()}
+
+@router.get("/generate/models/stats", summary="Latences des modèles de génération")
+async def get_generation_model_stats(
+    generator: AdventureGenerator = Depends(get_adventure_generator)
+):
+    """
+    Retourne, pour chaque modèle du routage, le nombre d'appels, d'erreurs et les latences p50/p95 récentes.
+    """
+    if generator.router is None:
+        return {"enabled": False}
+    return {"enabled": True, "models": generator.router.stats()}
+
+@router.get("/generate/pool/stats", summary="État du pool d'aventures générées à l'avance")
+async def get_generation_pool_stats(
+    generator: AdventureGenerator = Depends(get_adventure_generator)
+):
+    """
+    Retourne le nombre d'aventures prêtes par catégorie et les aventures servies depuis le pool.
+    """
+    if generator.pool is None:
+        return {"enabled": False}
+    return {"enabled": True, **generator.pool.stats()}
+
+@router.get("/generate/resilience/stats", summary="Protection des appels à OpenAI")
+async def get_generation_resilience_stats(
+    generator: AdventureGenerator = Depends(get_adventure_generator)
+):
+    """
+    Retourne la limite de concurrence adaptative courante et l'état du disjoncteur des appels à OpenAI.
+    """
+    return generator.resilience_stats()
+
+def _search_filters(request: SimilarityFilters) -> SearchFilters:
+    """Filtres par facettes d'une requête de recherche de similarité"""
+    return SearchFilters(
+        difficulty=tuple(request.difficulty or ()),
+        tags=tuple(request.tags or ()),
+        min_duration=request.min_duration,
+        max_duration=request.max_duration,
+        min_distance=request.min_distance,
+        max_distance=request.max_distance
+    )
 
 @router.post("/search_similar", response_model=SimilarAdventuresResponse, summary="Trouver des aventures similaires")
 async def search_similar_adventures(
@@ -44,11 +314,130 @@ async def search_similar_adventures(
     Trouve des aventures similaires à une aventure donnée.
     
     - **adventure_id**: L'ID de l'aventure pour laquelle chercher des similaires
+    - **k**: Le nombre maximal d'aventures à retourner (optionnel)
+    - **near**: Le centre [latitude, longitude] de la recherche géographique (optionnel)
+    - **radius_km**: Le rayon de recherche en kilomètres (optionnel)
+    - **difficulty**: Les niveaux de difficulté acceptés (optionnel)
+    - **tags**: Les tags que les aventures doivent tous porter (optionnel)
+    - **min_duration** / **max_duration**: L'intervalle de durée en minutes (optionnel)
+    - **min_distance** / **max_distance**: L'intervalle de distance en kilomètres (optionnel)
+    
+    Retourne une liste d'aventures similaires avec leurs scores de similarité (cosinus),
+    par score décroissant. Avec `near` ou `radius_km`, seules les aventures du rayon sont
+    retournées, avec leur distance, et le score tient compte de la proximité.
+    
+    Peut lever les exceptions suivantes:
+    - 404 Not Found: Si l'aventure avec l'ID spécifié n'existe pas
+    """
+    logger.debug("Requête de recherche d'aventures similaires reçue pour ID: {}", request.adventure_id)
+    # Réponse déjà sérialisée (éventuellement lue dans le cache) : renvoyée sans revalidation
+    payload = await similarity_search.find_similar_adventures_json(
+        request.adventure_id,
+        request.k,
+        near=request.near,
+        radius_km=request.radius_km,
+        filters=_search_filters(request)
+    )
+    return Response(content=payload, media_type=JSON_MEDIA_TYPE)
+
+@router.get("/search_similar/cache/stats", summary="Statistiques du cache de recherche de similarité")
+async def get_similarity_cache_stats(
+    similarity_search: SimilaritySearch = Depends(get_similarity_search)
+):
+    """
+    Retourne les compteurs du cache des réponses de recherche de similarité (succès, échecs).
+    """
+    return similarity_search.cache_stats()
+
+@router.post(
+    "/search_similar/batch",
+    response_model=SimilarAdventuresBatchResponse,
+    summary="Trouver des aventures similaires pour plusieurs aventures"
+)
+async def search_similar_adventures_batch(
+    request: SimilarAdventureBatchRequest,
+    similarity_search: SimilaritySearch = Depends(get_similarity_search)
+):
+    """
+    Trouve des aventures similaires pour plusieurs aventures en un seul appel.
+    
+    - **adventure_ids**: Les IDs des aventures pour lesquelles chercher des similaires
+    - **k**: Le nombre maximal d'aventures à retourner par ID (optionnel)
+    - Les filtres par facettes de `/search_similar` (optionnels), communs à tous les IDs
+    
+    Retourne un résultat par ID, dans l'ordre de la requête. Un ID inexistant
+    produit une erreur pour cet élément seulement ; les IDs dupliqués ne sont
+    calculés qu'une fois.
+    """
+    logger.debug("Requête de recherche d'aventures similaires reçue pour {} IDs", len(request.adventure_ids))
+    results = await similarity_search.find_similar_adventures_batch(
+        request.adventure_ids,
+        request.k,
+        filters=_search_filters(request)
+    )
+    items = []
+    for adventure_id, result in zip(request.adventure_ids, results):
+        if isinstance(result, EmaAIException):
+            items.append(SimilarAdventuresBatchItem(
+                adventure_id=adventure_id,
+                error=BatchGenerateError(code=result.error_code, message=result.detail)
+            ))
+        else:
+            items.append(SimilarAdventuresBatchItem(
+                adventure_id=adventure_id,
+                similar_adventures=result.similar_adventures
+            ))
+    return Response(content=json_bytes(SimilarAdventuresBatchResponse(results=items)), media_type=JSON_MEDIA_TYPE)
+
+def require_index_writes() -> None:
+    """Refuse les mises à jour de l'index quand chaque worker en a sa propre copie"""
+    if not settings.SIMILARITY_INDEX_WRITES:
+        raise IndexReadOnlyError()
+
+@router.post(
+    "/adventures",
+    response_model=IndexAdventureResponse,
+    status_code=201,
+    summary="Indexer une aventure",
+    dependencies=[Depends(require_index_writes)]
+)
+async def index_adventure(
+    request: IndexAdventureRequest,
+    similarity_search: SimilaritySearch = Depends(get_similarity_search)
+):
+    """
+    Ajoute ou remplace une aventure dans l'index de similarité, sans reconstruction de l'index.
+    
+    - **id**: L'ID de l'aventure (optionnel, attribué automatiquement si absent)
+    - Les autres champs sont ceux d'une aventure
+    
+    L'aventure est recherchable dès la réponse, dans ce processus seulement : l'index
+    et les ID attribués sont propres à chaque worker.
     
-    Retourne une liste d'aventures similaires avec leurs scores de similarité.
+    Peut lever les exceptions suivantes:
+    - 409 Conflict: Si les mises à jour de l'index sont désactivées (SIMILARITY_INDEX_WRITES)
+    """
+    adventure_id = similarity_search.add_adventure(request, request.id)
+    logger.info("Aventure indexée pour la recherche de similarité: {}", adventure_id)
+    return IndexAdventureResponse(id=adventure_id)
+
+@router.delete(
+    "/adventures/{adventure_id}",
+    status_code=204,
+    summary="Retirer une aventure de l'index",
+    dependencies=[Depends(require_index_writes)]
+)
+async def remove_adventure(
+    adventure_id: int,
+    similarity_search: SimilaritySearch = Depends(get_similarity_search)
+):
+    """
+    Retire une aventure de l'index de similarité.
     
     Peut lever les exceptions suivantes:
     - 404 Not Found: Si l'aventure avec l'ID spécifié n'existe pas
+    - 409 Conflict: Si les mises à jour de l'index sont désactivées (SIMILARITY_INDEX_WRITES)
     """
-    logger.info(f"Requête de recherche d'aventures similaires reçue pour ID: {request.adventure_id}")
-    return await similarity_search.find_similar_adventures(request.adventure_id) 
\ No newline at end of file
+    similarity_search.remove_adventure(adventure_id)
+    logger.info("Aventure retirée de l'index de similarité: {}", adventure_id)
+    return Response(status_code=204)
@@ -0,0 +1,72 @@
+import time
+from typing import Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur autour d'un service amont
+
+    Après `failure_threshold` échecs consécutifs, le circuit s'ouvre : les appels
+    sont refusés sans attendre pendant `reset_timeout` secondes. Ensuite,
+    `half_open_max_calls` appels de test sont autorisés ; un succès referme le
+    circuit, un échec le rouvre.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.rejected = 0
+
+    def acquire(self) -> Optional[float]:
+        """
+        Demande l'autorisation d'appeler le service
+
+        Returns:
+            None si l'appel est autorisé, sinon le délai en secondes avant un nouvel essai
+        """
+        if self.state == OPEN:
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                return remaining
+            self.state = HALF_OPEN
+            self.half_open_calls = 0
+        if self.state == HALF_OPEN:
+            if self.half_open_calls >= self.half_open_max_calls:
+                self.rejected += 1
+                return self.reset_timeout
+            self.half_open_calls += 1
+        return None
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Rend une place d'appel de test quand l'appel a été annulé sans issue"""
+        if self.state == HALF_OPEN and self.half_open_calls > 0:
+            self.half_open_calls -= 1
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "rejected": self.rejected,
+            "retry_after": max(0.0, round(self.opened_at + self.reset_timeout - time.monotonic(), 1))
+            if self.state == OPEN else 0.0,
+        }
@@ -0,0 +1,101 @@
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class AIMDLimiter:
+    """
+    Limite de concurrence adaptative (AIMD : augmentation additive, diminution multiplicative)
+
+    Chaque appel réussi dans la latence cible augmente la limite d'environ 1 par
+    « fenêtre » d'appels ; un échec ou un appel trop lent la multiplie par
+    `backoff`. Au-delà de la limite, un appel est refusé immédiatement au lieu
+    d'attendre derrière un service amont saturé, sauf s'il accepte d'attendre
+    une place un temps borné (acquire avec un délai) : les places libérées
+    sont alors attribuées dans l'ordre d'arrivée.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float,
+        min_limit: float = 1,
+        max_limit: float = 100,
+        latency_target: float = 10.0,
+        backoff: float = 0.7,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def _has_room(self) -> bool:
+        return self.in_flight < int(self.limit) and not self._waiters
+
+    def try_acquire(self) -> bool:
+        """Réserve une place si la limite le permet ; retourne False sinon"""
+        if not self._has_room():
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    async def acquire(self, timeout: float = 0) -> bool:
+        """
+        Réserve une place, en attendant au plus `timeout` secondes qu'une se libère
+
+        Returns:
+            True si une place est réservée, False si le délai a expiré
+        """
+        if timeout <= 0 or self._has_room():
+            return self.try_acquire()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        except asyncio.CancelledError:
+            # Place attribuée juste avant l'annulation : la rendre à l'appel suivant
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        return True
+
+    def release(self, latency: Optional[float] = None, success: Optional[bool] = None) -> None:
+        """
+        Libère une place et ajuste la limite
+
+        Args:
+            latency: Durée de l'appel en secondes
+            success: Issue de l'appel (None si l'appel a été annulé : pas d'ajustement)
+        """
+        self.in_flight -= 1
+        if success is not None:
+            if success and latency is not None and latency <= self.latency_target:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            else:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+        # Attribuer les places libres aux appels en attente, dans l'ordre d'arrivée
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "rejected": self.rejected,
+            "latency_target": self.latency_target,
+        }
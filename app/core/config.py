@@ -12,10 +12,30 @@ class Settings:
     PROJECT_DESCRIPTION: str = os.getenv("PROJECT_DESCRIPTION", "AI service for generating adventure recommendations")
     VERSION: str = os.getenv("VERSION", "0.1.0")
     
+    # Environnement : development (rechargement, un seul processus) ou production (plusieurs workers)
+    ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
+    _production = ENVIRONMENT == "production"
+    
     # Paramètres de l'API
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
+    RELOAD: bool = os.getenv("RELOAD", "false" if _production else "true").lower() == "true"
+    
+    # Serveur de production (gunicorn + workers uvicorn, voir gunicorn.conf.py)
+    WORKERS: int = int(os.getenv("WORKERS", "0"))  # 0 = un worker par cœur
+    SERVER_LOOP: str = os.getenv("SERVER_LOOP", "auto")  # auto (uvloop si installé), uvloop ou asyncio
+    SERVER_HTTP: str = os.getenv("SERVER_HTTP", "auto")  # auto (httptools si installé), httptools ou h11
+    SERVER_PRELOAD: bool = os.getenv("SERVER_PRELOAD", "true" if _production else "false").lower() == "true"
+    SERVER_GRACEFUL_TIMEOUT: float = float(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))  # délai de fin des requêtes en cours
+    SERVER_KEEPALIVE: int = int(os.getenv("SERVER_KEEPALIVE", "5"))
+    SERVER_MAX_REQUESTS: int = int(os.getenv("SERVER_MAX_REQUESTS", "0"))  # recyclage des workers (0 = jamais)
+    # Charger le générateur (LangChain, openai) en tâche de fond au démarrage ; sinon à la première requête
+    WARMUP_ON_STARTUP: bool = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "info")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")  # text ou json (une ligne JSON par message)
+    LOG_ENQUEUE: bool = os.getenv("LOG_ENQUEUE", "true").lower() == "true"  # écriture dans un thread dédié
+    LOG_QUEUE_MAX_SIZE: int = int(os.getenv("LOG_QUEUE_MAX_SIZE", "10000"))  # messages en attente d'écriture, au-delà perdus
+    LOG_ACCESS_SAMPLE_RATE: float = float(os.getenv("LOG_ACCESS_SAMPLE_RATE", "1.0"))  # part des logs d'accès gardés
     
     # Parse ALLOWED_ORIGINS from env var
     _origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://localhost:8000")
@@ -24,6 +44,118 @@ class Settings:
     # Paramètres OpenAI
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4")
+    OPENAI_API_BASE: str = os.getenv("OPENAI_API_BASE", "")  # vide = API OpenAI ; sinon serveur compatible (ex: faux serveur de test de charge)
+    # Format de réponse JSON natif (modèles compatibles : gpt-4-turbo, gpt-3.5-turbo-1106...)
+    OPENAI_JSON_MODE: bool = os.getenv("OPENAI_JSON_MODE", "false").lower() == "true"
+    OPENAI_PROMPT_MODE: str = os.getenv("OPENAI_PROMPT_MODE", "full")  # full ou compact (schéma minimal)
+    OPENAI_MAX_TOKENS: int = int(os.getenv("OPENAI_MAX_TOKENS", "0"))  # plafond de tokens générés (0 = aucun)
+    OPENAI_MAX_TOKENS_LIMIT: int = int(os.getenv("OPENAI_MAX_TOKENS_LIMIT", "4096"))  # plafond maximal accepté par requête
+    
+    # Routage entre plusieurs modèles, du plus rapide au plus capable (vide = OPENAI_MODEL seul)
+    _model_tiers = os.getenv("OPENAI_MODEL_TIERS", "")
+    OPENAI_MODEL_TIERS: List[str] = [model.strip() for model in _model_tiers.split(",") if model.strip()]
+    ROUTER_COMPLEXITY_THRESHOLD: float = float(os.getenv("ROUTER_COMPLEXITY_THRESHOLD", "0.5"))
+    ROUTER_LATENCY_BUDGET_SECONDS: float = float(os.getenv("ROUTER_LATENCY_BUDGET_SECONDS", "10"))
+    ROUTER_HEDGE_DELAY_SECONDS: float = float(os.getenv("ROUTER_HEDGE_DELAY_SECONDS", "0"))  # 0 = p95 du modèle
+    ROUTER_LATENCY_WINDOW: int = int(os.getenv("ROUTER_LATENCY_WINDOW", "200"))
+    
+    # Limite de concurrence adaptative (AIMD) et disjoncteur autour des appels au LLM
+    LLM_CONCURRENCY_INITIAL: int = int(os.getenv("LLM_CONCURRENCY_INITIAL", "16"))
+    LLM_CONCURRENCY_MIN: int = int(os.getenv("LLM_CONCURRENCY_MIN", "1"))
+    LLM_CONCURRENCY_MAX: int = int(os.getenv("LLM_CONCURRENCY_MAX", "64"))
+    LLM_LATENCY_TARGET_SECONDS: float = float(os.getenv("LLM_LATENCY_TARGET_SECONDS", "15"))  # au-delà : congestion
+    LLM_CONCURRENCY_BACKOFF: float = float(os.getenv("LLM_CONCURRENCY_BACKOFF", "0.7"))
+    LLM_OVERLOAD_RETRY_AFTER_SECONDS: int = int(os.getenv("LLM_OVERLOAD_RETRY_AFTER_SECONDS", "1"))
+    LLM_SLOT_WAIT_SECONDS: float = float(os.getenv("LLM_SLOT_WAIT_SECONDS", "30"))  # lots et tâches : attente d'une place
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_TIMEOUT_SECONDS: float = float(os.getenv("CIRCUIT_RESET_TIMEOUT_SECONDS", "30"))
+    CIRCUIT_HALF_OPEN_MAX_CALLS: int = int(os.getenv("CIRCUIT_HALF_OPEN_MAX_CALLS", "1"))
+    
+    # Quotas par client (clé d'API ou adresse IP), en seaux à jetons ; 0 requête/min = pas de limite
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_GENERATE_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_GENERATE_PER_MINUTE", "60"))
+    RATE_LIMIT_GENERATE_BURST: float = float(os.getenv("RATE_LIMIT_GENERATE_BURST", "20"))
+    RATE_LIMIT_BATCH_PROMPTS_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_BATCH_PROMPTS_PER_MINUTE", "600"))  # compté en prompts
+    RATE_LIMIT_BATCH_PROMPTS_BURST: float = float(os.getenv("RATE_LIMIT_BATCH_PROMPTS_BURST", "1000"))
+    RATE_LIMIT_SEARCH_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_SEARCH_PER_MINUTE", "1200"))
+    RATE_LIMIT_SEARCH_BURST: float = float(os.getenv("RATE_LIMIT_SEARCH_BURST", "200"))
+    # memory (un quota par worker) ou sqlite (partagé) ; sqlite par défaut avec plusieurs workers en production
+    RATE_LIMIT_STORE: str = os.getenv("RATE_LIMIT_STORE", "sqlite" if _production and WORKERS != 1 else "memory")
+    RATE_LIMIT_STORE_PATH: str = os.getenv("RATE_LIMIT_STORE_PATH", "rate_limits.sqlite3")
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    
+    # Métriques Prometheus (/metrics et mesure des requêtes)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    
+    # Paramètres du client HTTP partagé (pool de connexions keep-alive)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "50"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "60"))
+    
+    # Paramètres du cache des aventures générées
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")  # memory ou disk
+    CACHE_PATH: str = os.getenv("CACHE_PATH", "adventure_cache.sqlite3")
+    CACHE_MAX_SIZE: int = int(os.getenv("CACHE_MAX_SIZE", "1024"))
+    CACHE_TTL_SECONDS: float = float(os.getenv("CACHE_TTL_SECONDS", "86400"))
+    CACHE_SIMILARITY_THRESHOLD: float = float(os.getenv("CACHE_SIMILARITY_THRESHOLD", "0.9"))
+    
+    # Nombre maximal de requêtes en attente d'une même génération en cours
+    SINGLE_FLIGHT_MAX_WAITERS: int = int(os.getenv("SINGLE_FLIGHT_MAX_WAITERS", "1000"))
+    
+    # Génération par lots
+    BATCH_MAX_PROMPTS: int = int(os.getenv("BATCH_MAX_PROMPTS", "1000"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+    
+    # Pool d'aventures générées à l'avance pour les demandes génériques (consomme du quota OpenAI en tâche de fond)
+    POOL_ENABLED: bool = os.getenv("POOL_ENABLED", "false").lower() == "true"
+    POOL_CATEGORIES_PATH: str = os.getenv("POOL_CATEGORIES_PATH", "")  # vide = thèmes du catalogue de démonstration
+    POOL_SIZE: int = int(os.getenv("POOL_SIZE", "5"))  # aventures prêtes par catégorie et par worker
+    POOL_MATCH_THRESHOLD: float = float(os.getenv("POOL_MATCH_THRESHOLD", "0.6"))
+    POOL_REFILL_INTERVAL_SECONDS: float = float(os.getenv("POOL_REFILL_INTERVAL_SECONDS", "60"))
+    POOL_REFILL_HOURS: str = os.getenv("POOL_REFILL_HOURS", "")  # heures creuses, ex: "22-6" (vide = toute la journée)
+    POOL_REFILL_MAX_IN_FLIGHT: int = int(os.getenv("POOL_REFILL_MAX_IN_FLIGHT", "0"))  # appels OpenAI en cours tolérés
+    
+    # Génération asynchrone par tâches (POST /generate/jobs puis consultation du résultat)
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_MAX_PENDING: int = int(os.getenv("JOB_MAX_PENDING", "1000"))  # au-delà, 503 avec Retry-After (tous workers avec sqlite)
+    JOB_STORE: str = os.getenv("JOB_STORE", "memory")  # memory ou sqlite
+    JOB_STORE_PATH: str = os.getenv("JOB_STORE_PATH", "generation_jobs.sqlite3")
+    JOB_TTL_SECONDS: float = float(os.getenv("JOB_TTL_SECONDS", "3600"))  # conservation des tâches terminées
+    JOB_MAX_WAIT_SECONDS: float = float(os.getenv("JOB_MAX_WAIT_SECONDS", "30"))  # attente maximale en long polling
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))  # essais d'une tâche refusée temporairement
+    JOB_RETRY_BACKOFF_SECONDS: float = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "2"))  # attente minimale, doublée à chaque essai
+    JOB_RUNNING_TIMEOUT_SECONDS: float = float(os.getenv("JOB_RUNNING_TIMEOUT_SECONDS", "600"))  # au-delà, tâche en cours reprise
+    JOB_MAINTENANCE_INTERVAL_SECONDS: float = float(os.getenv("JOB_MAINTENANCE_INTERVAL_SECONDS", "60"))  # purge et reprise
+    
+    # Quota de tokens OpenAI par minute (0 = pas de régulation)
+    OPENAI_TOKENS_PER_MINUTE: int = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "0"))
+    OPENAI_EXPECTED_COMPLETION_TOKENS: int = int(os.getenv("OPENAI_EXPECTED_COMPLETION_TOKENS", "400"))
+    
+    # Paramètres de la recherche de similarité
+    SIMILARITY_CATALOG_PATH: str = os.getenv("SIMILARITY_CATALOG_PATH", "")  # vide = catalogue de démonstration
+    SIMILARITY_INDEX_PATH: str = os.getenv("SIMILARITY_INDEX_PATH", "")  # index précalculé (prioritaire sur le catalogue)
+    SIMILARITY_EMBEDDING_DIM: int = int(os.getenv("SIMILARITY_EMBEDDING_DIM", "256"))
+    SIMILARITY_DEFAULT_K: int = int(os.getenv("SIMILARITY_DEFAULT_K", "5"))
+    SIMILARITY_MAX_K: int = int(os.getenv("SIMILARITY_MAX_K", "100"))
+    SIMILARITY_MIN_SCORE: float = float(os.getenv("SIMILARITY_MIN_SCORE", "0.0"))
+    SIMILARITY_INDEX_MODE: str = os.getenv("SIMILARITY_INDEX_MODE", "auto")  # auto, flat ou ivf
+    SIMILARITY_IVF_MIN_SIZE: int = int(os.getenv("SIMILARITY_IVF_MIN_SIZE", "50000"))
+    SIMILARITY_IVF_NPROBE: int = int(os.getenv("SIMILARITY_IVF_NPROBE", "8"))
+    # L'index et ses ID sont propres à chaque worker : écritures refusées par défaut avec plusieurs workers
+    SIMILARITY_INDEX_WRITES: bool = os.getenv(
+        "SIMILARITY_INDEX_WRITES", "false" if _production and WORKERS != 1 else "true"
+    ).lower() == "true"
+    SIMILARITY_DELTA_MAX_SIZE: int = int(os.getenv("SIMILARITY_DELTA_MAX_SIZE", "1000"))  # seuil de compaction
+    SIMILARITY_BATCH_MAX_IDS: int = int(os.getenv("SIMILARITY_BATCH_MAX_IDS", "100"))
+    SIMILARITY_NEIGHBORS_K: int = int(os.getenv("SIMILARITY_NEIGHBORS_K", "0"))  # voisins précalculés par aventure (0 = aucun)
+    SIMILARITY_RESPONSE_CACHE_SIZE: int = int(os.getenv("SIMILARITY_RESPONSE_CACHE_SIZE", "1024"))  # 0 = pas de cache
+    SIMILARITY_GEO_WEIGHT: float = float(os.getenv("SIMILARITY_GEO_WEIGHT", "0.3"))  # poids de la proximité dans le score
+    SIMILARITY_GEO_DEFAULT_RADIUS_KM: float = float(os.getenv("SIMILARITY_GEO_DEFAULT_RADIUS_KM", "50"))
+    SIMILARITY_GEO_CELL_DEGREES: float = float(os.getenv("SIMILARITY_GEO_CELL_DEGREES", "0.5"))  # taille des cellules de la grille
 
 # Instance des paramètres à utiliser dans l'application
 settings = Settings() 
\ No newline at end of file
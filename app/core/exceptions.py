@@ -1,6 +1,7 @@
 from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
 from loguru import logger
+from app.core.metrics import ERRORS
 from typing import Dict, Any, Optional
 
 class EmaAIException(HTTPException):
@@ -26,12 +27,14 @@ class PromptProcessingError(EmaAIException):
 
 class OpenAIError(EmaAIException):
     """Exception raised when there's an error with OpenAI API"""
-    def __init__(self, detail: str):
+    def __init__(self, detail: str, retry_after: Optional[int] = None):
         super().__init__(
             status_code=503,
             detail=detail,
-            error_code="OPENAI_API_ERROR"
+            error_code="OPENAI_API_ERROR",
+            headers={"Retry-After": str(retry_after)} if retry_after is not None else None
         )
+        self.retry_after = retry_after
 
 class InvalidPromptError(EmaAIException):
     """Exception raised when the prompt is invalid"""
@@ -51,12 +54,54 @@ class AdventureNotFoundError(EmaAIException):
             error_code="ADVENTURE_NOT_FOUND"
         )
 
+class IndexReadOnlyError(EmaAIException):
+    """Exception raised when the similarity index cannot be updated (one index per worker process)"""
+    def __init__(self):
+        super().__init__(
+            status_code=409,
+            detail="The similarity index is read-only: each worker keeps its own copy, so updates are disabled "
+                   "with several workers (see SIMILARITY_INDEX_WRITES)",
+            error_code="INDEX_READ_ONLY"
+        )
+
+class JobNotFoundError(EmaAIException):
+    """Exception raised when a generation job is not found (unknown or expired)"""
+    def __init__(self, job_id: str):
+        super().__init__(
+            status_code=404,
+            detail=f"Generation job {job_id} not found",
+            error_code="JOB_NOT_FOUND"
+        )
+
+class RateLimitExceededError(EmaAIException):
+    """Exception raised when a client exceeds its request quota"""
+    def __init__(self, quota: str, retry_after: int = 1, detail: Optional[str] = None):
+        super().__init__(
+            status_code=429,
+            detail=detail or f"Rate limit exceeded for {quota} requests, retry in {retry_after}s",
+            error_code="RATE_LIMITED",
+            headers={"Retry-After": str(retry_after)}
+        )
+        self.retry_after = retry_after
+
+class ServiceOverloadedError(EmaAIException):
+    """Exception raised when the service refuses extra load and asks the client to retry later"""
+    def __init__(self, detail: str, retry_after: int = 1):
+        super().__init__(
+            status_code=503,
+            detail=detail,
+            error_code="SERVICE_OVERLOADED",
+            headers={"Retry-After": str(retry_after)}
+        )
+        self.retry_after = retry_after
+
 async def ema_exception_handler(request: Request, exc: EmaAIException) -> JSONResponse:
     """
     Custom exception handler for EMA-AI exceptions
     Returns a consistent JSON response for all exceptions
     """
-    logger.error(f"EMA-AI Exception: {exc.error_code} - {exc.detail}")
+    logger.error("EMA-AI Exception: {} - {}", exc.error_code, exc.detail)
+    ERRORS.inc(code=exc.error_code)
     
     return JSONResponse(
         status_code=exc.status_code,
@@ -65,5 +110,6 @@ async def ema_exception_handler(request: Request, exc: EmaAIException) -> JSONRe
             "code": exc.error_code,
             "message": exc.detail,
             "path": request.url.path
-        }
+        },
+        headers=exc.headers
     ) 
\ No newline at end of file
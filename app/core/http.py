@@ -0,0 +1,99 @@
+import asyncio
+from typing import Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Transport httpx qui borne le nombre de requêtes simultanées par hôte
+
+    httpx ne propose qu'une limite globale sur le pool de connexions : ce
+    transport ajoute un sémaphore par hôte au-dessus du transport standard.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int):
+        self._transport = transport
+        self._max_per_host = max_per_host
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore_for(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._max_per_host)
+            self._semaphores[host] = semaphore
+        return semaphore
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        semaphore = self._semaphore_for(request.url.host)
+        await semaphore.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        if response.is_closed:
+            # Corps déjà chargé en mémoire par le transport : rien à attendre
+            semaphore.release()
+        else:
+            # Libérer le slot une fois le corps de la réponse entièrement consommé
+            response.stream = _ReleasingStream(response.stream, semaphore)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Flux de réponse qui libère le sémaphore de l'hôte à la fermeture"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, semaphore: asyncio.Semaphore):
+        self._stream = stream
+        self._semaphore = semaphore
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._semaphore.release()
+
+
+def create_http_client(
+    max_connections: Optional[int] = None,
+    max_keepalive_connections: Optional[int] = None,
+    max_connections_per_host: Optional[int] = None,
+) -> httpx.AsyncClient:
+    """
+    Crée le client HTTP asynchrone partagé par les services
+
+    Le client conserve un pool de connexions keep-alive réutilisé entre les
+    requêtes, ce qui évite un handshake TLS vers OpenAI à chaque génération.
+
+    Args:
+        max_connections: Nombre maximal de connexions ouvertes dans le pool
+        max_keepalive_connections: Nombre de connexions inactives conservées
+        max_connections_per_host: Nombre maximal de requêtes simultanées par hôte
+
+    Returns:
+        Un client httpx.AsyncClient à fermer avec aclose() à l'arrêt
+    """
+    limits = httpx.Limits(
+        max_connections=max_connections or settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=max_keepalive_connections or settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+    transport = HostLimitedTransport(
+        httpx.AsyncHTTPTransport(limits=limits),
+        max_per_host=max_connections_per_host or settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+    )
+    return httpx.AsyncClient(transport=transport, timeout=settings.HTTP_TIMEOUT)
@@ -1,8 +1,15 @@
 import sys
+import json
+import queue
+import random
+import asyncio
 import logging
+import threading
+import traceback
 from loguru import logger
 from app.core.config import settings
 
+
 # Configuration de loguru
 class InterceptHandler(logging.Handler):
     def emit(self, record):
@@ -10,25 +17,139 @@ class InterceptHandler(logging.Handler):
         logger_opt = logger.opt(depth=6, exception=record.exc_info)
         logger_opt.log(record.levelname, record.getMessage())
 
+class AccessLogSampler(logging.Filter):
+    """Ne garde qu'une part des logs d'accès de uvicorn (un par requête)"""
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return self.rate >= 1.0 or random.random() < self.rate
+
+class BackgroundWriter:
+    """
+    Sink loguru qui écrit dans un thread dédié
+
+    L'appelant ne fait que déposer le message formaté dans une file : l'écriture
+    et le flush, qui peuvent bloquer si stdout est lent (pipe, collecteur), se
+    font dans le thread, par lots. Plus léger que `enqueue=True` de loguru, qui
+    passe par une file multiprocessing (sérialisation et pipe à chaque message).
+
+    La file est bornée : si la sortie ne suit plus, les nouveaux messages sont
+    perdus et comptés plutôt que de faire grossir la mémoire sans limite. Leur
+    nombre est écrit dans la sortie dès qu'elle redevient disponible.
+    """
+    def __init__(self, stream, max_size: int = 10000):
+        self._stream = stream
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_size)
+        self.dropped = 0
+        self._reported = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, message: str) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            # Regrouper tout ce qui est déjà en file en une seule écriture
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = [item for item in items if isinstance(item, str)]
+            dropped = self.dropped
+            if dropped > self._reported:
+                lines.append(f"{dropped - self._reported} messages de log perdus (file d'écriture pleine)\n")
+                self._reported = dropped
+            if lines:
+                self._stream.write("".join(lines))
+                self._stream.flush()
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is None:
+                    return
+
+    def _drain(self) -> threading.Event:
+        drained = threading.Event()
+        # Les messages de contrôle attendent une place : ils ne sont jamais perdus
+        self._queue.put(drained)
+        return drained
+
+    async def complete(self) -> None:
+        """Attend que les messages déjà en file soient écrits (appelé par logger.complete())"""
+        # Dépôt et attente hors de la boucle d'événements : la file peut être pleine
+        await asyncio.get_running_loop().run_in_executor(None, lambda: self._drain().wait())
+
+    def stop(self) -> None:
+        """Écrit les messages restants et arrête le thread (appelé par logger.remove())"""
+        try:
+            self._queue.put(None, timeout=5)
+        except queue.Full:
+            # Sortie bloquée : ne pas retenir l'arrêt du processus (thread démon)
+            return
+        self._thread.join(timeout=5)
+
+def _text_format(record) -> str:
+    """
+    Format texte "date | niveau | message"
+
+    Équivaut à "{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}", sans le
+    formatage de date propre à loguru qui représente la moitié du coût d'un message.
+    """
+    record["extra"]["_line"] = f"{record['time']:%Y-%m-%d %H:%M:%S} | {record['level'].name} | {record['message']}"
+    return "{extra[_line]}\n{exception}"
+
+def _json_format(record) -> str:
+    """Sérialise un message en une ligne JSON (champs fixes et contexte lié avec logger.bind)"""
+    payload = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        **{key: value for key, value in record["extra"].items() if not key.startswith("_")},
+    }
+    if record["exception"] is not None:
+        payload["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    record["extra"]["_json"] = json.dumps(payload, ensure_ascii=False, default=str)
+    return "{extra[_json]}\n"
+
 # Configurer le logger
 def setup_logging():
     # Supprimer les handlers par défaut
     logger.remove()
-    
-    # Ajouter un handler pour la sortie standard
+
+    # Ajouter un handler pour la sortie standard. Avec LOG_ENQUEUE, l'écriture se fait
+    # dans un thread dédié : un stdout lent ne bloque pas la boucle d'événements
     logger.add(
-        sys.stdout,
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
+        BackgroundWriter(sys.stdout, settings.LOG_QUEUE_MAX_SIZE) if settings.LOG_ENQUEUE else sys.stdout,
+        format=_json_format if settings.LOG_FORMAT == "json" else _text_format,
         level=settings.LOG_LEVEL.upper(),
-        serialize=False,
+        backtrace=False,
+        diagnose=False,
     )
-    
-    # Intercepter les logs de uvicorn et fastapi
-    logging.basicConfig(handlers=[InterceptHandler()], level=0)
-    
+
+    # Intercepter les logs de uvicorn et fastapi, en écartant dès la bibliothèque
+    # standard les messages sous le niveau configuré
+    logging.basicConfig(handlers=[InterceptHandler()], level=settings.LOG_LEVEL.upper(), force=True)
+
     # Configurer les loggers spécifiques
     for _log in ["uvicorn", "uvicorn.access", "fastapi"]:
         _logger = logging.getLogger(_log)
         _logger.handlers = [InterceptHandler()]
-        
-    return logger 
\ No newline at end of file
+        _logger.propagate = False
+
+    # Échantillonner les logs d'accès (LOG_ACCESS_SAMPLE_RATE=0 les désactive)
+    access_logger = logging.getLogger("uvicorn.access")
+    access_logger.filters = [AccessLogSampler(settings.LOG_ACCESS_SAMPLE_RATE)]
+    access_logger.disabled = settings.LOG_ACCESS_SAMPLE_RATE <= 0
+
+    return logger
@@ -0,0 +1,310 @@
+import asyncio
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+import orjson
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.exceptions import RateLimitExceededError, ema_exception_handler
+from app.core.token_bucket import TokenBucket
+
+# Les seaux SQLite inactifs depuis ce délai sont supprimés (ils seraient de nouveau pleins)
+SQLITE_IDLE_SECONDS = 3600
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """
+    Quota appliqué aux requêtes d'une méthode dont le chemin commence par un préfixe
+
+    Avec `cost_field`, une requête coûte autant de jetons que la liste de ce
+    champ du corps JSON contient d'éléments (par exemple les prompts d'un lot).
+    Une requête qui coûte plus que `burst` est refusée. Plusieurs règles du
+    même nom partagent le seau d'un client.
+    """
+    name: str
+    method: str
+    path_prefix: str
+    per_minute: float
+    burst: float
+    cost_field: Optional[str] = None
+
+
+class BucketStore(ABC):
+    """Seaux à jetons par client et par quota"""
+
+    # Un stockage bloquant (E/S disque, verrous) est appelé hors de la boucle d'événements
+    blocking = False
+
+    @abstractmethod
+    def take(self, key: str, rate: float, capacity: float, amount: float = 1.0) -> float:
+        """
+        Consomme des jetons du seau d'une clé
+
+        Returns:
+            0 si la requête est acceptée, sinon le délai en secondes avant qu'elle le soit
+        """
+
+
+class MemoryBucketStore(BucketStore):
+    """
+    Seaux en mémoire du processus, bornés en nombre avec éviction LRU
+
+    Un seau inactif se remplit entièrement en burst / débit secondes : évincer
+    les moins récemment utilisés ne rend pas de jetons à un client actif.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def take(self, key: str, rate: float, capacity: float, amount: float = 1.0) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate=rate, capacity=capacity)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.try_consume(amount)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteBucketStore(BucketStore):
+    """
+    Seaux partagés sur disque (SQLite) entre les workers d'une même machine
+
+    Chaque prise de jetons est une transaction exclusive : avec plusieurs
+    workers, un client a le même quota quel que soit le processus qui le sert.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._takes = 0
+
+    def take(self, key: str, rate: float, capacity: float, amount: float = 1.0) -> float:
+        amount = min(amount, capacity)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+                delay = 0.0 if tokens >= amount else (amount - tokens) / rate
+                if delay == 0:
+                    tokens -= amount
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_limit_buckets VALUES (?, ?, ?)", (key, tokens, now)
+                )
+                # Nettoyage périodique des clients qui ne sont pas revenus
+                self._takes += 1
+                if self._takes % 1000 == 0:
+                    self._conn.execute(
+                        "DELETE FROM rate_limit_buckets WHERE updated_at < ?", (now - SQLITE_IDLE_SECONDS,)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return delay
+
+
+def client_key(scope) -> str:
+    """
+    Identifiant du client : sa clé d'API si elle est fournie, sinon son adresse IP
+
+    La clé d'API est hachée pour ne pas être conservée en clair. L'adresse est
+    celle vue par le serveur ; derrière un proxy, lancer uvicorn ou gunicorn avec
+    les en-têtes de proxy autorisés (--forwarded-allow-ips) pour obtenir celle du client.
+    """
+    headers = dict(scope.get("headers") or ())
+    api_key = headers.get(b"x-api-key")
+    if api_key is None:
+        authorization = headers.get(b"authorization", b"")
+        if authorization[:7].lower() == b"bearer ":
+            api_key = authorization[7:].strip()
+    if api_key:
+        return "key:" + hashlib.sha256(api_key).hexdigest()[:32]
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """
+    Middleware ASGI qui applique des quotas par client (seaux à jetons)
+
+    Une requête qui dépasse son quota reçoit une erreur 429 RATE_LIMITED avec un
+    en-tête Retry-After, au même format que les autres erreurs du service, sans
+    atteindre la route. Les requêtes qui ne correspondent à aucune règle passent.
+    """
+
+    def __init__(self, app, store: BucketStore, rules: List[RateLimitRule]):
+        self.app = app
+        self.store = store
+        self.rules = rules
+
+    def _rule(self, scope) -> Optional[RateLimitRule]:
+        for rule in self.rules:
+            if scope["method"] == rule.method and scope["path"].startswith(rule.path_prefix):
+                return rule
+        return None
+
+    async def check(self, scope, cost: float = 1.0) -> Tuple[Optional[RateLimitRule], float]:
+        """
+        Règle applicable à la requête et délai avant qu'elle soit acceptée (0 si acceptée)
+
+        Args:
+            scope: Le scope ASGI de la requête
+            cost: Le nombre de jetons que coûte la requête
+
+        Returns:
+            La règle (ou None) et le délai en secondes
+        """
+        rule = self._rule(scope)
+        if rule is None or rule.per_minute <= 0:
+            return rule, 0.0
+        args = (f"{rule.name}:{client_key(scope)}", rule.per_minute / 60, rule.burst, cost)
+        if self.store.blocking:
+            delay = await asyncio.to_thread(self.store.take, *args)
+        else:
+            delay = self.store.take(*args)
+        return rule, delay
+
+    @staticmethod
+    async def read_cost(receive, field: str) -> Tuple[int, Callable]:
+        """
+        Lit le corps de la requête pour compter les éléments de la liste `field`
+
+        Args:
+            receive: Le canal de réception ASGI
+            field: Le champ JSON dont la longueur est le coût de la requête
+
+        Returns:
+            Le coût (au moins 1, un corps invalide sera refusé par la route) et un
+            canal de réception qui rejoue le corps lu pour l'application
+        """
+        messages = []
+        body = b""
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        async def replay():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        try:
+            items = orjson.loads(body).get(field)
+        except (orjson.JSONDecodeError, AttributeError):
+            items = None
+        return max(1, len(items) if isinstance(items, list) else 1), replay
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cost = 1
+        rule = self._rule(scope)
+        if rule is not None and rule.cost_field and rule.per_minute > 0:
+            cost, receive = await self.read_cost(receive, rule.cost_field)
+
+        if rule is not None and rule.per_minute > 0 and cost > rule.burst:
+            # Plus de jetons que le seau n'en contient jamais : la requête doit être découpée
+            exc = RateLimitExceededError(
+                rule.name,
+                retry_after=math.ceil(rule.burst / (rule.per_minute / 60)),
+                detail=f"Request costs {cost} {rule.name} tokens, more than the burst of {rule.burst:g}: split it"
+            )
+            response = await ema_exception_handler(Request(scope), exc)
+            await response(scope, receive, send)
+            return
+
+        rule, delay = await self.check(scope, cost)
+        if delay > 0:
+            exc = RateLimitExceededError(rule.name, retry_after=math.ceil(delay))
+            response = await ema_exception_handler(Request(scope), exc)
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+
+def create_rate_limit_rules() -> List[RateLimitRule]:
+    """
+    Quotas de la génération et de la recherche de similarité, à partir de la configuration
+
+    Les lots de générations ont leur propre quota, compté en prompts ; les lots
+    de recherches consomment le quota de la recherche, un jeton par aventure.
+    Les règles des lots doivent précéder celles dont le préfixe les couvre.
+    """
+    return [
+        RateLimitRule(
+            name="generate_batch",
+            method="POST",
+            path_prefix="/api/generate/batch",
+            per_minute=settings.RATE_LIMIT_BATCH_PROMPTS_PER_MINUTE,
+            burst=settings.RATE_LIMIT_BATCH_PROMPTS_BURST,
+            cost_field="prompts",
+        ),
+        RateLimitRule(
+            name="generate",
+            method="POST",
+            path_prefix="/api/generate",
+            per_minute=settings.RATE_LIMIT_GENERATE_PER_MINUTE,
+            burst=settings.RATE_LIMIT_GENERATE_BURST,
+        ),
+        RateLimitRule(
+            name="search",
+            method="POST",
+            path_prefix="/api/search_similar/batch",
+            per_minute=settings.RATE_LIMIT_SEARCH_PER_MINUTE,
+            burst=settings.RATE_LIMIT_SEARCH_BURST,
+            cost_field="adventure_ids",
+        ),
+        RateLimitRule(
+            name="search",
+            method="POST",
+            path_prefix="/api/search_similar",
+            per_minute=settings.RATE_LIMIT_SEARCH_PER_MINUTE,
+            burst=settings.RATE_LIMIT_SEARCH_BURST,
+        ),
+    ]
+
+
+def create_bucket_store() -> BucketStore:
+    """Stockage des seaux à partir de la configuration (memory ou sqlite)"""
+    if settings.RATE_LIMIT_STORE == "sqlite":
+        return SQLiteBucketStore(settings.RATE_LIMIT_STORE_PATH)
+    return MemoryBucketStore(settings.RATE_LIMIT_MAX_KEYS)
@@ -0,0 +1,9 @@
+import orjson
+from pydantic import BaseModel
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def json_bytes(model: BaseModel) -> bytes:
+    """Sérialise un modèle en JSON sans le revalider"""
+    return orjson.dumps(model.model_dump())
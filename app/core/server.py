@@ -0,0 +1,22 @@
+from uvicorn.workers import UvicornWorker
+
+from app.core.config import settings
+
+
+class ProductionWorker(UvicornWorker):
+    """
+    Worker uvicorn lancé par gunicorn (voir gunicorn.conf.py)
+
+    Boucle d'événements et parser HTTP configurables : en mode auto, uvicorn
+    prend uvloop et httptools s'ils sont installés, asyncio et h11 sinon.
+    """
+
+    CONFIG_KWARGS = {
+        "loop": settings.SERVER_LOOP,
+        "http": settings.SERVER_HTTP,
+        "lifespan": "on",
+        # Sur SIGTERM, délai laissé aux requêtes en cours (aligné sur graceful_timeout de gunicorn)
+        "timeout_graceful_shutdown": settings.SERVER_GRACEFUL_TIMEOUT,
+        # Les logs d'accès passent par InterceptHandler (échantillonnés par LOG_ACCESS_SAMPLE_RATE)
+        "access_log": settings.LOG_ACCESS_SAMPLE_RATE > 0,
+    }
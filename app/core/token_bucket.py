@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Seau à jetons : autorise des rafales jusqu'à `capacity` puis un débit de `rate` jetons/seconde
+
+    Le remplissage est calculé à la demande à partir du temps écoulé, sans tâche de fond.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_consume(self, amount: float = 1.0) -> float:
+        """
+        Consomme des jetons s'ils sont disponibles
+
+        Args:
+            amount: Le nombre de jetons demandés
+
+        Returns:
+            0 si les jetons ont été consommés, sinon le délai en secondes avant qu'ils le soient
+        """
+        self._refill()
+        # Une demande plus grande que le seau ne doit pas bloquer indéfiniment
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Attend que les jetons soient disponibles puis les consomme"""
+        while True:
+            delay = self.try_consume(amount)
+            if delay == 0:
+                return
+            await asyncio.sleep(delay)
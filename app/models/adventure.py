@@ -1,9 +1,16 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import List, Optional, Tuple
+from app.core.config import settings
 
 class AdventurePrompt(BaseModel):
     """Modèle pour la requête de génération d'aventure"""
     prompt: str = Field(..., description="Prompt utilisateur décrivant l'aventure souhaitée")
+    max_tokens: Optional[int] = Field(
+        None,
+        ge=1,
+        le=settings.OPENAI_MAX_TOKENS_LIMIT,
+        description="Plafond de tokens générés pour cette requête (OPENAI_MAX_TOKENS par défaut)"
+    )
 
 class Adventure(BaseModel):
     """Modèle pour une aventure générée"""
@@ -17,16 +24,142 @@ class Adventure(BaseModel):
     latitude: float = Field(..., description="Latitude du point de départ")
     longitude: float = Field(..., description="Longitude du point de départ")
 
-class SimilarAdventureRequest(BaseModel):
+class CatalogAdventure(Adventure):
+    """Modèle pour une aventure du catalogue, identifiée par son ID"""
+    id: int = Field(..., description="ID de l'aventure")
+
+class IndexAdventureRequest(Adventure):
+    """Modèle pour la requête d'indexation d'une aventure dans la recherche de similarité"""
+    id: Optional[int] = Field(None, description="ID de l'aventure (attribué automatiquement si absent)")
+
+class IndexAdventureResponse(BaseModel):
+    """Modèle pour la réponse d'indexation d'une aventure"""
+    id: int = Field(..., description="ID de l'aventure indexée")
+
+class BatchGenerateRequest(BaseModel):
+    """Modèle pour la requête de génération d'aventures par lots"""
+    prompts: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.BATCH_MAX_PROMPTS,
+        description="Liste des prompts utilisateurs"
+    )
+    concurrency: Optional[int] = Field(
+        None,
+        ge=1,
+        le=settings.BATCH_MAX_CONCURRENCY,
+        description="Nombre maximal de générations simultanées"
+    )
+    stream: bool = Field(False, description="Diffuser les résultats en NDJSON dès qu'ils sont prêts")
+
+class BatchGenerateError(BaseModel):
+    """Modèle pour l'erreur d'un élément d'un lot"""
+    code: str = Field(..., description="Code d'erreur")
+    message: str = Field(..., description="Message d'erreur")
+
+class BatchGenerateItem(BaseModel):
+    """Modèle pour le résultat d'un élément d'un lot"""
+    index: int = Field(..., description="Position du prompt dans la requête")
+    adventure: Optional[Adventure] = Field(None, description="Aventure générée si succès")
+    error: Optional[BatchGenerateError] = Field(None, description="Erreur si échec")
+
+class BatchGenerateResponse(BaseModel):
+    """Modèle pour la réponse de génération d'aventures par lots"""
+    results: List[BatchGenerateItem] = Field(..., description="Résultats dans l'ordre des prompts")
+
+class GenerationJobRequest(BaseModel):
+    """Modèle pour la requête de création d'une tâche de génération asynchrone"""
+    prompt: str = Field(..., description="Prompt utilisateur décrivant l'aventure souhaitée")
+    priority: int = Field(0, ge=0, le=9, description="Priorité (les tâches de priorité plus élevée passent en premier)")
+
+class GenerationJob(BaseModel):
+    """Modèle pour l'état d'une tâche de génération asynchrone"""
+    id: str = Field(..., description="ID de la tâche")
+    status: str = Field(..., description="État de la tâche (pending, running, succeeded, failed)")
+    priority: int = Field(..., description="Priorité de la tâche")
+    created_at: float = Field(..., description="Date de création (timestamp Unix)")
+    updated_at: float = Field(..., description="Date du dernier changement d'état (timestamp Unix)")
+    adventure: Optional[Adventure] = Field(None, description="Aventure générée si succès")
+    error: Optional[BatchGenerateError] = Field(None, description="Erreur si échec")
+
+class SimilarityFilters(BaseModel):
+    """Filtres communs aux recherches d'aventures similaires"""
+    difficulty: Optional[List[str]] = Field(
+        None,
+        description="Niveaux de difficulté acceptés (facile, moyen, difficile)"
+    )
+    tags: Optional[List[str]] = Field(None, description="Tags que les aventures doivent tous porter")
+    min_duration: Optional[int] = Field(None, ge=0, description="Durée minimale en minutes")
+    max_duration: Optional[int] = Field(None, ge=0, description="Durée maximale en minutes")
+    min_distance: Optional[float] = Field(None, ge=0, description="Distance minimale en kilomètres")
+    max_distance: Optional[float] = Field(None, ge=0, description="Distance maximale en kilomètres")
+
+    @model_validator(mode="after")
+    def validate_ranges(self) -> "SimilarityFilters":
+        if self.min_duration is not None and self.max_duration is not None and self.min_duration > self.max_duration:
+            raise ValueError("min_duration doit être inférieure ou égale à max_duration")
+        if self.min_distance is not None and self.max_distance is not None and self.min_distance > self.max_distance:
+            raise ValueError("min_distance doit être inférieure ou égale à max_distance")
+        return self
+
+class SimilarAdventureRequest(SimilarityFilters):
     """Modèle pour la requête de recherche d'aventures similaires"""
     adventure_id: int = Field(..., description="ID de l'aventure pour laquelle chercher des similaires")
+    k: int = Field(
+        settings.SIMILARITY_DEFAULT_K,
+        ge=1,
+        le=settings.SIMILARITY_MAX_K,
+        description="Nombre maximal d'aventures similaires à retourner"
+    )
+    near: Optional[Tuple[float, float]] = Field(
+        None,
+        description="Centre (latitude, longitude) de la recherche géographique"
+    )
+    radius_km: Optional[float] = Field(
+        None,
+        gt=0,
+        description="Rayon de recherche en kilomètres autour du centre (ou de l'aventure de référence)"
+    )
+
+    @field_validator("near")
+    @classmethod
+    def validate_near(cls, near: Optional[Tuple[float, float]]) -> Optional[Tuple[float, float]]:
+        if near is not None and not (-90 <= near[0] <= 90 and -180 <= near[1] <= 180):
+            raise ValueError("Coordonnées invalides: latitude entre -90 et 90, longitude entre -180 et 180")
+        return near
 
 class SimilarAdventure(BaseModel):
     """Modèle pour une aventure similaire"""
     id: int = Field(..., description="ID de l'aventure similaire")
     title: str = Field(..., description="Titre de l'aventure similaire")
     similarity_score: float = Field(..., description="Score de similarité (0-1)")
+    distance_km: Optional[float] = Field(None, description="Distance au centre de la recherche géographique")
 
 class SimilarAdventuresResponse(BaseModel):
     """Modèle pour la réponse de recherche d'aventures similaires"""
-    similar_adventures: List[SimilarAdventure] = Field(..., description="Liste des aventures similaires") 
\ No newline at end of file
+    similar_adventures: List[SimilarAdventure] = Field(..., description="Liste des aventures similaires") 
+
+class SimilarAdventureBatchRequest(SimilarityFilters):
+    """Modèle pour la requête de recherche d'aventures similaires pour plusieurs aventures"""
+    adventure_ids: List[int] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.SIMILARITY_BATCH_MAX_IDS,
+        description="IDs des aventures pour lesquelles chercher des similaires"
+    )
+    k: int = Field(
+        settings.SIMILARITY_DEFAULT_K,
+        ge=1,
+        le=settings.SIMILARITY_MAX_K,
+        description="Nombre maximal d'aventures similaires à retourner par ID"
+    )
+
+class SimilarAdventuresBatchItem(BaseModel):
+    """Modèle pour le résultat d'un ID d'une recherche de similarité par lots"""
+    adventure_id: int = Field(..., description="ID de l'aventure de référence")
+    similar_adventures: Optional[List[SimilarAdventure]] = Field(None, description="Aventures similaires si succès")
+    error: Optional[BatchGenerateError] = Field(None, description="Erreur si échec")
+
+class SimilarAdventuresBatchResponse(BaseModel):
+    """Modèle pour la réponse de recherche d'aventures similaires par lots"""
+    results: List[SimilarAdventuresBatchItem] = Field(..., description="Résultats dans l'ordre des IDs demandés")
@@ -1,30 +1,40 @@
-from langchain.chat_models import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from langchain.chains import LLMChain
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.concurrency_limiter import AIMDLimiter
 from app.core.config import settings
+from app.core.http import create_http_client
+from app.core.responses import json_bytes
+from app.core.metrics import CACHE_REQUESTS, LLM_RETRIES, LLM_TOKENS, STAGE_LATENCY, time_stage
 from app.models.adventure import Adventure
-from app.core.exceptions import PromptProcessingError, OpenAIError, InvalidPromptError
+from app.core.exceptions import (
+    EmaAIException, PromptProcessingError, OpenAIError, InvalidPromptError
+)
+from app.core.token_bucket import TokenBucket
+from app.services.adventure_pool import AdventurePool, IntentClassifier, load_pool_categories, parse_hours
+from app.services.cache import AdventureCache, create_adventure_cache
+from app.services.embeddings import normalize_prompt
+from app.services.json_stream import IncrementalJSONParser
+from app.services.model_router import ModelRouter
+from app.services.single_flight import SingleFlight
+from app.services.structured_output import parse_adventure, repair_field
+from app.services.token_counter import TokenUsage, count_tokens
 from loguru import logger
-from tenacity import retry, stop_after_attempt, wait_exponential
-import openai
+from contextlib import asynccontextmanager
+from tenacity import RetryCallState, retry, retry_if_exception, stop_after_attempt, wait_exponential
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+import asyncio
+import httpx
+import math
+import time
 
-class AdventureGenerator:
-    """Service pour générer des aventures à partir de prompts utilisateurs"""
-    
-    def __init__(self):
-        # Initialiser le modèle OpenAI
-        self.llm = ChatOpenAI(
-            model_name=settings.OPENAI_MODEL,
-            temperature=0.7,
-            openai_api_key=settings.OPENAI_API_KEY
-        )
-        
-        # Créer le parser pour formater la sortie en objet Adventure
-        self.parser = PydanticOutputParser(pydantic_object=Adventure)
-        
-        # Définir le template de prompt
-        template = """
+# LangChain et openai ne sont importés qu'à la création du premier générateur :
+# leur chargement (près de 2 s à froid) ne retarde ni le démarrage ni /health
+if TYPE_CHECKING:
+    from langchain.chains import LLMChain
+    from langchain.chat_models import ChatOpenAI
+    from langchain.output_parsers import PydanticOutputParser
+    from langchain.prompts import ChatPromptTemplate
+
+FULL_TEMPLATE = """
         Tu es un expert en micro-aventures et activités de plein air en France. 
         Ton rôle est de générer des suggestions d'aventures personnalisées basées sur les demandes des utilisateurs.
         
@@ -43,51 +53,633 @@ class AdventureGenerator:
         Réponds UNIQUEMENT avec un objet JSON valide suivant ce format exact, sans texte supplémentaire :
         {format_instructions}
         """
+
+# Template compact : mêmes champs, sans préambule ni schéma JSON complet
+COMPACT_TEMPLATE = """Micro-aventure de plein air en France pour : {prompt}
+Réponds uniquement en JSON : {format_instructions}"""
+
+COMPACT_FORMAT_INSTRUCTIONS = (
+    '{"title":str,"description":str,"location":str,"tags":[str],'
+    '"difficulty":"facile|moyen|difficile","duration":int(minutes),"distance":float(km),'
+    '"latitude":float,"longitude":float}'
+)
+
+def _should_retry(error: BaseException) -> bool:
+    """Les refus immédiats (circuit ouvert, limite de concurrence atteinte) ne sont pas retentés"""
+    return not (isinstance(error, OpenAIError) and error.retry_after is not None)
+
+def _record_retry(retry_state: RetryCallState) -> None:
+    """Compte une nouvelle tentative et le temps d'attente qui la précède"""
+    LLM_RETRIES.inc()
+    STAGE_LATENCY.observe(retry_state.next_action.sleep, component="generator", stage="retry_backoff")
+    logger.warning(
+        f"Nouvelle tentative de génération dans {retry_state.next_action.sleep:.1f}s "
+        f"(tentative {retry_state.attempt_number}): {str(retry_state.outcome.exception())}"
+    )
+
+def build_prompt(mode: str, parser: "PydanticOutputParser") -> "ChatPromptTemplate":
+    """
+    Construit le template de prompt de génération
+    
+    Args:
+        mode: "full" (préambule et schéma JSON complet) ou "compact" (schéma minimal)
+        parser: Le parser dont le schéma est inclus en mode complet
         
-        # Créer le prompt avec les instructions de formatage
-        self.prompt = ChatPromptTemplate.from_template(
-            template=template,
-            partial_variables={"format_instructions": self.parser.get_format_instructions()}
+    Returns:
+        Le template, avec les instructions de format déjà renseignées
+    """
+    from langchain.prompts import ChatPromptTemplate
+    
+    if mode == "compact":
+        return ChatPromptTemplate.from_template(
+            template=COMPACT_TEMPLATE,
+            partial_variables={"format_instructions": COMPACT_FORMAT_INSTRUCTIONS}
         )
+    return ChatPromptTemplate.from_template(
+        template=FULL_TEMPLATE,
+        partial_variables={"format_instructions": parser.get_format_instructions()}
+    )
+
+class AdventureGenerator:
+    """Service pour générer des aventures à partir de prompts utilisateurs"""
+    
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[AdventureCache] = None,
+        on_generated: Optional[Callable[[Adventure], Any]] = None,
+        prompt_mode: Optional[str] = None,
+    ):
+        # Client HTTP partagé : sans client fourni, le générateur crée le sien et le ferme dans aclose()
+        self._owns_http_client = http_client is None
+        self.http_client = http_client or create_http_client()
+        
+        # Cache des aventures déjà générées (None si désactivé dans la configuration)
+        self.cache = cache if cache is not None else create_adventure_cache()
+        
+        # Appelé pour chaque nouvelle aventure générée (ex: indexation pour la recherche de similarité)
+        self.on_generated = on_generated
+        
+        # Regroupement des générations concurrentes pour un même prompt
+        self.single_flight: SingleFlight[Adventure] = SingleFlight(max_waiters=settings.SINGLE_FLIGHT_MAX_WAITERS)
+        
+        from langchain.chains import LLMChain
+        from langchain.output_parsers import PydanticOutputParser
+        
+        # Initialiser le modèle OpenAI
+        self.llm = self._create_llm(settings.OPENAI_MODEL)
+        
+        # Parser LangChain, utilisé pour les instructions de format du prompt ;
+        # les réponses sont analysées par parse_adventure (validation directe puis réparation locale)
+        self.parser = PydanticOutputParser(pydantic_object=Adventure)
+        
+        # Définir le template de prompt (complet ou compact selon OPENAI_PROMPT_MODE)
+        self.prompt_mode = prompt_mode or settings.OPENAI_PROMPT_MODE
+        self.prompt = build_prompt(self.prompt_mode, self.parser)
         
         # Créer la chaîne LLM
         self.chain = LLMChain(llm=self.llm, prompt=self.prompt)
+        
+        # Routage entre plusieurs modèles (désactivé si OPENAI_MODEL_TIERS est vide)
+        self.router: Optional[ModelRouter] = None
+        self.chains: Dict[str, "LLMChain"] = {}
+        if settings.OPENAI_MODEL_TIERS:
+            self.router = ModelRouter(settings.OPENAI_MODEL_TIERS)
+            self.chains = {
+                model: LLMChain(llm=self._create_llm(model), prompt=self.prompt)
+                for model in settings.OPENAI_MODEL_TIERS
+            }
+        
+        # Comptage des tokens consommés par requête
+        self.token_usage = TokenUsage()
+        self._template_tokens = count_tokens(self.prompt.format(prompt=""), settings.OPENAI_MODEL)
+        
+        # Régulation du débit de tokens envoyés à OpenAI (désactivée si aucun quota n'est configuré)
+        self.token_pacer: Optional[TokenBucket] = None
+        if settings.OPENAI_TOKENS_PER_MINUTE > 0:
+            self.token_pacer = TokenBucket(
+                rate=settings.OPENAI_TOKENS_PER_MINUTE / 60,
+                capacity=settings.OPENAI_TOKENS_PER_MINUTE
+            )
+        
+        # Protection du service amont : limite de concurrence adaptative et disjoncteur,
+        # propres à chaque modèle pour qu'un modèle lent ou en panne ne pénalise pas les autres
+        self.limiter = self._create_limiter()
+        self.circuit_breaker = self._create_circuit_breaker()
+        self.model_guards: Dict[str, Tuple[AIMDLimiter, CircuitBreaker]] = {
+            model: (self._create_limiter(), self._create_circuit_breaker())
+            for model in settings.OPENAI_MODEL_TIERS
+            if model != settings.OPENAI_MODEL
+        }
+        
+        # Aventures générées à l'avance pour les demandes génériques (désactivé si POOL_ENABLED=false)
+        self.pool: Optional[AdventurePool] = None
+        if settings.POOL_ENABLED:
+            categories = load_pool_categories()
+            self.pool = AdventurePool(
+                categories=categories,
+                generate=self._generate_with_retry,
+                classifier=IntentClassifier(categories, threshold=settings.POOL_MATCH_THRESHOLD),
+                size=settings.POOL_SIZE,
+                refill_interval=settings.POOL_REFILL_INTERVAL_SECONDS,
+                refill_hours=parse_hours(settings.POOL_REFILL_HOURS),
+                # Le remplissage passe après le trafic des utilisateurs
+                is_busy=lambda: self._in_flight() > settings.POOL_REFILL_MAX_IN_FLIGHT
+            )
+    
+    @staticmethod
+    def _create_limiter() -> AIMDLimiter:
+        return AIMDLimiter(
+            initial_limit=settings.LLM_CONCURRENCY_INITIAL,
+            min_limit=settings.LLM_CONCURRENCY_MIN,
+            max_limit=settings.LLM_CONCURRENCY_MAX,
+            latency_target=settings.LLM_LATENCY_TARGET_SECONDS,
+            backoff=settings.LLM_CONCURRENCY_BACKOFF
+        )
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-    async def generate_adventure(self, prompt: str) -> Adventure:
+    @staticmethod
+    def _create_circuit_breaker() -> CircuitBreaker:
+        return CircuitBreaker(
+            failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=settings.CIRCUIT_RESET_TIMEOUT_SECONDS,
+            half_open_max_calls=settings.CIRCUIT_HALF_OPEN_MAX_CALLS
+        )
+    
+    def _create_llm(self, model_name: str) -> "ChatOpenAI":
+        from langchain.chat_models import ChatOpenAI
+        
+        # En mode JSON natif, l'API garantit un objet JSON syntaxiquement valide
+        model_kwargs = {"response_format": {"type": "json_object"}} if settings.OPENAI_JSON_MODE else {}
+        return ChatOpenAI(
+            model_name=model_name,
+            temperature=0.7,
+            openai_api_key=settings.OPENAI_API_KEY,
+            openai_api_base=settings.OPENAI_API_BASE or None,
+            http_client=self.http_client,
+            model_kwargs=model_kwargs,
+            # Plafond de tokens générés par requête (None = limite du modèle)
+            max_tokens=settings.OPENAI_MAX_TOKENS or None
+        )
+    
+    async def aclose(self) -> None:
+        """Arrête le remplissage du pool et libère le pool de connexions HTTP si le générateur en est propriétaire"""
+        if self.pool is not None:
+            await self.pool.aclose()
+        if self._owns_http_client:
+            await self.http_client.aclose()
+    
+    @staticmethod
+    def validate_prompt(prompt: str) -> None:
+        """
+        Vérifie qu'un prompt peut être traité
+        
+        Raises:
+            InvalidPromptError: Si le prompt est vide ou invalide
+        """
+        if not prompt or len(prompt.strip()) < 5:
+            raise InvalidPromptError("Le prompt doit contenir au moins 5 caractères")
+    
+    async def generate_adventure(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        slot_timeout: float = 0
+    ) -> Adventure:
         """
         Génère une aventure à partir d'un prompt utilisateur
         
+        Les prompts identiques ou très proches d'un prompt déjà traité sont
+        servis depuis le cache sans appel à OpenAI. Les requêtes simultanées
+        portant sur le même prompt partagent un seul appel à OpenAI.
+        
         Args:
             prompt: Le prompt utilisateur décrivant l'aventure souhaitée
+            max_tokens: Plafond de tokens générés pour cette requête (OPENAI_MAX_TOKENS par défaut)
+            slot_timeout: Secondes d'attente maximale d'une place sous la limite de concurrence
+                vers OpenAI (0 = refus immédiat, pour les requêtes des utilisateurs)
             
         Returns:
             Un objet Adventure contenant les détails de l'aventure générée
             
+        Raises:
+            InvalidPromptError: Si le prompt est vide ou invalide
+            OpenAIError: Si une erreur se produit avec l'API OpenAI, si le circuit est ouvert
+                ou si la limite de concurrence est atteinte (avec un délai Retry-After)
+            PromptProcessingError: Si une erreur se produit lors du traitement du prompt
+            ServiceOverloadedError: Si trop de requêtes attendent déjà ce même prompt
+        """
+        self.validate_prompt(prompt)
+        
+        if self.cache is not None:
+            adventure = self.cache.get(prompt)
+            CACHE_REQUESTS.inc(cache="generation", result="hit" if adventure is not None else "miss")
+            if adventure is not None:
+                logger.info("Aventure servie depuis le cache: {}", adventure.title)
+                return adventure
+        
+        adventure = self._from_pool(prompt)
+        if adventure is not None:
+            return adventure
+        
+        # Les appelants ne partagent un appel que s'ils en attendent le même comportement :
+        # même plafond de tokens et même attente d'une place sous la limite de concurrence
+        return await self.single_flight.run(
+            (normalize_prompt(prompt), max_tokens, slot_timeout),
+            lambda: self._generate_and_cache(prompt, max_tokens, slot_timeout)
+        )
+    
+    async def generate_adventure_json(self, prompt: str, max_tokens: Optional[int] = None) -> bytes:
+        """
+        Même génération que generate_adventure, retournée sérialisée en JSON
+
+        Une aventure servie depuis le cache est renvoyée telle qu'elle y est
+        stockée, sans être resérialisée.
+
+        Raises:
+            Les mêmes exceptions que generate_adventure
+        """
+        self.validate_prompt(prompt)
+        
+        if self.cache is not None:
+            payload = self.cache.get_json(prompt)
+            CACHE_REQUESTS.inc(cache="generation", result="hit" if payload is not None else "miss")
+            if payload is not None:
+                logger.info("Aventure servie depuis le cache (prompt de {} caractères)", len(prompt))
+                return payload
+        
+        adventure = self._from_pool(prompt)
+        if adventure is not None:
+            return json_bytes(adventure)
+        
+        adventure = await self.single_flight.run(
+            (normalize_prompt(prompt), max_tokens, 0),
+            lambda: self._generate_and_cache(prompt, max_tokens)
+        )
+        return json_bytes(adventure)
+    
+    async def iter_many(
+        self,
+        prompts: List[str],
+        concurrency: Optional[int] = None
+    ) -> AsyncIterator[Tuple[int, Union[Adventure, EmaAIException]]]:
+        """
+        Génère plusieurs aventures en parallèle et les diffuse dans l'ordre de fin
+        
+        Args:
+            prompts: Les prompts utilisateurs
+            concurrency: Nombre maximal de générations simultanées (BATCH_CONCURRENCY par défaut)
+            
+        Yields:
+            (index du prompt, Adventure générée ou exception de l'élément)
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.BATCH_CONCURRENCY)
+        
+        async def run(index: int, prompt: str) -> Tuple[int, Union[Adventure, EmaAIException]]:
+            async with semaphore:
+                try:
+                    # Les éléments d'un lot attendent une place sous la limite plutôt que d'échouer
+                    return index, await self.generate_adventure(prompt, slot_timeout=settings.LLM_SLOT_WAIT_SECONDS)
+                except EmaAIException as exc:
+                    return index, exc
+        
+        tasks = [asyncio.ensure_future(run(index, prompt)) for index, prompt in enumerate(prompts)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Client déconnecté ou itération interrompue : ne pas laisser tourner les générations restantes
+            for task in tasks:
+                task.cancel()
+    
+    async def generate_many(
+        self,
+        prompts: List[str],
+        concurrency: Optional[int] = None
+    ) -> List[Union[Adventure, EmaAIException]]:
+        """
+        Génère plusieurs aventures avec une concurrence bornée
+        
+        Un échec sur un prompt n'interrompt pas les autres : l'exception est
+        retournée à la place de l'aventure correspondante.
+        
+        Args:
+            prompts: Les prompts utilisateurs
+            concurrency: Nombre maximal de générations simultanées (BATCH_CONCURRENCY par défaut)
+            
+        Returns:
+            Pour chaque prompt, dans l'ordre d'entrée, l'Adventure générée ou l'exception levée
+        """
+        results: List[Union[Adventure, EmaAIException]] = [None] * len(prompts)
+        async for index, result in self.iter_many(prompts, concurrency):
+            results[index] = result
+        return results
+    
+    async def stream_adventure(self, prompt: str, max_tokens: Optional[int] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Génère une aventure en diffusant chaque champ dès qu'il est complet
+        
+        Les tokens du modèle sont lus au fil de l'eau et analysés par un parser
+        JSON incrémental. Il n'y a pas de nouvelle tentative : une fois des champs
+        envoyés au client, rejouer l'appel produirait une aventure différente.
+        
+        Args:
+            prompt: Le prompt utilisateur décrivant l'aventure souhaitée
+            max_tokens: Plafond de tokens générés pour cette requête (OPENAI_MAX_TOKENS par défaut)
+            
+        Yields:
+            ("field", {"name": ..., "value": ...}) pour chaque champ terminé, réparé
+            comme dans parse_adventure, puis ("adventure", Adventure) avec l'objet
+            final validé, qui seul fait foi
+            
         Raises:
             InvalidPromptError: Si le prompt est vide ou invalide
             OpenAIError: Si une erreur se produit avec l'API OpenAI
+            PromptProcessingError: Si la réponse complète ne peut pas être parsée
+        """
+        import openai
+        
+        self.validate_prompt(prompt)
+        
+        adventure = None
+        if self.cache is not None:
+            adventure = self.cache.get(prompt)
+            CACHE_REQUESTS.inc(cache="generation", result="hit" if adventure is not None else "miss")
+            if adventure is not None:
+                logger.info("Aventure servie depuis le cache: {}", adventure.title)
+        if adventure is None:
+            adventure = self._from_pool(prompt)
+        if adventure is not None:
+            for name, value in adventure.model_dump().items():
+                yield "field", {"name": name, "value": value}
+            yield "adventure", adventure
+            return
+        
+        logger.info("Génération en streaming d'une aventure (prompt de {} caractères)", len(prompt))
+        await self._pace(prompt, max_tokens)
+        json_parser = IncrementalJSONParser()
+        try:
+            with time_stage("generator", "prompt_build"):
+                messages = self.prompt.format_messages(prompt=prompt)
+            # Pas de couverture en streaming : les champs déjà envoyés viennent d'un seul modèle
+            model = self.router.choose(prompt)[0] if self.router is not None else settings.OPENAI_MODEL
+            llm = self.chains[model].llm if self.router is not None else self.llm
+            with time_stage("generator", "upstream"):
+                async with self._llm_call(model=model):
+                    async for chunk in llm.astream(messages, **self._llm_kwargs(max_tokens)):
+                        for name, value in json_parser.feed(chunk.content):
+                            yield "field", {"name": name, "value": repair_field(name, value)}
+            
+            with time_stage("generator", "token_count"):
+                self._record_usage(prompt, json_parser.text, model)
+            with time_stage("generator", "parse"):
+                adventure = parse_adventure(json_parser.text)
+        except EmaAIException:
+            raise
+        except openai.OpenAIError as e:
+            logger.error("Erreur OpenAI lors de la génération de l'aventure: {}", e)
+            raise OpenAIError(f"Erreur lors de la communication avec OpenAI: {str(e)}")
+        except Exception as e:
+            logger.error("Erreur lors de la génération de l'aventure: {}", e)
+            raise PromptProcessingError(f"Erreur lors du traitement du prompt: {str(e)}")
+        
+        logger.info("Aventure générée avec succès: {}", adventure.title)
+        if self.cache is not None:
+            self.cache.set(prompt, adventure)
+        self._notify_generated(adventure)
+        yield "adventure", adventure
+    
+    async def _pace(self, prompt: str, max_tokens: Optional[int] = None) -> None:
+        """Attend que le quota de tokens par minute permette un nouvel appel à OpenAI"""
+        if self.token_pacer is None:
+            return
+        completion_tokens = max_tokens or settings.OPENAI_MAX_TOKENS or settings.OPENAI_EXPECTED_COMPLETION_TOKENS
+        tokens = self._prompt_tokens(prompt) + completion_tokens
+        with time_stage("generator", "pacing"):
+            await self.token_pacer.acquire(tokens)
+    
+    @staticmethod
+    def _llm_kwargs(max_tokens: Optional[int]) -> Dict[str, Any]:
+        """Paramètres d'appel propres à une requête, ajoutés à ceux du modèle"""
+        return {"max_tokens": max_tokens} if max_tokens is not None else {}
+    
+    def _run_chain(self, chain: "LLMChain", prompt: str, max_tokens: Optional[int]) -> Awaitable[str]:
+        """Exécute une chaîne, avec le plafond de tokens de la requête s'il y en a un"""
+        if max_tokens is not None:
+            from langchain.chains import LLMChain
+            
+            chain = LLMChain(
+                llm=chain.llm,
+                prompt=chain.prompt,
+                llm_kwargs={**chain.llm_kwargs, **self._llm_kwargs(max_tokens)}
+            )
+        return chain.arun(prompt=prompt)
+    
+    async def _call_model(
+        self,
+        model: str,
+        prompt: str,
+        max_tokens: Optional[int],
+        slot_timeout: float
+    ) -> Tuple[str, str]:
+        """
+        Un appel au service amont, avec sa propre place sous la limite de concurrence
+        
+        Returns:
+            (modèle appelé, réponse brute du modèle)
+        """
+        async with self._llm_call(slot_timeout, model):
+            return model, await self._run_chain(self.chains.get(model, self.chain), prompt, max_tokens)
+    
+    def _guards(self, model: Optional[str] = None) -> Tuple[AIMDLimiter, CircuitBreaker]:
+        """Limite de concurrence et disjoncteur d'un modèle (ceux du modèle par défaut sinon)"""
+        if model is not None and model in self.model_guards:
+            return self.model_guards[model]
+        return self.limiter, self.circuit_breaker
+    
+    def _in_flight(self) -> int:
+        """Appels en cours vers OpenAI, tous modèles confondus"""
+        return self.limiter.in_flight + sum(limiter.in_flight for limiter, _ in self.model_guards.values())
+    
+    @asynccontextmanager
+    async def _llm_call(self, slot_timeout: float = 0, model: Optional[str] = None) -> AsyncIterator[None]:
+        """
+        Encadre un appel au LLM par le disjoncteur et la limite de concurrence du modèle appelé
+        
+        Args:
+            slot_timeout: Secondes d'attente maximale d'une place sous la limite (0 = refus immédiat)
+            model: Le modèle appelé (OPENAI_MODEL par défaut)
+        
+        Raises:
+            OpenAIError: Si le circuit est ouvert ou si la limite de concurrence est atteinte
+                (avec un délai Retry-After)
+        """
+        limiter, circuit_breaker = self._guards(model)
+        retry_after = circuit_breaker.acquire()
+        if retry_after is not None:
+            raise OpenAIError("Service OpenAI indisponible, réessayez plus tard", retry_after=math.ceil(retry_after))
+        try:
+            acquired = await limiter.acquire(slot_timeout)
+        except asyncio.CancelledError:
+            circuit_breaker.release()
+            raise
+        if not acquired:
+            circuit_breaker.release()
+            raise OpenAIError(
+                "Trop d'appels en cours vers OpenAI, réessayez plus tard",
+                retry_after=settings.LLM_OVERLOAD_RETRY_AFTER_SECONDS
+            )
+        
+        start = time.perf_counter()
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            # Appel interrompu (client déconnecté, annulation) : aucune information sur le service
+            limiter.release()
+            circuit_breaker.release()
+            raise
+        except Exception:
+            limiter.release(time.perf_counter() - start, success=False)
+            circuit_breaker.record_failure()
+            raise
+        limiter.release(time.perf_counter() - start, success=True)
+        circuit_breaker.record_success()
+    
+    def resilience_stats(self) -> Dict[str, Any]:
+        """État de la limite de concurrence et du disjoncteur, et de ceux de chaque modèle avec le routage"""
+        stats: Dict[str, Any] = {
+            "concurrency": self.limiter.snapshot(),
+            "circuit_breaker": self.circuit_breaker.snapshot()
+        }
+        if self.router is not None:
+            stats["models"] = {}
+            for model in self.router.models:
+                limiter, circuit_breaker = self._guards(model)
+                stats["models"][model] = {
+                    "concurrency": limiter.snapshot(),
+                    "circuit_breaker": circuit_breaker.snapshot()
+                }
+        return stats
+    
+    def _prompt_tokens(self, prompt: str, model: Optional[str] = None) -> int:
+        return self._template_tokens + count_tokens(prompt, model or settings.OPENAI_MODEL)
+    
+    def _record_usage(self, prompt: str, completion: str, model: str) -> None:
+        """Compte les tokens d'un appel à OpenAI, pour le modèle qui a répondu, et les journalise"""
+        prompt_tokens = self._prompt_tokens(prompt, model)
+        completion_tokens = count_tokens(completion, model)
+        self.token_usage.record(prompt_tokens, completion_tokens)
+        LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+        LLM_TOKENS.inc(completion_tokens, model=model, kind="completion")
+        logger.info(
+            "Tokens consommés par {}: {} en entrée, {} en sortie (prompt {})",
+            model, prompt_tokens, completion_tokens, self.prompt_mode
+        )
+    
+    def _from_pool(self, prompt: str) -> Optional[Adventure]:
+        """
+        Sert une aventure générée à l'avance si le prompt relève d'une catégorie du pool
+        
+        L'aventure servie est mise en cache pour ce prompt et transmise à l'abonné,
+        comme une aventure générée à la demande.
+        """
+        if self.pool is None:
+            return None
+        # Démarrage paresseux du remplissage (générateur créé hors de la boucle d'événements)
+        self.pool.start()
+        adventure = self.pool.take(prompt)
+        CACHE_REQUESTS.inc(cache="pool", result="hit" if adventure is not None else "miss")
+        if adventure is None:
+            return None
+        logger.info("Aventure servie depuis le pool: {}", adventure.title)
+        if self.cache is not None:
+            self.cache.set(prompt, adventure)
+        self._notify_generated(adventure)
+        return adventure
+    
+    async def _generate_and_cache(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        slot_timeout: float = 0
+    ) -> Adventure:
+        """Génère l'aventure et l'enregistre dans le cache (une fois par groupe de requêtes)"""
+        adventure = await self._generate_with_retry(prompt, max_tokens, slot_timeout)
+        
+        if self.cache is not None:
+            self.cache.set(prompt, adventure)
+        self._notify_generated(adventure)
+        return adventure
+    
+    def _notify_generated(self, adventure: Adventure) -> None:
+        """Transmet une aventure fraîchement générée à l'abonné, sans faire échouer la génération"""
+        if self.on_generated is None:
+            return
+        try:
+            self.on_generated(adventure)
+        except Exception as e:
+            logger.error("Erreur lors du traitement de l'aventure générée: {}", e)
+    
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_exception(_should_retry),
+        before_sleep=_record_retry
+    )
+    async def _generate_with_retry(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        slot_timeout: float = 0
+    ) -> Adventure:
+        """
+        Appelle le LLM et parse sa réponse, avec nouvelles tentatives en cas d'échec
+        
+        Args:
+            prompt: Le prompt utilisateur, déjà validé
+            max_tokens: Plafond de tokens générés pour cette requête (OPENAI_MAX_TOKENS par défaut)
+            slot_timeout: Secondes d'attente maximale d'une place sous la limite de concurrence
+            
+        Returns:
+            Un objet Adventure contenant les détails de l'aventure générée
+            
+        Raises:
+            OpenAIError: Si une erreur se produit avec l'API OpenAI, si le circuit est ouvert
+                ou si la limite de concurrence est atteinte
             PromptProcessingError: Si une erreur se produit lors du traitement du prompt
         """
+        import openai
+        
+        await self._pace(prompt, max_tokens)
         try:
-            # Valider le prompt
-            if not prompt or len(prompt.strip()) < 5:
-                raise InvalidPromptError("Le prompt doit contenir au moins 5 caractères")
-                
-            logger.info(f"Génération d'une aventure pour le prompt: {prompt}")
+            logger.info("Génération d'une aventure (prompt de {} caractères)", len(prompt))
             
-            # Exécuter la chaîne LLM
-            result = await self.chain.arun(prompt=prompt)
+            # Exécuter la chaîne LLM, sur le modèle choisi par le routeur s'il est activé
+            # (la chaîne construit le prompt elle-même : sa durée est comptée dans l'appel).
+            # Chaque appel amont, y compris une requête de couverture, occupe sa propre place
+            with time_stage("generator", "upstream"):
+                if self.router is None:
+                    model, result = await self._call_model(settings.OPENAI_MODEL, prompt, max_tokens, slot_timeout)
+                else:
+                    # Le modèle retenu est celui qui a répondu (repli ou requête de couverture comprise)
+                    model, result = await self.router.run(
+                        prompt, lambda model: self._call_model(model, prompt, max_tokens, slot_timeout)
+                    )
+            with time_stage("generator", "token_count"):
+                self._record_usage(prompt, result, model)
             
-            # Parser le résultat en objet Adventure
-            adventure = self.parser.parse(result)
+            # Parser le résultat en objet Adventure, en réparant les écarts de format
+            # localement : seule une réponse irréparable déclenche un nouvel appel
+            with time_stage("generator", "parse"):
+                adventure = parse_adventure(result)
             
-            logger.info(f"Aventure générée avec succès: {adventure.title}")
+            logger.info("Aventure générée avec succès: {}", adventure.title)
             return adventure
             
+        except EmaAIException:
+            raise
         except openai.OpenAIError as e:
-            logger.error(f"Erreur OpenAI lors de la génération de l'aventure: {str(e)}")
+            logger.error("Erreur OpenAI lors de la génération de l'aventure: {}", e)
             raise OpenAIError(f"Erreur lors de la communication avec OpenAI: {str(e)}")
         except Exception as e:
-            logger.error(f"Erreur lors de la génération de l'aventure: {str(e)}")
-            raise PromptProcessingError(f"Erreur lors du traitement du prompt: {str(e)}") 
\ No newline at end of file
+            logger.error("Erreur lors de la génération de l'aventure: {}", e)
+            raise PromptProcessingError(f"Erreur lors du traitement du prompt: {str(e)}")
@@ -0,0 +1,231 @@
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.core.config import settings
+from app.models.adventure import Adventure
+from app.services.embeddings import STEM_LENGTH, STOPWORDS, HashingEmbedder, normalize_prompt
+
+# Catégories par défaut : les thèmes du catalogue de démonstration
+DEFAULT_CATEGORIES_PATH = Path(__file__).resolve().parent.parent / "data" / "pool_categories.json"
+
+
+@dataclass
+class PoolCategory:
+    """Catégorie de demandes génériques : ses prompts servent d'exemples au classifieur et à la génération"""
+    name: str
+    prompts: List[str]
+
+
+def load_pool_categories(path: Optional[str] = None) -> List[PoolCategory]:
+    """
+    Charge les catégories du pool depuis un fichier JSON
+
+    Args:
+        path: Chemin du fichier, POOL_CATEGORIES_PATH ou les catégories par défaut
+
+    Returns:
+        La liste des catégories
+    """
+    categories_path = Path(path or settings.POOL_CATEGORIES_PATH or DEFAULT_CATEGORIES_PATH)
+    with categories_path.open(encoding="utf-8") as f:
+        return [PoolCategory(name=record["name"], prompts=record["prompts"]) for record in json.load(f)]
+
+
+def parse_hours(value: str) -> Optional[Tuple[int, int]]:
+    """Plage horaire "début-fin" (heures locales, fin exclue, ex: "22-6"), ou None si vide"""
+    if not value.strip():
+        return None
+    start, end = value.split("-")
+    return int(start), int(end)
+
+
+def word_stems(text: str) -> Set[str]:
+    """Racines des mots significatifs d'un texte (sans mots vides ni pluriel), comme dans les embeddings"""
+    stems = set()
+    for word in normalize_prompt(text).split():
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word[-1] in "sx":
+            word = word[:-1]
+        stems.add(word[:STEM_LENGTH])
+    return stems
+
+
+class IntentClassifier:
+    """
+    Associe un prompt à une catégorie du pool, ou à aucune
+
+    Le prompt est comparé par similarité cosinus aux prompts d'exemple de
+    chaque catégorie. La similarité seule ne suffit pas : une demande précise
+    reste proche des exemples génériques de son thème. Le prompt ne doit donc
+    contenir que des mots présents dans les exemples de la catégorie ; un lieu,
+    un public ou une contrainte qu'ils ne couvrent pas l'envoie au LLM.
+    """
+
+    def __init__(
+        self,
+        categories: List[PoolCategory],
+        embedder: Optional[HashingEmbedder] = None,
+        threshold: float = 0.6,
+        margin: float = 0.05,
+    ):
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+        self.margin = margin
+        self.names = [category.name for category in categories]
+        # Exemples rangés par catégorie : début du bloc de chaque catégorie
+        self._offsets = np.cumsum([0] + [len(category.prompts) for category in categories[:-1]])
+        self._examples = self.embedder.embed([prompt for category in categories for prompt in category.prompts])
+        self._vocabularies = [set().union(*map(word_stems, category.prompts)) for category in categories]
+
+    def classify(self, prompt: str) -> Optional[str]:
+        """
+        Returns:
+            Le nom de la catégorie, ou None si aucune ne correspond assez nettement
+        """
+        scores = self._examples @ self.embedder.embed_one(prompt)
+        best = np.maximum.reduceat(scores, self._offsets)
+        order = np.argsort(best)[::-1]
+        if best[order[0]] < self.threshold:
+            return None
+        # Demande à cheval sur deux catégories : laisser le LLM y répondre
+        if len(order) > 1 and best[order[0]] - best[order[1]] < self.margin:
+            return None
+        # Mots absents des exemples (lieu, public, contrainte) : demande précise
+        if not word_stems(prompt) <= self._vocabularies[order[0]]:
+            return None
+        return self.names[order[0]]
+
+
+class AdventurePool:
+    """
+    Aventures générées à l'avance par catégorie, servies sans appel au LLM
+
+    Chaque aventure n'est servie qu'une fois. Une tâche de fond maintient
+    `size` aventures par catégorie, une génération à la fois, pendant les
+    heures creuses (`refill_hours`) et tant que le service amont n'est pas
+    occupé par le trafic (`is_busy`).
+    """
+
+    def __init__(
+        self,
+        categories: List[PoolCategory],
+        generate: Callable[[str], Awaitable[Adventure]],
+        classifier: Optional[IntentClassifier] = None,
+        size: int = 5,
+        refill_interval: float = 60,
+        refill_hours: Optional[Tuple[int, int]] = None,
+        is_busy: Optional[Callable[[], bool]] = None,
+    ):
+        self.categories = {category.name: category for category in categories}
+        self.generate = generate
+        self.classifier = classifier or IntentClassifier(categories)
+        self.size = size
+        self.refill_interval = refill_interval
+        self.refill_hours = refill_hours
+        self.is_busy = is_busy or (lambda: False)
+        self._adventures: Dict[str, Deque[Adventure]] = {category.name: deque() for category in categories}
+        # Les prompts de chaque catégorie sont utilisés à tour de rôle pour varier les aventures
+        self._prompts = {category.name: itertools.cycle(category.prompts) for category in categories}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.served = 0
+        self.misses = 0
+        self.generated = 0
+        self.failures = 0
+
+    def take(self, prompt: str) -> Optional[Adventure]:
+        """
+        Retire une aventure du pool pour un prompt
+
+        Returns:
+            Une aventure de la catégorie du prompt, ou None si le prompt n'en a pas
+            ou si la catégorie est vide
+        """
+        category = self.classifier.classify(prompt)
+        adventures = self._adventures.get(category) if category is not None else None
+        if not adventures:
+            self.misses += 1
+            return None
+        self.served += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return adventures.popleft()
+
+    def start(self) -> None:
+        """Démarre la tâche de remplissage (à appeler depuis la boucle d'événements)"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        """Arrête la tâche de remplissage"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def refill_allowed(self) -> bool:
+        """Vrai pendant les heures creuses configurées, quand le service amont est libre"""
+        if self.refill_hours is not None:
+            start, end = self.refill_hours
+            hour = time.localtime().tm_hour
+            in_window = start <= hour < end if start <= end else (hour >= start or hour < end)
+            if not in_window:
+                return False
+        return not self.is_busy()
+
+    async def refill(self) -> int:
+        """
+        Complète les catégories les moins remplies, une génération à la fois
+
+        Returns:
+            Le nombre d'aventures ajoutées
+        """
+        added = 0
+        while self.refill_allowed():
+            name, adventures = min(self._adventures.items(), key=lambda item: len(item[1]))
+            if len(adventures) >= self.size:
+                break
+            try:
+                adventures.append(await self.generate(next(self._prompts[name])))
+            except Exception as e:
+                # Service amont en difficulté : réessayer au prochain passage
+                self.failures += 1
+                logger.warning("Remplissage du pool interrompu ({}): {}", name, str(e))
+                break
+            self.generated += 1
+            added += 1
+        return added
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            added = await self.refill()
+            if added:
+                logger.info("Pool d'aventures complété: {} nouvelles aventures", added)
+            # Réveil dès qu'une aventure est servie, sinon nouvelle tentative après l'intervalle
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.refill_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, object]:
+        """Taille de chaque catégorie et compteurs depuis le démarrage"""
+        return {
+            "size": self.size,
+            "categories": {name: len(adventures) for name, adventures in self._adventures.items()},
+            "served": self.served,
+            "misses": self.misses,
+            "generated": self.generated,
+            "failures": self.failures,
+        }
@@ -0,0 +1,338 @@
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.models.adventure import Adventure
+from app.services.embeddings import HashingEmbedder, normalize_prompt
+
+
+@dataclass
+class CacheEntry:
+    """Entrée du cache : aventure sérialisée et embedding du prompt qui l'a produite"""
+    key: str
+    embedding: np.ndarray
+    payload: str
+    expires_at: float
+
+
+class CacheBackend(ABC):
+    """Stockage des entrées du cache, borné en taille avec éviction LRU"""
+
+    # Entrées conservées entre deux démarrages (schéma éventuellement obsolète, données corrompues)
+    persistent = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Retourne l'entrée associée à la clé et la marque comme récemment utilisée"""
+
+    @abstractmethod
+    def set(self, entry: CacheEntry) -> None:
+        """Ajoute ou remplace une entrée, en évinçant la moins récemment utilisée si besoin"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Supprime une entrée si elle existe"""
+
+    @abstractmethod
+    def entries(self) -> List[CacheEntry]:
+        """Retourne toutes les entrées (pour la recherche par similarité)"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Vide le cache"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Backend en mémoire du processus"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, entry: CacheEntry) -> None:
+        self._entries[entry.key] = entry
+        self._entries.move_to_end(entry.key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def entries(self) -> List[CacheEntry]:
+        return list(self._entries.values())
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCacheBackend(CacheBackend):
+    """
+    Backend persistant sur disque (SQLite)
+
+    Le cache survit aux redémarrages et peut être partagé entre les workers
+    d'une même machine.
+    """
+
+    persistent = True
+
+    def __init__(self, path: str, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS adventure_cache (
+                key TEXT PRIMARY KEY,
+                embedding BLOB NOT NULL,
+                payload TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_adventure_cache_access ON adventure_cache (last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _to_entry(row) -> CacheEntry:
+        key, embedding, payload, expires_at = row
+        return CacheEntry(
+            key=key,
+            embedding=np.frombuffer(embedding, dtype=np.float32),
+            payload=payload,
+            expires_at=expires_at,
+        )
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT key, embedding, payload, expires_at FROM adventure_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE adventure_cache SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        return self._to_entry(row)
+
+    def set(self, entry: CacheEntry) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO adventure_cache VALUES (?, ?, ?, ?, ?)",
+                (
+                    entry.key,
+                    entry.embedding.astype(np.float32).tobytes(),
+                    entry.payload,
+                    entry.expires_at,
+                    time.time(),
+                ),
+            )
+            # Évincer les entrées les moins récemment utilisées au-delà de la taille maximale
+            self._conn.execute(
+                """
+                DELETE FROM adventure_cache WHERE key IN (
+                    SELECT key FROM adventure_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_size,),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM adventure_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def entries(self) -> List[CacheEntry]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, embedding, payload, expires_at FROM adventure_cache"
+            ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM adventure_cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM adventure_cache").fetchone()[0]
+
+
+class AdventureCache:
+    """
+    Cache sémantique des aventures générées
+
+    Une recherche tente d'abord une correspondance exacte sur le prompt
+    normalisé, puis une correspondance approchée si la similarité cosinus entre
+    les embeddings des prompts dépasse le seuil configuré.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        embedder: Optional[HashingEmbedder] = None,
+        ttl: float = 3600,
+        similarity_threshold: float = 0.9,
+    ):
+        self.backend = backend
+        self.embedder = embedder or HashingEmbedder()
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _fresh(self, entry: CacheEntry) -> bool:
+        if entry.expires_at <= time.time():
+            self.backend.delete(entry.key)
+            return False
+        return True
+
+    def _load(self, entry: CacheEntry) -> Optional[Adventure]:
+        try:
+            return Adventure.model_validate_json(entry.payload)
+        except ValidationError:
+            # Entrée corrompue ou schéma obsolète : ne jamais renvoyer une aventure invalide
+            logger.warning("Entrée de cache invalide ignorée: {}", entry.key)
+            self.backend.delete(entry.key)
+            return None
+
+    def _find_similar(self, embedding: np.ndarray) -> Optional[CacheEntry]:
+        now = time.time()
+        entries = [entry for entry in self.backend.entries() if entry.expires_at > now]
+        if not entries:
+            return None
+        scores = np.vstack([entry.embedding for entry in entries]) @ embedding
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+        # Passer par get() pour mettre à jour l'ordre LRU
+        return self.backend.get(entries[best].key)
+
+    def _lookup(self, prompt: str, parse: bool) -> Optional[Tuple[Optional[Adventure], CacheEntry]]:
+        """
+        Entrée valide pour un prompt, avec l'aventure reconstruite si `parse` est vrai
+
+        Les entrées d'un backend persistant sont toujours validées : elles ont pu
+        être écrites par une version précédente du schéma. Celles d'un backend en
+        mémoire ont été produites par ce processus à partir d'une Adventure valide.
+        """
+        key = normalize_prompt(prompt)
+        validate = parse or self.backend.persistent
+
+        entry = self.backend.get(key)
+        if entry is not None and self._fresh(entry):
+            adventure = self._load(entry) if validate else None
+            if adventure is not None or not validate:
+                self.exact_hits += 1
+                return adventure, entry
+
+        entry = self._find_similar(self.embedder.embed_one(key))
+        if entry is not None and self._fresh(entry):
+            adventure = self._load(entry) if validate else None
+            if adventure is not None or not validate:
+                self.semantic_hits += 1
+                return adventure, entry
+
+        self.misses += 1
+        return None
+
+    def get(self, prompt: str) -> Optional[Adventure]:
+        """
+        Cherche une aventure en cache pour un prompt
+
+        Args:
+            prompt: Le prompt utilisateur
+
+        Returns:
+            L'aventure validée si une entrée correspond, None sinon
+        """
+        found = self._lookup(prompt, parse=True)
+        return found[0] if found is not None else None
+
+    def get_json(self, prompt: str) -> Optional[bytes]:
+        """
+        Cherche une aventure en cache pour un prompt, sous sa forme sérialisée
+
+        Le JSON stocké est retourné tel quel, sans être sérialisé de nouveau pour
+        la réponse. Il n'est validé à la lecture que pour un backend persistant.
+
+        Returns:
+            Le JSON de l'aventure si une entrée correspond, None sinon
+        """
+        found = self._lookup(prompt, parse=False)
+        return found[1].payload.encode("utf-8") if found is not None else None
+
+    def set(self, prompt: str, adventure: Adventure) -> None:
+        """Enregistre l'aventure générée pour un prompt"""
+        key = normalize_prompt(prompt)
+        self.backend.set(
+            CacheEntry(
+                key=key,
+                embedding=self.embedder.embed_one(key),
+                payload=adventure.model_dump_json(),
+                expires_at=time.time() + self.ttl,
+            )
+        )
+
+    def stats(self) -> Dict[str, float]:
+        """Compteurs de succès et d'échecs, utiles pour ajuster le seuil de similarité"""
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "size": len(self.backend),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "similarity_threshold": self.similarity_threshold,
+        }
+
+
+def create_adventure_cache() -> Optional[AdventureCache]:
+    """
+    Crée le cache d'aventures à partir de la configuration
+
+    Returns:
+        Le cache configuré, ou None si le cache est désactivé
+    """
+    if not settings.CACHE_ENABLED:
+        return None
+
+    if settings.CACHE_BACKEND == "disk":
+        backend: CacheBackend = DiskCacheBackend(settings.CACHE_PATH, settings.CACHE_MAX_SIZE)
+    else:
+        backend = MemoryCacheBackend(settings.CACHE_MAX_SIZE)
+
+    return AdventureCache(
+        backend=backend,
+        ttl=settings.CACHE_TTL_SECONDS,
+        similarity_threshold=settings.CACHE_SIMILARITY_THRESHOLD,
+    )
@@ -0,0 +1,60 @@
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.models.adventure import Adventure, CatalogAdventure
+
+# Catalogue de démonstration utilisé quand aucun catalogue n'est configuré
+SEED_CATALOG_PATH = Path(__file__).resolve().parent.parent / "data" / "seed_adventures.json"
+
+# Champs numériques conservés en colonnes à côté des embeddings (filtres et tri géographique)
+NUMERIC_COLUMNS = ("latitude", "longitude", "duration", "distance")
+
+# Champs catégoriels indexés par listes de lignes (filtres par facettes)
+LABEL_COLUMNS = ("difficulty", "tags")
+
+
+def load_catalog(path: Optional[str] = None) -> List[CatalogAdventure]:
+    """
+    Charge un catalogue d'aventures depuis un fichier JSON (liste) ou JSONL (une aventure par ligne)
+
+    Args:
+        path: Chemin du fichier, SIMILARITY_CATALOG_PATH ou le catalogue de démonstration par défaut
+
+    Returns:
+        La liste des aventures validées
+    """
+    catalog_path = Path(path or settings.SIMILARITY_CATALOG_PATH or SEED_CATALOG_PATH)
+
+    with catalog_path.open(encoding="utf-8") as f:
+        if catalog_path.suffix == ".jsonl":
+            records = [json.loads(line) for line in f if line.strip()]
+        else:
+            records = json.load(f)
+
+    return [CatalogAdventure.model_validate(record) for record in records]
+
+
+def adventure_text(adventure: Adventure) -> str:
+    """Texte d'une aventure utilisé pour calculer son embedding"""
+    return " ".join([
+        adventure.title,
+        adventure.location,
+        " ".join(adventure.tags),
+        adventure.difficulty,
+        adventure.description,
+    ])
+
+
+def adventure_columns(adventure: Adventure) -> Dict[str, float]:
+    """Valeurs des colonnes numériques d'une aventure"""
+    return {name: float(getattr(adventure, name)) for name in NUMERIC_COLUMNS}
+
+
+def adventure_labels(adventure: Adventure) -> Dict[str, List[str]]:
+    """Valeurs des étiquettes d'une aventure, en minuscules"""
+    return {
+        "difficulty": [adventure.difficulty.lower()],
+        "tags": [tag.lower() for tag in adventure.tags],
+    }
@@ -0,0 +1,219 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from app.models.adventure import CatalogAdventure
+from app.services.catalog import LABEL_COLUMNS, NUMERIC_COLUMNS, adventure_labels, adventure_text
+from app.services.embeddings import HashingEmbedder
+from app.services.facet_index import Postings, build_postings
+from app.services.neighbor_table import NeighborTable
+from app.services.vector_index import FlatIndex, IVFIndex
+
+STORE_FORMAT_VERSION = 3
+
+
+class IdLookup:
+    """
+    Correspondance ID d'aventure -> ligne de la matrice, par recherche dichotomique
+
+    Évite de construire un dictionnaire Python de plusieurs centaines de milliers
+    d'entrées au démarrage de chaque worker.
+    """
+
+    def __init__(self, ids: np.ndarray, order: Optional[np.ndarray] = None):
+        self.order = order if order is not None else np.argsort(ids, kind="stable")
+        self.sorted_ids = ids[self.order]
+
+    def get(self, adventure_id: int) -> Optional[int]:
+        position = int(np.searchsorted(self.sorted_ids, adventure_id))
+        if position < len(self.sorted_ids) and self.sorted_ids[position] == adventure_id:
+            return int(self.order[position])
+        return None
+
+
+class TitleTable(Sequence[str]):
+    """Titres stockés en UTF-8 bout à bout, décodés à la demande"""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self._data = data
+        self._offsets = offsets
+
+    def __getitem__(self, row: int) -> str:
+        start, end = self._offsets[row], self._offsets[row + 1]
+        return self._data[start:end].tobytes().decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+
+class EmbeddingStore:
+    """
+    Catalogue d'aventures et embeddings persistés sur disque, ouverts par memmap
+
+    Format (un répertoire) :
+    - meta.json : version, nombre d'aventures, dimension, paramètres IVF éventuels
+    - embeddings.f32 : matrice float32 (count x dim) contiguë
+    - ids.i64 / id_order.i64 : IDs des aventures et permutation qui les trie
+    - titles.bin / title_offsets.i64 : titres UTF-8 et leurs positions
+    - <colonne>.f32 : une colonne numérique par champ de NUMERIC_COLUMNS (latitude, longitude...)
+    - <étiquette>.postings.i64 : listes de lignes par valeur de chaque champ de LABEL_COLUMNS,
+      bout à bout (positions de chaque valeur dans meta.json)
+    - ivf_centroids.f32 / ivf_rows.i64 / ivf_offsets.i64 : listes IVF (optionnel)
+    - neighbors.i64 / neighbor_scores.f32 : table des K plus proches voisins (optionnel)
+
+    Les fichiers sont mappés en lecture seule : l'ouverture est quasi instantanée
+    et tous les workers partagent les mêmes pages du cache système.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with (self.path / "meta.json").open(encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != STORE_FORMAT_VERSION:
+            raise ValueError(
+                f"Version de format non supportée: {self.meta.get('version')} "
+                f"(reconstruire l'index avec scripts/build_similarity_index.py)"
+            )
+
+        count, dim = self.meta["count"], self.meta["dim"]
+        self.embeddings = self._map("embeddings.f32", np.float32, (count, dim))
+        self.ids = self._map("ids.i64", np.int64, (count,))
+        self.id_lookup = IdLookup(self.ids, self._map("id_order.i64", np.int64, (count,)))
+        self.titles = TitleTable(
+            self._map("titles.bin", np.uint8),
+            self._map("title_offsets.i64", np.int64, (count + 1,))
+        )
+        self.columns = {name: self._map(f"{name}.f32", np.float32, (count,)) for name in self.meta["columns"]}
+        self.labels: Dict[str, Postings] = {}
+        for name, positions in self.meta["labels"].items():
+            postings = self._map(f"{name}.postings.i64", np.int64)
+            self.labels[name] = {value: postings[start:end] for value, (start, end) in positions.items()}
+
+    def _map(self, name: str, dtype, shape=None) -> np.ndarray:
+        file_path = self.path / name
+        if file_path.stat().st_size == 0:
+            # mmap refuse les fichiers vides (catalogue vide ou sans titre)
+            return np.zeros(shape or (0,), dtype=dtype)
+        return np.memmap(file_path, dtype=dtype, mode="r", shape=shape)
+
+    @property
+    def dim(self) -> int:
+        return self.meta["dim"]
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    def ivf_index(self, n_probe: int) -> Optional[IVFIndex]:
+        """Reconstruit l'index IVF précalculé, sans réentraînement, s'il est présent"""
+        ivf = self.meta.get("ivf")
+        if not ivf:
+            return None
+        return IVFIndex.from_parts(
+            self.embeddings,
+            centroids=self._map("ivf_centroids.f32", np.float32, (ivf["n_lists"], self.dim)),
+            rows=self._map("ivf_rows.i64", np.int64, (len(self),)),
+            offsets=self._map("ivf_offsets.i64", np.int64, (ivf["n_lists"] + 1,)),
+            n_probe=n_probe,
+        )
+
+    def neighbor_table(self) -> Optional[NeighborTable]:
+        """Table des voisins précalculée, si elle est présente"""
+        neighbors = self.meta.get("neighbors")
+        if not neighbors:
+            return None
+        shape = (len(self), neighbors["k"])
+        return NeighborTable(
+            rows=self._map("neighbors.i64", np.int64, shape),
+            scores=self._map("neighbor_scores.f32", np.float32, shape),
+        )
+
+
+def write_embedding_store(
+    path: Union[str, Path],
+    catalog: List[CatalogAdventure],
+    embedder: HashingEmbedder,
+    ivf_lists: Optional[int] = None,
+    neighbors_k: Optional[int] = None,
+) -> None:
+    """
+    Calcule les embeddings d'un catalogue et les écrit au format EmbeddingStore
+
+    Les fichiers sont écrits dans un répertoire temporaire puis mis en place par
+    renommage, pour qu'un worker ne lise jamais un index à moitié écrit.
+
+    Args:
+        path: Le répertoire de destination
+        catalog: Les aventures à indexer
+        embedder: Le modèle d'embedding (le même que celui du service)
+        ivf_lists: Nombre de listes IVF à précalculer (aucun index IVF si None)
+        neighbors_k: Nombre de voisins à précalculer par aventure (aucune table si None)
+    """
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+
+    ids = np.array([adventure.id for adventure in catalog], dtype=np.int64)
+    embeddings = np.ascontiguousarray(
+        embedder.embed(adventure_text(adventure) for adventure in catalog), dtype=np.float32
+    )
+    encoded_titles = [adventure.title.encode("utf-8") for adventure in catalog]
+    title_offsets = np.concatenate([[0], np.cumsum([len(title) for title in encoded_titles])]).astype(np.int64)
+
+    embeddings.tofile(tmp_path / "embeddings.f32")
+    ids.tofile(tmp_path / "ids.i64")
+    np.argsort(ids, kind="stable").astype(np.int64).tofile(tmp_path / "id_order.i64")
+    (tmp_path / "titles.bin").write_bytes(b"".join(encoded_titles))
+    title_offsets.tofile(tmp_path / "title_offsets.i64")
+    for name in NUMERIC_COLUMNS:
+        np.array([getattr(adventure, name) for adventure in catalog], dtype=np.float32).tofile(tmp_path / f"{name}.f32")
+    all_labels = [adventure_labels(adventure) for adventure in catalog]
+    label_positions = {}
+    for name in LABEL_COLUMNS:
+        postings = build_postings([labels[name] for labels in all_labels])
+        positions, start = {}, 0
+        for value, rows in postings.items():
+            positions[value] = [start, start + len(rows)]
+            start += len(rows)
+        label_positions[name] = positions
+        np.concatenate([np.empty(0, dtype=np.int64), *postings.values()]).tofile(tmp_path / f"{name}.postings.i64")
+
+    meta = {
+        "version": STORE_FORMAT_VERSION,
+        "count": len(catalog),
+        "dim": embedder.dim,
+        "columns": list(NUMERIC_COLUMNS),
+        "labels": label_positions,
+        "created_at": time.time(),
+        "ivf": None,
+        "neighbors": None,
+    }
+    index = FlatIndex(embeddings)
+    if ivf_lists and len(catalog) > 0:
+        index = IVFIndex(embeddings, n_lists=ivf_lists)
+        index.centroids.astype(np.float32).tofile(tmp_path / "ivf_centroids.f32")
+        index.rows.astype(np.int64).tofile(tmp_path / "ivf_rows.i64")
+        index.offsets.astype(np.int64).tofile(tmp_path / "ivf_offsets.i64")
+        meta["ivf"] = {"n_lists": int(index.centroids.shape[0])}
+    if neighbors_k:
+        table = NeighborTable.build(index, embeddings, neighbors_k)
+        table.rows.tofile(tmp_path / "neighbors.i64")
+        table.scores.tofile(tmp_path / "neighbor_scores.f32")
+        meta["neighbors"] = {"k": neighbors_k}
+
+    with (tmp_path / "meta.json").open("w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    if path.exists():
+        old_path = path.with_name(path.name + ".old")
+        shutil.rmtree(old_path, ignore_errors=True)
+        os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+    else:
+        os.replace(tmp_path, path)
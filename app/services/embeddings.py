@@ -0,0 +1,76 @@
+import re
+import unicodedata
+import zlib
+from typing import Iterable, List
+
+import numpy as np
+
+# Mots trop fréquents pour discriminer deux demandes d'aventure
+STOPWORDS = {
+    "a", "au", "aux", "autour", "avec", "ce", "ces", "dans", "de", "des", "du",
+    "en", "et", "je", "la", "le", "les", "mon", "ma", "mes", "pour", "pr", "pres",
+    "proche", "sur", "un", "une", "vers", "cherche", "veux", "voudrais",
+}
+
+# Longueur du préfixe conservé pour rapprocher les variantes d'un même mot (rando/randonnée)
+STEM_LENGTH = 5
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    Normalise un texte pour la comparaison : minuscules, sans accents ni ponctuation
+
+    Args:
+        text: Le texte à normaliser
+
+    Returns:
+        Le texte normalisé, mots séparés par un seul espace
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class HashingEmbedder:
+    """
+    Modèle d'embedding local et déterministe
+
+    Chaque texte est projeté par hachage de ses mots (tronqués) et de leurs
+    trigrammes de caractères dans un vecteur de dimension fixe, normalisé L2.
+    Aucun appel réseau : les mêmes textes donnent toujours les mêmes vecteurs,
+    ce qui le rend utilisable hors ligne et dans les tests.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = [word for word in normalize_prompt(text).split() if word not in STOPWORDS]
+        features: List[str] = []
+        for word in words:
+            features.append(f"w:{word[:STEM_LENGTH]}")
+            padded = f"<{word}>"
+            features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return features
+
+    def embed_one(self, text: str) -> np.ndarray:
+        """Calcule l'embedding normalisé d'un texte"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            digest = zlib.crc32(feature.encode("utf-8"))
+            # Le bit de poids fort donne le signe, ce qui limite le biais des collisions
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            weight = 2.0 if feature.startswith("w:") else 1.0
+            vector[digest % self.dim] += sign * weight
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        """Calcule les embeddings d'une liste de textes (une ligne par texte)"""
+        vectors = [self.embed_one(text) for text in texts]
+        if not vectors:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack(vectors)
@@ -0,0 +1,148 @@
+from dataclasses import dataclass
+from typing import Dict, Iterator, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Listes de lignes par valeur d'étiquette : postings[valeur] = lignes triées
+Postings = Dict[str, np.ndarray]
+
+
+@dataclass(frozen=True)
+class SearchFilters:
+    """
+    Critères de filtrage d'une recherche de similarité
+
+    Les difficultés sont alternatives (l'une ou l'autre), les tags sont tous
+    requis, les bornes des intervalles sont incluses. Immuable et hachable pour
+    pouvoir servir de clé de cache.
+    """
+
+    difficulty: Tuple[str, ...] = ()
+    tags: Tuple[str, ...] = ()
+    min_duration: Optional[float] = None
+    max_duration: Optional[float] = None
+    min_distance: Optional[float] = None
+    max_distance: Optional[float] = None
+
+    def __post_init__(self):
+        # Les étiquettes sont indexées en minuscules
+        object.__setattr__(self, "difficulty", tuple(sorted({value.lower() for value in self.difficulty})))
+        object.__setattr__(self, "tags", tuple(sorted({value.lower() for value in self.tags})))
+
+    def ranges(self) -> Iterator[Tuple[str, Optional[float], Optional[float]]]:
+        """Intervalles demandés, par colonne numérique"""
+        if self.min_duration is not None or self.max_duration is not None:
+            yield "duration", self.min_duration, self.max_duration
+        if self.min_distance is not None or self.max_distance is not None:
+            yield "distance", self.min_distance, self.max_distance
+
+    def is_empty(self) -> bool:
+        return not self.difficulty and not self.tags and next(self.ranges(), None) is None
+
+    def matches(self, columns: Mapping[str, float], labels: Mapping[str, Sequence[str]]) -> bool:
+        """Vrai si une aventure (colonnes numériques, étiquettes en minuscules) satisfait les critères"""
+        if self.difficulty and not set(self.difficulty) & set(labels["difficulty"]):
+            return False
+        if not set(self.tags) <= set(labels["tags"]):
+            return False
+        for name, low, high in self.ranges():
+            value = columns[name]
+            if (low is not None and value < low) or (high is not None and value > high):
+                return False
+        return True
+
+
+def build_postings(values: Sequence[Sequence[str]]) -> Postings:
+    """
+    Construit les listes de lignes de chaque valeur d'une étiquette
+
+    Args:
+        values: Les valeurs de l'étiquette pour chaque ligne (plusieurs par ligne pour les tags)
+
+    Returns:
+        Pour chaque valeur, les lignes qui la portent, triées
+    """
+    rows: Dict[str, list] = {}
+    for row, row_values in enumerate(values):
+        for value in set(row_values):
+            rows.setdefault(value, []).append(row)
+    return {value: np.array(value_rows, dtype=np.int64) for value, value_rows in rows.items()}
+
+
+def remap_postings(postings: Postings, keep: np.ndarray) -> Postings:
+    """Retire les lignes absentes de `keep` et renumérote les autres, comme après une compaction"""
+    new_rows = np.cumsum(keep) - 1
+    remapped = {}
+    for value, rows in postings.items():
+        rows = np.asarray(rows)
+        rows = new_rows[rows[keep[rows]]]
+        if len(rows):
+            remapped[value] = rows
+    return remapped
+
+
+def concat_postings(first: Postings, second: Postings, offset: int) -> Postings:
+    """Concatène les listes de deux segments, les lignes du second étant décalées de `offset`"""
+    merged = {value: np.asarray(rows) for value, rows in first.items()}
+    for value, rows in second.items():
+        shifted = np.asarray(rows) + offset
+        merged[value] = np.concatenate([merged[value], shifted]) if value in merged else shifted
+    return merged
+
+
+class FacetIndex:
+    """
+    Index des facettes d'un segment : listes de lignes par étiquette et colonnes triées
+
+    Un filtre est converti en masque booléen (bitmap) aligné sur les lignes du
+    segment, puis appliqué avant le calcul des scores : l'index vectoriel ne
+    compare la requête qu'aux aventures qui satisfont les filtres, sans
+    sur-échantillonnage ni post-filtrage.
+    """
+
+    def __init__(self, size: int, labels: Mapping[str, Postings], columns: Mapping[str, np.ndarray]):
+        self.size = size
+        self.labels = labels
+        self.columns = columns
+        # Permutation triant chaque colonne numérique, calculée à la première requête sur la colonne
+        self._sorted: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def _rows_mask(self, rows: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def _label_mask(self, name: str, values: Sequence[str]) -> np.ndarray:
+        postings = self.labels.get(name, {})
+        empty = np.empty(0, dtype=np.int64)
+        return self._rows_mask(np.concatenate([np.asarray(postings.get(value, empty)) for value in values]))
+
+    def _range_mask(self, name: str, low: Optional[float], high: Optional[float]) -> np.ndarray:
+        if name not in self._sorted:
+            order = np.argsort(self.columns[name], kind="stable")
+            self._sorted[name] = (order, np.asarray(self.columns[name])[order])
+        order, sorted_values = self._sorted[name]
+        start = 0 if low is None else np.searchsorted(sorted_values, low, side="left")
+        end = len(sorted_values) if high is None else np.searchsorted(sorted_values, high, side="right")
+        return self._rows_mask(order[start:end])
+
+    def mask(self, filters: SearchFilters) -> Optional[np.ndarray]:
+        """
+        Masque des lignes qui satisfont les filtres
+
+        Args:
+            filters: Les critères de filtrage
+
+        Returns:
+            Le masque booléen des lignes retenues, ou None si aucun filtre n'est demandé
+        """
+        if filters.is_empty():
+            return None
+        mask = np.ones(self.size, dtype=bool)
+        if filters.difficulty:
+            mask &= self._label_mask("difficulty", filters.difficulty)
+        for tag in filters.tags:
+            mask &= self._label_mask("tags", [tag])
+        for name, low, high in filters.ranges():
+            mask &= self._range_mask(name, low, high)
+        return mask
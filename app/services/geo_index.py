@@ -0,0 +1,96 @@
+import math
+from typing import Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Nombre de kilomètres par degré de latitude
+KM_PER_DEGREE = 111.32
+
+
+def haversine_km(lat: float, lon: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """
+    Distance orthodromique (en km) entre un point et un ensemble de points, vectorisée
+
+    Args:
+        lat: Latitude du point de référence
+        lon: Longitude du point de référence
+        latitudes: Latitudes des points
+        longitudes: Longitudes des points
+
+    Returns:
+        Les distances en kilomètres, alignées sur les points
+    """
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GeoGridIndex:
+    """
+    Index spatial par grille de cellules latitude/longitude
+
+    Les lignes sont triées par cellule : une recherche par rayon ne lit que les
+    cellules qui recouvrent le cercle demandé, puis filtre les candidats avec la
+    distance exacte. Une requête locale ne parcourt donc pas tout le catalogue.
+    """
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray, cell_degrees: float = 0.5):
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.cell_degrees = cell_degrees
+
+        cell_lat, cell_lon = self._cells(latitudes, longitudes)
+        keys = self._key(cell_lat, cell_lon)
+        self.rows = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.rows]
+
+    def _cells(self, latitudes, longitudes) -> Tuple[np.ndarray, np.ndarray]:
+        return (
+            np.floor((np.asarray(latitudes) + 90.0) / self.cell_degrees).astype(np.int64),
+            np.floor((np.asarray(longitudes) + 180.0) / self.cell_degrees).astype(np.int64),
+        )
+
+    @staticmethod
+    def _key(cell_lat, cell_lon):
+        return cell_lat * 1_000_000 + cell_lon
+
+    def query_radius(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Lignes situées à moins de `radius_km` du point, avec leur distance
+
+        Args:
+            lat: Latitude du centre
+            lon: Longitude du centre
+            radius_km: Rayon de recherche en kilomètres
+
+        Returns:
+            Les lignes trouvées et leurs distances en kilomètres
+        """
+        lat_span = radius_km / KM_PER_DEGREE
+        # Près des pôles, un degré de longitude se réduit : élargir la fenêtre en conséquence
+        cos_lat = max(math.cos(math.radians(min(abs(lat) + lat_span, 89.0))), 1e-6)
+        lon_span = min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+
+        (lat_min, lat_max), (lon_min, lon_max) = (
+            self._cells([lat - lat_span, lat + lat_span], [lon - lon_span, lon + lon_span])
+        )
+        n_lon_cells = int(360 / self.cell_degrees)
+        lon_cells = np.unique(np.arange(lon_min, lon_max + 1) % n_lon_cells)
+
+        slices = []
+        for cell_lat in range(int(lat_min), int(lat_max) + 1):
+            keys = self._key(cell_lat, lon_cells)
+            starts = np.searchsorted(self.sorted_keys, keys, side="left")
+            ends = np.searchsorted(self.sorted_keys, keys, side="right")
+            slices.extend(self.rows[start:end] for start, end in zip(starts, ends) if end > start)
+
+        if not slices:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        candidates = np.concatenate(slices)
+        distances = haversine_km(lat, lon, self.latitudes[candidates], self.longitudes[candidates])
+        within = distances <= radius_km
+        return candidates[within], distances[within].astype(np.float32)
@@ -0,0 +1,517 @@
+import asyncio
+import itertools
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.exceptions import EmaAIException, JobNotFoundError, OpenAIError, ServiceOverloadedError
+from app.core.responses import json_bytes
+from app.models.adventure import Adventure
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Intervalle de consultation du stockage quand la tâche est exécutée par un autre processus
+POLL_INTERVAL_SECONDS = 0.5
+
+T = TypeVar("T")
+
+
+@dataclass
+class Job:
+    """Tâche de génération : prompt, état et résultat (aventure sérialisée ou erreur)"""
+    id: str
+    prompt: str
+    priority: int
+    status: str
+    created_at: float
+    updated_at: float
+    result: Optional[str] = None
+    error_code: Optional[str] = None
+    error_message: Optional[str] = None
+    attempts: int = 0
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+
+class JobStore(ABC):
+    """Stockage des tâches de génération"""
+
+    # Un stockage bloquant (E/S disque) est appelé hors de la boucle d'événements
+    blocking = False
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        """Retourne la tâche, ou None si elle n'existe pas"""
+
+    @abstractmethod
+    def save(self, job: Job) -> None:
+        """Ajoute ou remplace une tâche"""
+
+    @abstractmethod
+    def claim(self, job_id: str) -> Optional[Job]:
+        """Passe une tâche en attente à l'état en cours ; None si elle n'est plus en attente"""
+
+    @abstractmethod
+    def pending(self) -> List[Job]:
+        """Retourne les tâches en attente (reprises au démarrage)"""
+
+    @abstractmethod
+    def count_pending(self) -> int:
+        """Nombre de tâches en attente, tous processus confondus pour un stockage partagé"""
+
+    @abstractmethod
+    def requeue_running(self, before: float) -> List[Job]:
+        """Remet en attente les tâches en cours depuis avant cette date (processus arrêté brutalement), et les retourne"""
+
+    @abstractmethod
+    def purge(self, before: float) -> int:
+        """Supprime les tâches terminées avant cette date, et retourne leur nombre"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class MemoryJobStore(JobStore):
+    """Stockage en mémoire du processus"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def save(self, job: Job) -> None:
+        self._jobs[job.id] = job
+
+    def claim(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None or job.status != PENDING:
+            return None
+        job.status = RUNNING
+        job.updated_at = time.time()
+        return job
+
+    def pending(self) -> List[Job]:
+        return [job for job in self._jobs.values() if job.status == PENDING]
+
+    def count_pending(self) -> int:
+        return sum(job.status == PENDING for job in self._jobs.values())
+
+    def requeue_running(self, before: float) -> List[Job]:
+        stale = [job for job in self._jobs.values() if job.status == RUNNING and job.updated_at < before]
+        for job in stale:
+            job.status = PENDING
+            job.updated_at = time.time()
+        return stale
+
+    def purge(self, before: float) -> int:
+        expired = [job.id for job in self._jobs.values() if job.done and job.updated_at < before]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Stockage persistant sur disque (SQLite)
+
+    Les tâches en attente survivent aux redémarrages, et les résultats sont
+    visibles de tous les workers d'une même machine.
+    """
+
+    blocking = True
+    COLUMNS = "id, prompt, priority, status, created_at, updated_at, result, error_code, error_message, attempts"
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS generation_jobs (
+                id TEXT PRIMARY KEY,
+                prompt TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                result TEXT,
+                error_code TEXT,
+                error_message TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        # Stockage créé par une version précédente, sans le nombre d'essais
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(generation_jobs)")}
+        if "attempts" not in columns:
+            self._conn.execute("ALTER TABLE generation_jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_generation_jobs_status ON generation_jobs (status, updated_at)"
+        )
+        self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {self.COLUMNS} FROM generation_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return Job(*row) if row is not None else None
+
+    def save(self, job: Job) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO generation_jobs ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job.id, job.prompt, job.priority, job.status, job.created_at, job.updated_at,
+                    job.result, job.error_code, job.error_message, job.attempts,
+                ),
+            )
+            self._conn.commit()
+
+    def claim(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            # Mise à jour conditionnelle : un seul processus obtient la tâche
+            claimed = self._conn.execute(
+                "UPDATE generation_jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, time.time(), job_id, PENDING),
+            ).rowcount
+            self._conn.commit()
+        return self.get(job_id) if claimed else None
+
+    def pending(self) -> List[Job]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {self.COLUMNS} FROM generation_jobs WHERE status = ? ORDER BY created_at", (PENDING,)
+            ).fetchall()
+        return [Job(*row) for row in rows]
+
+    def count_pending(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM generation_jobs WHERE status = ?", (PENDING,)
+            ).fetchone()[0]
+
+    def requeue_running(self, before: float) -> List[Job]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {self.COLUMNS} FROM generation_jobs WHERE status = ? AND updated_at < ?", (RUNNING, before)
+            ).fetchall()
+            requeued = []
+            for row in rows:
+                # Mise à jour conditionnelle : la tâche a pu se terminer entre-temps
+                if self._conn.execute(
+                    "UPDATE generation_jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                    (PENDING, time.time(), row[0], RUNNING),
+                ).rowcount:
+                    requeued.append(Job(*row))
+            self._conn.commit()
+        for job in requeued:
+            job.status = PENDING
+        return requeued
+
+    def purge(self, before: float) -> int:
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM generation_jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (SUCCEEDED, FAILED, before),
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM generation_jobs").fetchone()[0]
+
+
+class JobQueue:
+    """
+    File de tâches de génération exécutées par un pool de workers asyncio
+
+    Les tâches de plus haute priorité passent en premier, puis par ordre
+    d'arrivée. Au-delà de max_pending tâches en attente dans le stockage (tous
+    les workers pour un stockage partagé), les nouvelles sont refusées
+    (ServiceOverloadedError) plutôt que d'allonger la file sans fin.
+
+    Une tâche refusée temporairement par le service amont (circuit ouvert,
+    surcharge : erreur avec Retry-After) est remise en attente après ce délai,
+    ou une attente exponentielle si elle est plus longue, jusqu'à max_attempts
+    essais. Une tâche restée en cours plus de running_timeout secondes
+    (processus arrêté brutalement) est remise en attente, et les tâches
+    terminées depuis plus de ttl secondes sont supprimées, par une tâche de
+    maintenance toutes les maintenance_interval secondes.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        run: Callable[[str], Awaitable[Adventure]],
+        workers: int = 4,
+        max_pending: int = 1000,
+        ttl: float = 3600,
+        max_attempts: int = 5,
+        retry_backoff: float = 2,
+        running_timeout: float = 600,
+        maintenance_interval: float = 60,
+    ):
+        self.store = store
+        self.run = run
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.running_timeout = running_timeout
+        self.maintenance_interval = maintenance_interval
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._order = itertools.count()
+        self._tasks: List[asyncio.Task] = []
+        # Remises en file différées des tâches refusées temporairement
+        self._retries: Dict[str, asyncio.TimerHandle] = {}
+        # Tâches de ce processus encore en cours : débloque les clients en long polling
+        self._events: Dict[str, asyncio.Event] = {}
+        self.running = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+
+    def start(self) -> None:
+        """Démarre les workers et la maintenance, qui reprend les tâches restées en attente ou abandonnées en cours"""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._maintain())]
+        self._tasks += [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def aclose(self) -> None:
+        """Arrête les workers ; les tâches non commencées restent en attente dans le stockage"""
+        for handle in self._retries.values():
+            handle.cancel()
+        self._retries.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._events.clear()
+
+    async def _store_call(self, method: Callable[..., T], *args: Any) -> T:
+        """Appelle le stockage, dans un thread s'il est bloquant (transaction SQLite)"""
+        if self.store.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    def _enqueue(self, job: Job) -> None:
+        self._events.setdefault(job.id, asyncio.Event())
+        self._queue.put_nowait((-job.priority, next(self._order), job.id))
+
+    async def _maintain(self) -> None:
+        """Reprise des tâches en attente au démarrage, puis purge et reprise des tâches abandonnées"""
+        await self._store_call(self.store.requeue_running, time.time() - self.running_timeout)
+        for job in await self._store_call(self.store.pending):
+            # Les tâches soumises depuis le démarrage sont déjà en file
+            if job.id not in self._events:
+                self._enqueue(job)
+        while True:
+            await asyncio.sleep(self.maintenance_interval)
+            now = time.time()
+            try:
+                await self._store_call(self.store.purge, now - self.ttl)
+                for stale in await self._store_call(self.store.requeue_running, now - self.running_timeout):
+                    logger.warning("Tâche de génération {} abandonnée en cours, remise en attente", stale.id)
+                    self._enqueue(stale)
+            except Exception:
+                logger.exception("Échec de la maintenance de la file de génération")
+
+    async def submit(self, prompt: str, priority: int = 0) -> Job:
+        """
+        Ajoute une tâche de génération à la file
+
+        Args:
+            prompt: Le prompt utilisateur
+            priority: Priorité de la tâche (les plus élevées sont traitées d'abord)
+
+        Returns:
+            La tâche créée, en attente
+
+        Raises:
+            ServiceOverloadedError: Si le stockage a atteint max_pending tâches en attente
+        """
+        self.start()
+        if await self._store_call(self.store.count_pending) >= self.max_pending:
+            raise ServiceOverloadedError("Trop de générations en attente, réessayez plus tard", retry_after=5)
+
+        now = time.time()
+        job = Job(id=uuid.uuid4().hex, prompt=prompt, priority=priority, status=PENDING, created_at=now, updated_at=now)
+        await self._store_call(self.store.save, job)
+        self._enqueue(job)
+        return job
+
+    async def get(self, job_id: str) -> Job:
+        """
+        Retourne une tâche
+
+        Raises:
+            JobNotFoundError: Si la tâche n'existe pas ou a expiré
+        """
+        job = await self._store_call(self.store.get, job_id)
+        if job is None:
+            raise JobNotFoundError(job_id)
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Job:
+        """
+        Attend la fin d'une tâche, au plus timeout secondes (long polling)
+
+        Returns:
+            La tâche, terminée ou non à l'expiration du délai
+
+        Raises:
+            JobNotFoundError: Si la tâche n'existe pas ou a expiré
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        job = await self.get(job_id)
+        while not job.done:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            event = self._events.get(job_id)
+            if event is None:
+                # Tâche d'un autre processus (stockage partagé) : consulter le stockage périodiquement
+                await asyncio.sleep(min(remaining, POLL_INTERVAL_SECONDS))
+            else:
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            job = await self.get(job_id)
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job_id = await self._queue.get()
+            requeued = False
+            try:
+                job = await self._store_call(self.store.claim, job_id)
+                if job is not None:
+                    requeued = await self._execute(job)
+            finally:
+                # Tâche remise en file : les clients en long polling continuent d'attendre
+                if not requeued:
+                    event = self._events.pop(job_id, None)
+                    if event is not None:
+                        event.set()
+                self._queue.task_done()
+
+    def _retry_delay(self, job: Job, exc: EmaAIException) -> Optional[float]:
+        """Délai avant un nouvel essai si le refus est temporaire et qu'il reste des essais, None sinon"""
+        if not isinstance(exc, (OpenAIError, ServiceOverloadedError)) or exc.retry_after is None:
+            return None
+        if job.attempts >= self.max_attempts:
+            return None
+        return max(float(exc.retry_after), self.retry_backoff * 2 ** (job.attempts - 1))
+
+    def _requeue_later(self, job: Job, delay: float) -> None:
+        def requeue() -> None:
+            self._retries.pop(job.id, None)
+            if self._queue is not None:
+                self._enqueue(job)
+
+        self._retries[job.id] = asyncio.get_running_loop().call_later(delay, requeue)
+
+    async def _execute(self, job: Job) -> bool:
+        """Exécute une tâche ; retourne True si elle est remise en file pour un nouvel essai"""
+        self.running += 1
+        job.attempts += 1
+        requeued = False
+        try:
+            adventure = await self.run(job.prompt)
+            job.status = SUCCEEDED
+            job.result = json_bytes(adventure).decode("utf-8")
+            self.succeeded += 1
+        except asyncio.CancelledError:
+            # Arrêt du service : la tâche sera reprise au prochain démarrage (stockage persistant)
+            job.status = PENDING
+            job.attempts -= 1
+            raise
+        except EmaAIException as exc:
+            delay = self._retry_delay(job, exc)
+            if delay is not None:
+                # Refus temporaire (circuit ouvert, surcharge) : attendre plutôt qu'échouer
+                logger.info("Tâche de génération {} refusée ({}), nouvel essai dans {:.0f}s", job.id, exc.error_code, delay)
+                job.status = PENDING
+                self.retried += 1
+                requeued = True
+                self._requeue_later(job, delay)
+            else:
+                job.status = FAILED
+                job.error_code, job.error_message = exc.error_code, exc.detail
+                self.failed += 1
+        except Exception as e:
+            logger.exception("Échec inattendu de la tâche de génération {}", job.id)
+            job.status = FAILED
+            job.error_code, job.error_message = "INTERNAL_ERROR", str(e)
+            self.failed += 1
+        finally:
+            self.running -= 1
+            job.updated_at = time.time()
+            await self._store_call(self.store.save, job)
+        return requeued
+
+    async def stats(self) -> Dict[str, int]:
+        """Profondeur de la file et compteurs des tâches depuis le démarrage"""
+        return {
+            "workers": self.workers,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "max_pending": self.max_pending,
+            "running": self.running,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+            "waiting_retry": len(self._retries),
+            "stored": await self._store_call(len, self.store),
+        }
+
+
+def create_job_queue(run: Callable[[str], Awaitable[Adventure]]) -> JobQueue:
+    """
+    Crée la file de tâches de génération à partir de la configuration
+
+    Args:
+        run: Génère l'aventure d'un prompt (ex: AdventureGenerator.generate_adventure)
+
+    Returns:
+        La file configurée, dont les workers démarrent à la première tâche ou avec start()
+    """
+    if settings.JOB_STORE == "sqlite":
+        store: JobStore = SQLiteJobStore(settings.JOB_STORE_PATH)
+    else:
+        store = MemoryJobStore()
+
+    return JobQueue(
+        store=store,
+        run=run,
+        workers=settings.JOB_WORKERS,
+        max_pending=settings.JOB_MAX_PENDING,
+        ttl=settings.JOB_TTL_SECONDS,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        retry_backoff=settings.JOB_RETRY_BACKOFF_SECONDS,
+        running_timeout=settings.JOB_RUNNING_TIMEOUT_SECONDS,
+        maintenance_interval=settings.JOB_MAINTENANCE_INTERVAL_SECONDS,
+    )
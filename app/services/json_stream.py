@@ -0,0 +1,76 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class IncrementalJSONParser:
+    """
+    Parser incrémental d'un objet JSON reçu par morceaux
+
+    Chaque appel à feed() retourne les champs de premier niveau dont la valeur
+    est complète, sans attendre la fin de l'objet. Le texte qui précède la
+    première accolade (prose, balise ```json) est ignoré.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Ajoute un morceau de texte et retourne les nouveaux champs complets
+
+        Args:
+            chunk: Le morceau de texte reçu du modèle
+
+        Returns:
+            La liste des couples (nom, valeur) terminés dans ce morceau
+        """
+        self.text += chunk
+        fields: List[Tuple[str, Any]] = []
+
+        while self._pos < len(self.text) and not self.done:
+            char = self.text[self._pos]
+
+            if self._member_start is None:
+                # Ignorer tout ce qui précède l'objet
+                if char == "{":
+                    self._depth = 1
+                    self._member_start = self._pos + 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    fields.extend(self._parse_member(self._member_start, self._pos))
+                    self.done = True
+            elif char == "," and self._depth == 1:
+                fields.extend(self._parse_member(self._member_start, self._pos))
+                self._member_start = self._pos + 1
+
+            self._pos += 1
+
+        return fields
+
+    def _parse_member(self, start: int, end: int) -> List[Tuple[str, Any]]:
+        member = self.text[start:end].strip()
+        if not member:
+            return []
+        try:
+            return list(json.loads("{" + member + "}").items())
+        except json.JSONDecodeError:
+            # Champ mal formé : le parsing final de la réponse complète signalera l'erreur
+            return []
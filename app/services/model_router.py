@@ -0,0 +1,212 @@
+import asyncio
+import re
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+import numpy as np
+from loguru import logger
+
+from app.core.config import settings
+from app.core.exceptions import OpenAIError
+
+T = TypeVar("T")
+
+# Mots qui signalent une demande riche (plusieurs étapes, contraintes, logistique)
+COMPLEX_KEYWORDS = (
+    "itinéraire", "étapes", "plusieurs jours", "week-end", "bivouac", "nuit", "matériel",
+    "accessible", "enfants", "budget", "transport", "train", "saison", "hiver", "alternative",
+)
+
+_CONSTRAINT_SEPARATORS = re.compile(r",|;| et | avec | sans | mais | ou ")
+
+
+def prompt_complexity(prompt: str) -> float:
+    """
+    Score de complexité d'un prompt entre 0 et 1
+
+    Heuristique sans appel au modèle : longueur, nombre de contraintes
+    (séparateurs, nombres) et mots-clés qui demandent plus de raisonnement.
+    """
+    text = prompt.lower()
+    words = len(text.split())
+    constraints = len(_CONSTRAINT_SEPARATORS.findall(text)) + len(re.findall(r"\d+", text))
+    keywords = sum(keyword in text for keyword in COMPLEX_KEYWORDS)
+    score = min(words / 60, 1.0) * 0.4 + min(constraints / 6, 1.0) * 0.3 + min(keywords / 3, 1.0) * 0.3
+    return round(score, 3)
+
+
+class LatencyTracker:
+    """Latences récentes et erreurs de chaque modèle, sur une fenêtre glissante"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._calls: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+
+    def record(self, model: str, seconds: float) -> None:
+        self._latencies.setdefault(model, deque(maxlen=self.window)).append(seconds)
+        self._calls[model] = self._calls.get(model, 0) + 1
+
+    def record_error(self, model: str) -> None:
+        self._calls[model] = self._calls.get(model, 0) + 1
+        self._errors[model] = self._errors.get(model, 0) + 1
+
+    def percentile(self, model: str, q: float) -> Optional[float]:
+        """Percentile `q` (0-100) des latences récentes, ou None sans mesure"""
+        latencies = self._latencies.get(model)
+        if not latencies:
+            return None
+        return float(np.percentile(latencies, q))
+
+    def stats(self, model: str) -> Dict[str, Optional[float]]:
+        return {
+            "calls": self._calls.get(model, 0),
+            "errors": self._errors.get(model, 0),
+            "p50": self.percentile(model, 50),
+            "p95": self.percentile(model, 95),
+        }
+
+
+class ModelRouter:
+    """
+    Choix du modèle de chaque génération, avec requête de couverture (hedging) et repli
+
+    Les modèles sont donnés du plus rapide au plus capable. Un prompt simple va
+    au plus rapide, un prompt complexe au plus capable. Si le p95 observé du
+    modèle choisi dépasse le budget de latence, un modèle qui le respecte passe
+    devant. Quand le modèle principal tarde au-delà du délai de couverture, un
+    modèle dont le p95 tient dans le budget restant est lancé en parallèle et la
+    première réponse l'emporte ; s'il n'y en a pas, le modèle principal est
+    attendu. En cas d'erreur, le suivant prend le relais immédiatement, de
+    préférence un modèle qui tient dans le budget restant.
+    """
+
+    def __init__(
+        self,
+        models: List[str],
+        complexity_threshold: Optional[float] = None,
+        latency_budget: Optional[float] = None,
+        hedge_delay: Optional[float] = None,
+        tracker: Optional[LatencyTracker] = None,
+    ):
+        if not models:
+            raise ValueError("Le routeur a besoin d'au moins un modèle")
+        self.models = models
+        self.complexity_threshold = (
+            complexity_threshold if complexity_threshold is not None else settings.ROUTER_COMPLEXITY_THRESHOLD
+        )
+        self.latency_budget = latency_budget if latency_budget is not None else settings.ROUTER_LATENCY_BUDGET_SECONDS
+        self.hedge_delay = hedge_delay if hedge_delay is not None else settings.ROUTER_HEDGE_DELAY_SECONDS
+        self.tracker = tracker or LatencyTracker(settings.ROUTER_LATENCY_WINDOW)
+
+    def choose(self, prompt: str) -> List[str]:
+        """
+        Ordre dans lequel essayer les modèles pour un prompt
+
+        Returns:
+            Les modèles, le modèle principal en premier
+        """
+        order = list(self.models)
+        if prompt_complexity(prompt) >= self.complexity_threshold:
+            order.reverse()
+
+        primary_p95 = self.tracker.percentile(order[0], 95)
+        if primary_p95 is not None and primary_p95 > self.latency_budget:
+            for model in order[1:]:
+                p95 = self.tracker.percentile(model, 95)
+                if p95 is None or p95 <= self.latency_budget:
+                    order.remove(model)
+                    order.insert(0, model)
+                    break
+        return order
+
+    def _hedge_after(self, model: str) -> float:
+        """Délai avant de lancer le modèle suivant : fixé, sinon le p95 du modèle, borné par le budget"""
+        if self.hedge_delay > 0:
+            return self.hedge_delay
+        p95 = self.tracker.percentile(model, 95)
+        return min(p95, self.latency_budget) if p95 is not None else self.latency_budget
+
+    def _within_budget(self, models: List[str], elapsed: float) -> Optional[str]:
+        """Premier modèle dont le p95 tient dans le budget restant (un modèle sans mesure est essayé)"""
+        for model in models:
+            p95 = self.tracker.percentile(model, 95)
+            if p95 is None or p95 <= self.latency_budget - elapsed:
+                return model
+        return None
+
+    async def _attempt(self, model: str, call: Callable[[str], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        try:
+            result = await call(model)
+        except asyncio.CancelledError:
+            raise
+        except OpenAIError as error:
+            # Refus immédiat (circuit ouvert, limite de concurrence) : le modèle n'a pas été appelé
+            if error.retry_after is None:
+                self.tracker.record_error(model)
+            raise
+        except Exception:
+            self.tracker.record_error(model)
+            raise
+        self.tracker.record(model, time.perf_counter() - start)
+        return result
+
+    async def run(self, prompt: str, call: Callable[[str], Awaitable[T]]) -> T:
+        """
+        Exécute un appel au modèle choisi, avec couverture et repli
+
+        Args:
+            prompt: Le prompt utilisateur (détermine l'ordre des modèles)
+            call: Fonction asynchrone qui appelle un modèle donné par son nom
+
+        Returns:
+            Le résultat du premier appel réussi
+
+        Raises:
+            Exception: L'erreur du dernier modèle essayé si tous ont échoué
+        """
+        remaining = self.choose(prompt)
+        pending: Dict[asyncio.Task, str] = {}
+        last_error: Optional[BaseException] = None
+        start = time.perf_counter()
+        hedging = True
+
+        def launch(model: str) -> None:
+            remaining.remove(model)
+            pending[asyncio.ensure_future(self._attempt(model, call))] = model
+
+        launch(remaining[0])
+        try:
+            while pending:
+                # Tant qu'un modèle de couverture reste possible, ne pas attendre au-delà du délai de couverture
+                timeout = self._hedge_after(next(iter(pending.values()))) if remaining and hedging else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    model = self._within_budget(remaining, time.perf_counter() - start)
+                    if model is None:
+                        # Les modèles restants sont plus lents : une couverture arriverait après le principal
+                        logger.info("Modèle {} lent, aucun modèle plus rapide pour le couvrir", list(pending.values()))
+                        hedging = False
+                        continue
+                    logger.info("Modèle {} lent, requête de couverture vers {}", list(pending.values()), model)
+                    launch(model)
+                    continue
+                for task in done:
+                    model = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                    logger.warning("Échec du modèle {}: {}", model, last_error)
+                if remaining:
+                    launch(self._within_budget(remaining, time.perf_counter() - start) or remaining[0])
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Latences et erreurs observées par modèle"""
+        return {model: self.tracker.stats(model) for model in self.models}
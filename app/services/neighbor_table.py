@@ -0,0 +1,63 @@
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from app.services.vector_index import FlatIndex, IVFIndex
+
+# Nombre de requêtes scorées ensemble lors de la construction de la table
+BUILD_BATCH_SIZE = 256
+
+
+class NeighborTable:
+    """
+    Table précalculée des K plus proches voisins de chaque ligne du segment principal
+
+    Une recherche sans filtre pour k <= K devient une simple lecture de ligne,
+    sans calcul de score. La table est liée à un segment principal : elle est
+    recalculée après chaque compaction.
+    """
+
+    def __init__(self, rows: np.ndarray, scores: np.ndarray):
+        self.rows = rows
+        self.scores = scores
+
+    @property
+    def k(self) -> int:
+        return self.rows.shape[1]
+
+    @classmethod
+    def build(
+        cls,
+        index: Union[FlatIndex, IVFIndex],
+        vectors: np.ndarray,
+        k: int,
+        allowed: Optional[np.ndarray] = None,
+    ) -> "NeighborTable":
+        """
+        Calcule les k voisins de chaque ligne, par lots de requêtes
+
+        Args:
+            index: L'index du segment (exact ou IVF)
+            vectors: Les vecteurs du segment
+            k: Le nombre de voisins conservés par ligne
+            allowed: Masque des lignes non supprimées (toutes si None)
+
+        Returns:
+            La table ; les places sans voisin ont un score -inf
+        """
+        n = vectors.shape[0]
+        rows = np.zeros((n, k), dtype=np.int64)
+        scores = np.full((n, k), -np.inf, dtype=np.float32)
+        for start in range(0, n, BUILD_BATCH_SIZE):
+            queries = np.asarray(vectors[start:start + BUILD_BATCH_SIZE], dtype=np.float32)
+            excludes = list(range(start, start + queries.shape[0]))
+            batch_rows, batch_scores = index.search_many(queries, k, excludes=excludes, allowed=allowed)
+            rows[start:start + queries.shape[0], :batch_rows.shape[1]] = batch_rows
+            scores[start:start + queries.shape[0], :batch_scores.shape[1]] = batch_scores
+        return cls(rows, scores)
+
+    def lookup(self, row: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Les k premiers voisins précalculés d'une ligne et leurs scores, par score décroissant"""
+        rows, scores = self.rows[row, :k], self.scores[row, :k]
+        finite = np.isfinite(scores)
+        return np.asarray(rows[finite]), np.asarray(scores[finite])
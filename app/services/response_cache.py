@@ -0,0 +1,67 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class ResponseCache:
+    """
+    Cache LRU de réponses déjà sérialisées (octets JSON)
+
+    Une réponse en cache est renvoyée telle quelle : ni recherche, ni
+    construction de modèles pydantic, ni sérialisation. Chaque entrée peut
+    porter des métadonnées qui permettent de n'invalider que les réponses
+    concernées par une mise à jour (voir invalidate).
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, payload: bytes, meta: Any = None) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (payload, meta)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def invalidate(self, stale: Callable[[Any], bool]) -> int:
+        """
+        Retire les entrées périmées
+
+        Args:
+            stale: Reçoit les métadonnées d'une entrée et indique si elle est périmée.
+                Une entrée sans métadonnées est toujours retirée.
+
+        Returns:
+            Le nombre d'entrées retirées
+        """
+        keys = [key for key, (_, meta) in self._entries.items() if meta is None or stale(meta)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
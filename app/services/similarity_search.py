@@ -1,79 +1,738 @@
-from app.models.adventure import SimilarAdventure, SimilarAdventuresResponse
+from app.models.adventure import Adventure, CatalogAdventure, SimilarAdventure, SimilarAdventuresResponse
+from app.core.config import settings
 from app.core.exceptions import AdventureNotFoundError
+from app.core.responses import json_bytes
+from app.core.metrics import CACHE_REQUESTS, STAGE_LATENCY, time_stage
+from app.services.catalog import (
+    LABEL_COLUMNS,
+    NUMERIC_COLUMNS,
+    adventure_columns,
+    adventure_labels,
+    adventure_text,
+    load_catalog
+)
+from app.services.embedding_store import EmbeddingStore, IdLookup
+from app.services.embeddings import HashingEmbedder
+from app.services.facet_index import FacetIndex, Postings, SearchFilters, build_postings, concat_postings, remap_postings
+from app.services.geo_index import GeoGridIndex, haversine_km
+from app.services.neighbor_table import NeighborTable
+from app.services.response_cache import ResponseCache
+from app.services.vector_index import DeltaSegment, FlatIndex, IVFIndex, top_k
 from loguru import logger
-from typing import List
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple, Union
+import asyncio
+import numpy as np
+import time
+
+class MainSegment:
+    """
+    Segment principal du catalogue : colonnes alignées sur la matrice d'embeddings et son index
+
+    Les suppressions sont des pierres tombales (masque `alive`), appliquées
+    définitivement à la prochaine compaction.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        titles: Sequence[str],
+        embeddings: np.ndarray,
+        index: Union[FlatIndex, IVFIndex],
+        columns: Dict[str, np.ndarray],
+        labels: Dict[str, Postings],
+        id_lookup: Optional[IdLookup] = None
+    ):
+        self.ids = ids
+        self.titles = titles
+        self.embeddings = embeddings
+        self.index = index
+        self.columns = columns
+        self.labels = labels
+        self.facet_index = FacetIndex(len(ids), labels, columns)
+        self.id_lookup = id_lookup or IdLookup(ids)
+        # Alloué à la première suppression : pas de masque à appliquer tant que rien n'est supprimé
+        self.alive: Optional[np.ndarray] = None
+        # Construit à la première requête géographique
+        self._geo_index: Optional[GeoGridIndex] = None
+        # Voisins précalculés (voir SimilaritySearch.build_neighbor_table)
+        self.neighbors: Optional[NeighborTable] = None
+
+    def __len__(self) -> int:
+        return len(self.ids) - (0 if self.alive is None else int((~self.alive).sum()))
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self.embeddings
+
+    def vector(self, row: int) -> np.ndarray:
+        return self.embeddings[row]
+
+    def column(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def row_of(self, adventure_id: int) -> Optional[int]:
+        row = self.id_lookup.get(adventure_id)
+        if row is None or (self.alive is not None and not self.alive[row]):
+            return None
+        return row
+
+    def remove(self, adventure_id: int) -> bool:
+        row = self.row_of(adventure_id)
+        if row is None:
+            return False
+        if self.alive is None:
+            self.alive = np.ones(len(self.ids), dtype=bool)
+        self.alive[row] = False
+        return True
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        exclude: Optional[int] = None,
+        allowed: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if self.alive is not None:
+            allowed = self.alive if allowed is None else allowed & self.alive
+        if allowed is not None and isinstance(self.index, IVFIndex):
+            rows = np.flatnonzero(allowed)
+            # Filtre sélectif : les listes sondées contiendraient trop peu de candidats,
+            # un parcours exact des lignes retenues est à la fois plus juste et plus rapide
+            if len(rows) <= settings.SIMILARITY_IVF_MIN_SIZE:
+                if exclude is not None:
+                    rows = rows[rows != exclude]
+                scores = self.embeddings[rows] @ query
+                best = top_k(scores, k)
+                return rows[best], scores[best]
+        return self.index.search(query, k, exclude=exclude, allowed=allowed)
+
+    def search_many(
+        self,
+        queries: np.ndarray,
+        k: int,
+        excludes: Optional[Sequence[Optional[int]]] = None,
+        allowed: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if isinstance(self.index, IVFIndex):
+            # Chaque requête sonde des listes différentes : pas de produit matriciel commun
+            best_rows = np.zeros((queries.shape[0], k), dtype=np.int64)
+            best_scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+            for i, query in enumerate(queries):
+                rows, scores = self.search(query, k, exclude=excludes[i] if excludes else None, allowed=allowed)
+                best_rows[i, :len(rows)] = rows
+                best_scores[i, :len(rows)] = scores
+            return best_rows, best_scores
+        if self.alive is not None:
+            allowed = self.alive if allowed is None else allowed & self.alive
+        return self.index.search_many(queries, k, excludes=excludes, allowed=allowed)
+
+    def precomputed_search(self, row: int, k: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Voisins d'une ligne lus dans la table précalculée
+
+        Retourne None si la table ne peut pas répondre exactement : table absente,
+        k trop grand, ou voisin supprimé depuis le calcul de la table.
+        """
+        if self.neighbors is None or k > self.neighbors.k:
+            return None
+        rows, scores = self.neighbors.lookup(row, k)
+        if self.alive is not None and not self.alive[rows].all():
+            return None
+        return rows, scores
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Lignes non supprimées à moins de `radius_km` du point, avec leur distance"""
+        if self._geo_index is None:
+            self._geo_index = GeoGridIndex(
+                self.columns["latitude"],
+                self.columns["longitude"],
+                cell_degrees=settings.SIMILARITY_GEO_CELL_DEGREES
+            )
+        rows, distances = self._geo_index.query_radius(lat, lon, radius_km)
+        if self.alive is not None:
+            keep = self.alive[rows]
+            rows, distances = rows[keep], distances[keep]
+        return rows, distances
+
+@dataclass
+class CachedSearch:
+    """
+    Ce dont dépend une réponse en cache
+
+    Une aventure ajoutée ne la change que si elle satisfait ses filtres, se
+    trouve dans son rayon et obtient un score au moins égal au plancher (score
+    du k-ième résultat, ou score minimal s'il y a moins de k résultats). Une
+    aventure retirée ou remplacée ne la change que si elle en est la référence
+    ou l'un des résultats.
+    """
+    query_id: int
+    query: np.ndarray
+    result_ids: FrozenSet[int]
+    floor: float
+    filters: Optional[SearchFilters] = None
+    geo: Optional[Tuple[float, float, float]] = None  # centre et rayon (km) d'une recherche géographique
+
+    def involves(self, adventure_id: int) -> bool:
+        return adventure_id == self.query_id or adventure_id in self.result_ids
+
+    def reachable_by(self, vector: np.ndarray, columns: Dict[str, float], labels: Dict[str, List[str]]) -> bool:
+        """Vrai si une nouvelle aventure pourrait entrer dans les résultats"""
+        if self.filters is not None and not self.filters.matches(columns, labels):
+            return False
+        score = float(vector @ self.query)
+        if self.geo is not None:
+            latitude, longitude, radius_km = self.geo
+            distance = float(haversine_km(
+                latitude, longitude, np.array([columns["latitude"]]), np.array([columns["longitude"]])
+            )[0])
+            if distance > radius_km or score <= settings.SIMILARITY_MIN_SCORE:
+                return False
+            weight = settings.SIMILARITY_GEO_WEIGHT
+            score = (1 - weight) * score + weight * (1 - distance / radius_km)
+        return score >= self.floor
 
 class SimilaritySearch:
     """
     Service pour rechercher des aventures similaires
-    
-    Note: Pour le MVP, cette classe simule la recherche de similarité.
-    Dans une version future, elle pourrait utiliser des embeddings et une base vectorielle.
+
+    Les aventures du catalogue sont représentées par les embeddings de leur texte,
+    stockés dans une matrice float32 contiguë. La similarité entre deux aventures
+    est le cosinus entre leurs embeddings. Au-delà de SIMILARITY_IVF_MIN_SIZE
+    aventures, un index approché (IVF) évite de parcourir tout le catalogue.
+
+    Si SIMILARITY_INDEX_PATH pointe vers un index construit par
+    scripts/build_similarity_index.py, il est ouvert par memmap au lieu de
+    recalculer les embeddings au démarrage.
+
+    Les aventures ajoutées après le démarrage vont dans un petit segment delta,
+    interrogé avec le segment principal. Une compaction en arrière-plan fusionne
+    les deux segments quand le delta dépasse SIMILARITY_DELTA_MAX_SIZE.
+
+    Une recherche géographique (centre et rayon) sélectionne d'abord les aventures
+    du rayon par une grille spatiale, puis ne calcule le cosinus que pour elles.
+
+    Si SIMILARITY_NEIGHBORS_K > 0, les voisins de chaque aventure du segment
+    principal sont précalculés, et les réponses sérialisées des recherches
+    récentes sont gardées dans un cache LRU vidé à chaque modification du catalogue.
     """
-    
-    def __init__(self):
-        # Simuler une base de données d'aventures pour le MVP
-        self.mock_adventures = {
-            1: {"id": 1, "title": "Randonnée dans les vignobles de Saint-Émilion"},
-            2: {"id": 2, "title": "Balade en kayak sur la Dordogne"},
-            3: {"id": 3, "title": "Balade dans les vignes de Pomerol"},
-            4: {"id": 4, "title": "Randonnée côtière à Biarritz"},
-            5: {"id": 5, "title": "Escalade dans les Pyrénées"},
-            6: {"id": 6, "title": "Vélo dans la vallée de la Loire"},
-            7: {"id": 7, "title": "Découverte du patrimoine viticole de Fronsac"},
-        }
-        
-        # Simuler des relations de similarité pour le MVP
-        self.mock_similarities = {
-            1: [3, 7],  # Aventure 1 est similaire aux aventures 3 et 7
-            2: [4, 6],
-            3: [1, 7],
-            4: [2, 5],
-            5: [4],
-            6: [2],
-            7: [1, 3],
-        }
-    
-    async def find_similar_adventures(self, adventure_id: int) -> SimilarAdventuresResponse:
+
+    def __init__(
+        self,
+        catalog: Optional[List[CatalogAdventure]] = None,
+        embedder: Optional[HashingEmbedder] = None,
+        index_mode: Optional[str] = None,
+        store_path: Optional[str] = None
+    ):
+        self.embedder = embedder or HashingEmbedder(dim=settings.SIMILARITY_EMBEDDING_DIM)
+        self.index_mode = index_mode or settings.SIMILARITY_INDEX_MODE
+        store_path = store_path if store_path is not None else settings.SIMILARITY_INDEX_PATH
+
+        if catalog is None and store_path:
+            store = EmbeddingStore(store_path)
+            if store.dim != self.embedder.dim:
+                raise ValueError(
+                    f"L'index {store_path} a été construit en dimension {store.dim}, "
+                    f"le service utilise la dimension {self.embedder.dim}"
+                )
+            # Colonnes mappées en lecture seule depuis le disque
+            self._main = MainSegment(
+                ids=store.ids,
+                titles=store.titles,
+                embeddings=store.embeddings,
+                index=store.ivf_index(settings.SIMILARITY_IVF_NPROBE) or self._build_index(store.embeddings),
+                columns=store.columns,
+                labels=store.labels,
+                id_lookup=store.id_lookup
+            )
+            self._main.neighbors = store.neighbor_table()
+        else:
+            catalog = catalog if catalog is not None else load_catalog()
+            embeddings = np.ascontiguousarray(
+                self.embedder.embed(adventure_text(adventure) for adventure in catalog),
+                dtype=np.float32
+            )
+            self._main = MainSegment(
+                ids=np.array([adventure.id for adventure in catalog], dtype=np.int64),
+                titles=[adventure.title for adventure in catalog],
+                embeddings=embeddings,
+                index=self._build_index(embeddings),
+                columns={
+                    name: np.array([getattr(adventure, name) for adventure in catalog], dtype=np.float32)
+                    for name in NUMERIC_COLUMNS
+                },
+                labels=self._build_labels(catalog)
+            )
+
+        # Segment delta actif, et segment delta figé pendant une compaction
+        self._delta = DeltaSegment(self.embedder.dim, NUMERIC_COLUMNS)
+        self._frozen: Optional[DeltaSegment] = None
+        self._compaction_task: Optional[asyncio.Task] = None
+        self._next_id = int(self._main.ids.max()) + 1 if len(self._main.ids) else 1
+        self._response_cache = ResponseCache(settings.SIMILARITY_RESPONSE_CACHE_SIZE)
+        self._neighbor_task: Optional[asyncio.Task] = None
+
+        logger.info("Index de similarité prêt: {} aventures ({})", len(self._main.ids), type(self._main.index).__name__)
+
+        try:
+            self.start_neighbor_table()
+        except RuntimeError:
+            # Pas de boucle d'événements (ex: préchargement dans le maître gunicorn) : voir
+            # build_neighbor_table_sync, ou start_neighbor_table au démarrage du worker
+            pass
+
+    def _build_index(self, embeddings: np.ndarray) -> Union[FlatIndex, IVFIndex]:
+        use_ivf = self.index_mode == "ivf" or (
+            self.index_mode == "auto" and len(embeddings) >= settings.SIMILARITY_IVF_MIN_SIZE
+        )
+        if use_ivf and len(embeddings) > 0:
+            return IVFIndex(embeddings, n_probe=settings.SIMILARITY_IVF_NPROBE)
+        return FlatIndex(embeddings)
+
+    @staticmethod
+    def _build_labels(adventures: Sequence[Adventure]) -> Dict[str, Postings]:
+        all_labels = [adventure_labels(adventure) for adventure in adventures]
+        return {name: build_postings([labels[name] for labels in all_labels]) for name in LABEL_COLUMNS}
+
+    def _segments(self) -> List[Union[MainSegment, DeltaSegment]]:
+        segments: List[Union[MainSegment, DeltaSegment]] = [self._main]
+        if self._frozen is not None:
+            segments.append(self._frozen)
+        segments.append(self._delta)
+        return segments
+
+    def _locate(self, adventure_id: int) -> Optional[Tuple[Union[MainSegment, DeltaSegment], int]]:
+        # Du plus récent au plus ancien : une aventure mise à jour est dans le segment le plus récent
+        for segment in reversed(self._segments()):
+            row = segment.row_of(adventure_id)
+            if row is not None:
+                return segment, row
+        return None
+
+    def __len__(self) -> int:
+        return sum(len(segment) for segment in self._segments())
+
+    def add_adventure(self, adventure: Adventure, adventure_id: Optional[int] = None) -> int:
+        """
+        Rend une aventure immédiatement recherchable
+
+        Args:
+            adventure: L'aventure à indexer
+            adventure_id: Son ID (par défaut celui d'une CatalogAdventure, sinon un nouvel ID).
+                Une aventure existante avec le même ID est remplacée.
+
+        Returns:
+            L'ID de l'aventure indexée
+        """
+        if adventure_id is None:
+            adventure_id = getattr(adventure, "id", None)
+        if adventure_id is None:
+            adventure_id = self._next_id
+        else:
+            self.remove_adventure(adventure_id, missing_ok=True)
+        self._next_id = max(self._next_id, adventure_id + 1)
+
+        vector = self.embedder.embed_one(adventure_text(adventure))
+        columns = adventure_columns(adventure)
+        labels = adventure_labels(adventure)
+        self._delta.append(adventure_id, vector, adventure.title, columns, labels)
+        # Seules les réponses dans lesquelles la nouvelle aventure pourrait entrer sont périmées
+        self._response_cache.invalidate(lambda cached: cached.reachable_by(vector, columns, labels))
+        logger.debug("Aventure {} ajoutée à l'index de similarité", adventure_id)
+
+        if len(self._delta) >= settings.SIMILARITY_DELTA_MAX_SIZE:
+            self._schedule_compaction()
+        return adventure_id
+
+    def remove_adventure(self, adventure_id: int, missing_ok: bool = False) -> None:
+        """
+        Retire une aventure des résultats de recherche
+
+        Raises:
+            AdventureNotFoundError: Si l'aventure n'existe pas (sauf si missing_ok)
+        """
+        removed = False
+        for segment in self._segments():
+            removed = segment.remove(adventure_id) or removed
+        if removed:
+            self._response_cache.invalidate(lambda cached: cached.involves(adventure_id))
+        if not removed and not missing_ok:
+            raise AdventureNotFoundError(adventure_id)
+
+    def _schedule_compaction(self) -> None:
+        if self._compaction_task is not None and not self._compaction_task.done():
+            return
+        try:
+            self._compaction_task = asyncio.get_running_loop().create_task(self.compact())
+        except RuntimeError:
+            # Pas de boucle d'événements (script, test synchrone) : le delta reste interrogé tel quel
+            pass
+
+    async def compact(self) -> None:
+        """
+        Fusionne le segment delta dans le segment principal
+
+        La fusion (copie des matrices, reconstruction de l'index) s'exécute dans un
+        thread : les recherches continuent sur les segments existants, et les
+        ajouts vont dans un nouveau delta. Le nouveau segment principal remplace
+        l'ancien en une seule affectation, dans la boucle d'événements.
+        """
+        if self._frozen is not None or (len(self._delta) == 0 and self._main.alive is None):
+            return
+
+        main, frozen = self._main, self._delta
+        self._frozen = frozen
+        self._delta = DeltaSegment(self.embedder.dim, NUMERIC_COLUMNS)
+        # Photographie des suppressions : celles qui arrivent pendant la fusion seront rejouées
+        main_alive = None if main.alive is None else main.alive.copy()
+        frozen_alive = frozen.alive.copy()
+
+        try:
+            compacted = await asyncio.to_thread(self._merge, main, main_alive, frozen, frozen_alive)
+
+            # Rejouer les suppressions survenues pendant la fusion
+            removed_since = []
+            if main.alive is not None:
+                before = np.ones(len(main.ids), dtype=bool) if main_alive is None else main_alive
+                removed_since.extend(main.ids[before & ~main.alive].tolist())
+            removed_since.extend(frozen.ids[frozen_alive & ~frozen.alive].tolist())
+            for adventure_id in removed_since:
+                compacted.remove(adventure_id)
+
+            self._main = compacted
+            self._response_cache.clear()
+            logger.info("Index de similarité compacté: {} aventures", len(compacted.ids))
+        finally:
+            self._frozen = None
+
+    def start_neighbor_table(self) -> None:
+        """
+        Lance le précalcul des voisins en arrière-plan s'il n'est ni fait ni en cours
+
+        Raises:
+            RuntimeError: Si aucune boucle d'événements n'est en cours d'exécution
+        """
+        if self._main.neighbors is not None or settings.SIMILARITY_NEIGHBORS_K <= 0:
+            return
+        if self._neighbor_task is None or self._neighbor_task.done():
+            self._neighbor_task = asyncio.get_running_loop().create_task(self.build_neighbor_table())
+
+    def build_neighbor_table_sync(self) -> None:
+        """
+        Précalcule les voisins dans le thread appelant, s'ils manquent
+
+        Pour le préchargement avant le fork des workers, hors de toute boucle
+        d'événements : les workers héritent de la table au lieu de la recalculer.
+        """
+        main = self._main
+        if main.neighbors is not None or settings.SIMILARITY_NEIGHBORS_K <= 0:
+            return
+        main.neighbors = NeighborTable.build(main.index, main.embeddings, settings.SIMILARITY_NEIGHBORS_K)
+        self._response_cache.clear()
+        logger.info(
+            "Table des voisins précalculée: {} aventures, {} voisins", len(main.ids), settings.SIMILARITY_NEIGHBORS_K
+        )
+
+    async def build_neighbor_table(self, k: Optional[int] = None) -> None:
+        """
+        Précalcule les voisins de chaque aventure du segment principal, dans un thread
+
+        Args:
+            k: Le nombre de voisins par aventure (SIMILARITY_NEIGHBORS_K par défaut)
+        """
+        main = self._main
+        k = k or settings.SIMILARITY_NEIGHBORS_K
+        table = await asyncio.to_thread(NeighborTable.build, main.index, main.embeddings, k)
+        # Rattachée au segment pour lequel elle a été calculée, même s'il a été remplacé entre-temps
+        main.neighbors = table
+        self._response_cache.clear()
+        logger.info("Table des voisins précalculée: {} aventures, {} voisins", len(main.ids), k)
+
+    def _merge(
+        self,
+        main: MainSegment,
+        main_alive: Optional[np.ndarray],
+        frozen: DeltaSegment,
+        frozen_alive: np.ndarray
+    ) -> MainSegment:
+        keep = np.ones(len(main.ids), dtype=bool) if main_alive is None else main_alive
+        keep_rows = np.flatnonzero(keep)
+        delta_rows = np.flatnonzero(frozen_alive)
+
+        embeddings = np.ascontiguousarray(
+            np.concatenate([main.embeddings[keep_rows], frozen.vectors[delta_rows]]),
+            dtype=np.float32
+        )
+        compacted = MainSegment(
+            ids=np.concatenate([main.ids[keep_rows], frozen.ids[delta_rows]]),
+            titles=[main.titles[row] for row in keep_rows] + [frozen.titles[row] for row in delta_rows],
+            embeddings=embeddings,
+            index=self._build_index(embeddings),
+            columns={
+                name: np.concatenate([main.column(name)[keep_rows], frozen.column(name)[delta_rows]])
+                for name in NUMERIC_COLUMNS
+            },
+            labels={
+                name: concat_postings(
+                    remap_postings(main.labels[name], keep),
+                    build_postings([frozen.labels[row][name] for row in delta_rows]),
+                    offset=len(keep_rows)
+                )
+                for name in LABEL_COLUMNS
+            }
+        )
+        if settings.SIMILARITY_NEIGHBORS_K > 0:
+            compacted.neighbors = NeighborTable.build(compacted.index, embeddings, settings.SIMILARITY_NEIGHBORS_K)
+        return compacted
+
+    def _geo_search(
+        self,
+        segment: Union[MainSegment, DeltaSegment],
+        query: np.ndarray,
+        k: int,
+        exclude: Optional[int],
+        allowed: Optional[np.ndarray],
+        near: Tuple[float, float],
+        radius_km: float
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows, distances = segment.within_radius(near[0], near[1], radius_km)
+        keep = rows != exclude if exclude is not None else np.ones(len(rows), dtype=bool)
+        if allowed is not None:
+            keep &= allowed[rows]
+        rows, distances = rows[keep], distances[keep]
+
+        # Cosinus calculé uniquement pour les aventures du rayon
+        cosines = segment.vectors[rows] @ query
+        relevant = cosines > settings.SIMILARITY_MIN_SCORE
+        rows, distances, cosines = rows[relevant], distances[relevant], cosines[relevant]
+
+        weight = settings.SIMILARITY_GEO_WEIGHT
+        scores = (1 - weight) * cosines + weight * (1 - distances / radius_km)
+        best = top_k(scores, k)
+        return rows[best], scores[best], distances[best]
+
+    @staticmethod
+    def _geo_area(
+        segment: Union[MainSegment, DeltaSegment],
+        row: int,
+        near: Optional[Tuple[float, float]],
+        radius_km: Optional[float]
+    ) -> Tuple[Tuple[float, float], float]:
+        """Centre (l'aventure de référence par défaut) et rayon d'une recherche géographique"""
+        if near is None:
+            near = (float(segment.column("latitude")[row]), float(segment.column("longitude")[row]))
+        return near, radius_km or settings.SIMILARITY_GEO_DEFAULT_RADIUS_KM
+
+    async def find_similar_adventures(
+        self,
+        adventure_id: int,
+        k: Optional[int] = None,
+        near: Optional[Tuple[float, float]] = None,
+        radius_km: Optional[float] = None,
+        filters: Optional[SearchFilters] = None
+    ) -> SimilarAdventuresResponse:
         """
         Trouve des aventures similaires à une aventure donnée
-        
+
+        Sans critère géographique, le score est le cosinus entre les embeddings.
+        Avec un centre ou un rayon, seules les aventures du rayon sont retenues et le
+        score mélange similarité et proximité :
+        (1 - SIMILARITY_GEO_WEIGHT) * cosinus + SIMILARITY_GEO_WEIGHT * (1 - distance / rayon).
+
+        Les filtres par facettes sont convertis en masque avant le calcul des scores :
+        les k résultats satisfont tous les filtres, sans post-filtrage.
+
         Args:
             adventure_id: L'ID de l'aventure pour laquelle chercher des similaires
-            
+            k: Le nombre maximal d'aventures à retourner (SIMILARITY_DEFAULT_K par défaut)
+            near: Le centre (latitude, longitude) de la recherche géographique
+                (l'aventure de référence si seul le rayon est fourni)
+            radius_km: Le rayon de recherche en kilomètres
+                (SIMILARITY_GEO_DEFAULT_RADIUS_KM si seul le centre est fourni)
+            filters: Les filtres par difficulté, tags, durée et distance
+
         Returns:
-            Un objet SimilarAdventuresResponse contenant la liste des aventures similaires
-            
+            Un objet SimilarAdventuresResponse contenant la liste des aventures similaires,
+            triées par score de similarité décroissant
+
         Raises:
             AdventureNotFoundError: Si l'aventure avec l'ID spécifié n'existe pas
         """
-        logger.info(f"Recherche d'aventures similaires pour l'ID: {adventure_id}")
-        
+        logger.debug("Recherche d'aventures similaires pour l'ID: {}", adventure_id)
+        k = k or settings.SIMILARITY_DEFAULT_K
+
         # Vérifier si l'aventure existe
-        if adventure_id not in self.mock_adventures:
-            logger.warning(f"Aventure avec ID {adventure_id} non trouvée")
+        with time_stage("similarity", "lookup"):
+            located = self._locate(adventure_id)
+        if located is None:
+            logger.warning("Aventure avec ID {} non trouvée", adventure_id)
             raise AdventureNotFoundError(adventure_id)
-        
-        # Récupérer les IDs des aventures similaires
-        similar_ids = self.mock_similarities.get(adventure_id, [])
-        
+        query_segment, query_row = located
+        query = query_segment.vector(query_row)
+
+        geo = near is not None or radius_km is not None
+        if geo:
+            near, radius_km = self._geo_area(query_segment, query_row, near, radius_km)
+
+        # Chercher dans chaque segment puis garder les k meilleurs résultats
+        candidates = []
+        search_start = time.perf_counter()
+        for segment in self._segments():
+            exclude = query_row if segment is query_segment else None
+            allowed = segment.facet_index.mask(filters) if filters is not None else None
+            if geo:
+                rows, scores, distances = self._geo_search(segment, query, k, exclude, allowed, near, radius_km)
+            else:
+                precomputed = None
+                if allowed is None and segment is query_segment and isinstance(segment, MainSegment):
+                    precomputed = segment.precomputed_search(query_row, k)
+                rows, scores = precomputed or segment.search(query, k, exclude=exclude, allowed=allowed)
+                distances = [None] * len(rows)
+            candidates.extend(
+                (float(score), int(segment.ids[row]), segment.titles[row], distance)
+                for row, score, distance in zip(rows, scores, distances)
+            )
+        STAGE_LATENCY.observe(time.perf_counter() - search_start, component="similarity", stage="index_search")
+        with time_stage("similarity", "materialize"):
+            response = self._build_response(candidates, k, geo)
+        logger.debug("Trouvé {} aventures similaires", len(response.similar_adventures))
+        return response
+
+    async def find_similar_adventures_json(
+        self,
+        adventure_id: int,
+        k: Optional[int] = None,
+        near: Optional[Tuple[float, float]] = None,
+        radius_km: Optional[float] = None,
+        filters: Optional[SearchFilters] = None
+    ) -> bytes:
+        """
+        Même recherche que find_similar_adventures, retournée sérialisée en JSON
+
+        Les réponses sont gardées dans un cache LRU par (adventure_id, k, near, radius_km, filtres) :
+        une recherche populaire est servie sans calcul ni validation pydantic. Une aventure
+        ajoutée n'invalide que les réponses dans lesquelles elle pourrait entrer (voir CachedSearch).
+
+        Raises:
+            AdventureNotFoundError: Si l'aventure avec l'ID spécifié n'existe pas
+        """
+        k = k or settings.SIMILARITY_DEFAULT_K
+        key = (adventure_id, k, near, radius_km, filters)
+        payload = self._response_cache.get(key)
+        CACHE_REQUESTS.inc(cache="similarity", result="hit" if payload is not None else "miss")
+        if payload is None:
+            response = await self.find_similar_adventures(adventure_id, k, near=near, radius_km=radius_km, filters=filters)
+            with time_stage("similarity", "serialize"):
+                payload = json_bytes(response)
+            cached = self._cached_search(adventure_id, k, near, radius_km, filters, response)
+            if cached is not None:
+                self._response_cache.set(key, payload, cached)
+        return payload
+
+    def _cached_search(
+        self,
+        adventure_id: int,
+        k: int,
+        near: Optional[Tuple[float, float]],
+        radius_km: Optional[float],
+        filters: Optional[SearchFilters],
+        response: SimilarAdventuresResponse
+    ) -> Optional[CachedSearch]:
+        """Dépendances d'une réponse à mettre en cache, ou None si l'aventure a été retirée entre-temps"""
+        located = self._locate(adventure_id)
+        if located is None:
+            return None
+        segment, row = located
+        geo = None
+        if near is not None or radius_km is not None:
+            near, radius_km = self._geo_area(segment, row, near, radius_km)
+            geo = (near[0], near[1], radius_km)
+        results = response.similar_adventures
+        if len(results) >= k:
+            floor = min(result.similarity_score for result in results)
+        else:
+            # Moins de k résultats : toute aventure pertinente peut en faire partie
+            floor = -np.inf if geo is not None else settings.SIMILARITY_MIN_SCORE
+        return CachedSearch(
+            query_id=adventure_id,
+            query=segment.vector(row).copy(),
+            result_ids=frozenset(result.id for result in results),
+            floor=floor,
+            filters=filters,
+            geo=geo
+        )
+
+    def cache_stats(self) -> Dict[str, float]:
+        """Statistiques du cache des réponses"""
+        return self._response_cache.stats()
+
+    async def find_similar_adventures_batch(
+        self,
+        adventure_ids: Sequence[int],
+        k: Optional[int] = None,
+        filters: Optional[SearchFilters] = None
+    ) -> List[Union[SimilarAdventuresResponse, AdventureNotFoundError]]:
+        """
+        Trouve les aventures similaires de plusieurs aventures en une seule passe
+
+        Les vecteurs des aventures de référence sont empilés en une matrice : chaque
+        segment est parcouru une seule fois, par un produit matriciel, et les k
+        meilleurs de chaque requête sont sélectionnés ensemble. Les IDs dupliqués
+        ne sont calculés qu'une fois.
+
+        Args:
+            adventure_ids: Les IDs des aventures de référence
+            k: Le nombre maximal d'aventures à retourner par ID (SIMILARITY_DEFAULT_K par défaut)
+            filters: Les filtres par difficulté, tags, durée et distance, communs à tous les IDs
+
+        Returns:
+            Pour chaque ID, dans l'ordre de la requête, la réponse ou l'erreur
+            AdventureNotFoundError si l'aventure n'existe pas
+        """
+        logger.debug("Recherche d'aventures similaires pour {} IDs", len(adventure_ids))
+        k = k or settings.SIMILARITY_DEFAULT_K
+
+        unique_ids = list(dict.fromkeys(adventure_ids))
+        located = {adventure_id: self._locate(adventure_id) for adventure_id in unique_ids}
+        found = [adventure_id for adventure_id in unique_ids if located[adventure_id] is not None]
+        results: Dict[int, Union[SimilarAdventuresResponse, AdventureNotFoundError]] = {
+            adventure_id: AdventureNotFoundError(adventure_id)
+            for adventure_id in unique_ids if located[adventure_id] is None
+        }
+
+        if found:
+            queries = np.stack([segment.vector(row) for segment, row in (located[i] for i in found)]).astype(np.float32)
+            candidates: Dict[int, list] = {adventure_id: [] for adventure_id in found}
+            for segment in self._segments():
+                excludes = [row if query_segment is segment else None for query_segment, row in (located[i] for i in found)]
+                allowed = segment.facet_index.mask(filters) if filters is not None else None
+                rows, scores = segment.search_many(queries, k, excludes=excludes, allowed=allowed)
+                for i, adventure_id in enumerate(found):
+                    finite = np.isfinite(scores[i])
+                    candidates[adventure_id].extend(
+                        (float(score), int(segment.ids[row]), segment.titles[row], None)
+                        for row, score in zip(rows[i][finite], scores[i][finite])
+                    )
+            for adventure_id in found:
+                results[adventure_id] = self._build_response(candidates[adventure_id], k, geo=False)
+
+        return [results[adventure_id] for adventure_id in adventure_ids]
+
+    @staticmethod
+    def _build_response(candidates: list, k: int, geo: bool) -> SimilarAdventuresResponse:
+        """Garde les k meilleurs candidats (score, id, titre, distance) de tous les segments"""
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+
         # Créer la liste des aventures similaires
-        similar_adventures: List[SimilarAdventure] = []
-        
-        for idx, similar_id in enumerate(similar_ids):
-            # Simuler un score de similarité décroissant
-            similarity_score = 0.9 - (idx * 0.1)
-            
-            # Créer l'objet SimilarAdventure
-            similar_adventure = SimilarAdventure(
+        similar_adventures: List[SimilarAdventure] = [
+            SimilarAdventure(
                 id=similar_id,
-                title=self.mock_adventures[similar_id]["title"],
-                similarity_score=similarity_score
+                title=title,
+                similarity_score=score,
+                distance_km=None if distance is None else round(float(distance), 3)
             )
-            
-            similar_adventures.append(similar_adventure)
-        
-        logger.info(f"Trouvé {len(similar_adventures)} aventures similaires")
-        
-        # Retourner la réponse
-        return SimilarAdventuresResponse(similar_adventures=similar_adventures) 
\ No newline at end of file
+            for score, similar_id, title, distance in candidates[:k]
+            # Un cosinus nul ou négatif ne traduit aucune ressemblance (déjà filtré en mode géographique)
+            if geo or score > settings.SIMILARITY_MIN_SCORE
+        ]
+        return SimilarAdventuresResponse(similar_adventures=similar_adventures)
@@ -0,0 +1,68 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+from app.core.exceptions import ServiceOverloadedError
+
+T = TypeVar("T")
+
+
+class _Flight(Generic[T]):
+    """Appel en cours et nombre d'appelants qui attendent son résultat"""
+
+    def __init__(self, task: "asyncio.Future[T]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """
+    Regroupe les appels concurrents portant sur la même clé
+
+    Le premier appelant lance l'appel ; les suivants attendent le même
+    résultat au lieu d'en lancer un nouveau. Une erreur est propagée à tous
+    les appelants en attente. L'appel s'exécute dans sa propre tâche : si un
+    appelant est annulé (client déconnecté), les autres continuent d'attendre.
+    """
+
+    def __init__(self, max_waiters: int = 1000):
+        self.max_waiters = max_waiters
+        self._flights: Dict[Hashable, _Flight[T]] = {}
+
+    def _forget(self, key: Hashable, flight: _Flight[T]) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Marquer l'exception comme consultée, même si plus personne n'attend
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Exécute factory() une seule fois pour tous les appels concurrents sur la clé
+
+        Args:
+            key: La clé qui identifie l'appel (ex: prompt normalisé et paramètres de l'appel)
+            factory: La fonction qui lance l'appel si aucun n'est en cours
+
+        Returns:
+            Le résultat partagé de l'appel
+
+        Raises:
+            ServiceOverloadedError: Si trop d'appelants attendent déjà le même appel
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        elif flight.waiters >= self.max_waiters:
+            raise ServiceOverloadedError("Trop de requêtes identiques en cours, réessayez plus tard")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+
+    def in_flight(self) -> int:
+        """Nombre d'appels distincts en cours"""
+        return len(self._flights)
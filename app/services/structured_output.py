@@ -0,0 +1,165 @@
+import json
+import re
+from typing import Any, Dict, Optional
+
+from loguru import logger
+from pydantic import ValidationError
+
+from app.models.adventure import Adventure
+
+# Emprise de la France métropolitaine (Corse comprise)
+FRANCE_LAT_RANGE = (41.3, 51.1)
+FRANCE_LON_RANGE = (-5.2, 9.6)
+
+DIFFICULTIES = {
+    "facile": "facile",
+    "easy": "facile",
+    "moyen": "moyen",
+    "moyenne": "moyen",
+    "intermédiaire": "moyen",
+    "medium": "moyen",
+    "difficile": "difficile",
+    "hard": "difficile",
+    "difficult": "difficile",
+}
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_NUMBER = re.compile(r"-?\d+(?:[.,]\d+)?")
+_HOURS = re.compile(r"(\d+(?:[.,]\d+)?)\s*h(?:eures?|ours?)?\s*(\d+)?", re.IGNORECASE)
+
+
+def parse_adventure(text: str) -> Adventure:
+    """
+    Parse la réponse du modèle en Adventure, en réparant localement les écarts de format courants
+
+    La validation directe par pydantic est tentée d'abord (cas nominal, sans le
+    coût du parser LangChain). En cas d'échec, la réponse est réparée : extraction
+    de l'objet JSON au milieu du texte ou d'un bloc de code, virgules finales,
+    nombres écrits en texte ("2h30", "8,5 km"), tags en chaîne, difficulté
+    synonyme, coordonnées ramenées dans l'emprise de la France.
+
+    Args:
+        text: La réponse brute du modèle
+
+    Returns:
+        L'aventure validée
+
+    Raises:
+        ValueError: Si la réponse ne peut pas être réparée
+    """
+    try:
+        return clamp_to_france(Adventure.model_validate_json(text))
+    except ValidationError:
+        pass
+
+    data = extract_json_object(text)
+    if data is None:
+        raise ValueError("Aucun objet JSON trouvé dans la réponse du modèle")
+    adventure = Adventure.model_validate(repair_fields(data))
+    logger.warning("Réponse du modèle réparée localement, sans nouvel appel")
+    return adventure
+
+
+def extract_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """Extrait le premier objet JSON d'un texte (prose autour, bloc de code, virgules finales)"""
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+
+    start = text.find("{")
+    while start != -1:
+        end = _matching_brace(text, start)
+        if end == -1:
+            break
+        candidate = text[start:end + 1]
+        for attempt in (candidate, _TRAILING_COMMA.sub(r"\1", candidate)):
+            try:
+                data = json.loads(attempt)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(data, dict):
+                return data
+        start = text.find("{", start + 1)
+    return None
+
+
+def _matching_brace(text: str, start: int) -> int:
+    """Position de l'accolade fermante correspondant à celle de `start` (hors chaînes), ou -1"""
+    depth = 0
+    in_string = False
+    escaped = False
+    for position in range(start, len(text)):
+        char = text[position]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return position
+    return -1
+
+
+def _to_number(value: Any) -> Any:
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        if match:
+            return float(match.group().replace(",", "."))
+    return value
+
+
+def _to_minutes(value: Any) -> Any:
+    if isinstance(value, str):
+        hours = _HOURS.search(value)
+        if hours:
+            return round(float(hours.group(1).replace(",", ".")) * 60 + int(hours.group(2) or 0))
+    value = _to_number(value)
+    return round(value) if isinstance(value, float) else value
+
+
+def _clamp(value: Any, bounds) -> Any:
+    if isinstance(value, (int, float)):
+        return min(max(value, bounds[0]), bounds[1])
+    return value
+
+
+def clamp_to_france(adventure: Adventure) -> Adventure:
+    """Ramène les coordonnées d'une aventure valide dans l'emprise de la France"""
+    latitude = _clamp(adventure.latitude, FRANCE_LAT_RANGE)
+    longitude = _clamp(adventure.longitude, FRANCE_LON_RANGE)
+    if latitude == adventure.latitude and longitude == adventure.longitude:
+        return adventure
+    return adventure.model_copy(update={"latitude": latitude, "longitude": longitude})
+
+
+def repair_fields(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Corrige les types et les valeurs des champs d'une aventure sans changer leur sens"""
+    data = dict(data)
+    if isinstance(data.get("tags"), str):
+        data["tags"] = [tag.strip() for tag in re.split(r"[,;]", data["tags"]) if tag.strip()]
+    if isinstance(data.get("difficulty"), str):
+        difficulty = data["difficulty"].strip().lower()
+        data["difficulty"] = DIFFICULTIES.get(difficulty, difficulty)
+    if "duration" in data:
+        data["duration"] = _to_minutes(data["duration"])
+    if "distance" in data:
+        data["distance"] = _to_number(data["distance"])
+    if "latitude" in data:
+        data["latitude"] = _clamp(_to_number(data["latitude"]), FRANCE_LAT_RANGE)
+    if "longitude" in data:
+        data["longitude"] = _clamp(_to_number(data["longitude"]), FRANCE_LON_RANGE)
+    return data
+
+
+def repair_field(name: str, value: Any) -> Any:
+    """Applique à un champ isolé (diffusé en streaming) la réparation de repair_fields"""
+    return repair_fields({name: value})[name]
@@ -0,0 +1,84 @@
+import time
+from typing import Any, Dict
+
+from loguru import logger
+
+# Délai avant de retenter le chargement d'un encodage tiktoken en échec (secondes)
+ENCODING_RETRY_SECONDS = 300.0
+
+_encodings: Dict[str, Any] = {}
+_failures: Dict[str, float] = {}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation rapide du nombre de tokens d'un texte (environ 4 caractères par token)"""
+    return len(text) // 4 + 1
+
+
+def _encoding(model: str):
+    """
+    Encodage tiktoken du modèle, ou None s'il n'est pas disponible (ex: pas d'accès réseau au premier chargement)
+
+    Seuls les encodages chargés sont mis en cache : après un échec, le chargement
+    est retenté une fois ENCODING_RETRY_SECONDS écoulées.
+    """
+    encoding = _encodings.get(model)
+    if encoding is not None:
+        return encoding
+    failed_at = _failures.get(model)
+    if failed_at is not None and time.monotonic() - failed_at < ENCODING_RETRY_SECONDS:
+        return None
+    try:
+        import tiktoken
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning("Encodage tiktoken indisponible pour {}, estimation approchée des tokens: {}", model, e)
+        _failures[model] = time.monotonic()
+        return None
+    _failures.pop(model, None)
+    _encodings[model] = encoding
+    return encoding
+
+
+def count_tokens(text: str, model: str) -> int:
+    """
+    Nombre de tokens d'un texte pour un modèle
+
+    Args:
+        text: Le texte à compter
+        model: Le nom du modèle OpenAI (détermine l'encodage)
+
+    Returns:
+        Le nombre exact de tokens, ou une estimation si tiktoken ne peut pas charger l'encodage
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+class TokenUsage:
+    """Compteurs cumulés des tokens envoyés à OpenAI et reçus, pour les logs et les métriques"""
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, prompt_tokens: int, completion_tokens: int) -> None:
+        self.requests += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "avg_prompt_tokens": self.prompt_tokens / self.requests if self.requests else 0.0,
+            "avg_completion_tokens": self.completion_tokens / self.requests if self.requests else 0.0,
+        }
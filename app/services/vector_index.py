@@ -0,0 +1,367 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.facet_index import FacetIndex, build_postings
+from app.services.geo_index import haversine_km
+
+# Nombre de lignes traitées par bloc pour borner la mémoire des produits matriciels
+BLOCK_SIZE = 65536
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices des k meilleurs scores, triés par score décroissant
+
+    argpartition sélectionne les k meilleurs en O(n) ; seul ce sous-ensemble est trié.
+    """
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sélection des k meilleurs scores de chaque ligne d'une matrice (une ligne par requête)
+
+    Returns:
+        Les colonnes retenues et leurs scores, (m, k), triés par score décroissant sur chaque ligne
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64), np.empty((scores.shape[0], 0), dtype=scores.dtype)
+    if k < scores.shape[1]:
+        columns = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        columns = np.broadcast_to(np.arange(scores.shape[1]), scores.shape).copy()
+    selected = np.take_along_axis(scores, columns, axis=1)
+    order = np.argsort(-selected, axis=1, kind="stable")
+    return np.take_along_axis(columns, order, axis=1), np.take_along_axis(selected, order, axis=1)
+
+
+class FlatIndex:
+    """
+    Index exact : produit scalaire avec toutes les lignes de la matrice
+
+    Les vecteurs sont normalisés, le produit scalaire est donc la similarité cosinus.
+    """
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        exclude: Optional[int] = None,
+        allowed: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cherche les k vecteurs les plus proches de la requête
+
+        Args:
+            query: Le vecteur requête normalisé
+            k: Le nombre de résultats
+            exclude: Une ligne à exclure des résultats (l'aventure de référence)
+            allowed: Masque booléen des lignes autorisées (toutes si None)
+
+        Returns:
+            Les lignes trouvées et leurs scores cosinus, par score décroissant
+        """
+        scores = self.vectors @ query
+        if allowed is not None:
+            scores[~allowed] = -np.inf
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        rows = top_k(scores, k)
+        rows = rows[np.isfinite(scores[rows])]
+        return rows, scores[rows]
+
+    def search_many(
+        self,
+        queries: np.ndarray,
+        k: int,
+        excludes: Optional[Sequence[Optional[int]]] = None,
+        allowed: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cherche les k plus proches voisins de plusieurs requêtes à la fois
+
+        Les scores de toutes les requêtes sont calculés par un seul produit matriciel
+        par bloc de lignes, et les k meilleurs de chaque requête sont sélectionnés
+        ensemble.
+
+        Args:
+            queries: Les vecteurs requêtes normalisés (m x dim)
+            k: Le nombre de résultats par requête
+            excludes: Pour chaque requête, une ligne à exclure (ou None)
+            allowed: Masque booléen des lignes autorisées (toutes si None)
+
+        Returns:
+            Les lignes trouvées et leurs scores (m x k), par score décroissant ;
+            les places sans résultat ont un score -inf
+        """
+        m = queries.shape[0]
+        best_rows = np.empty((m, 0), dtype=np.int64)
+        best_scores = np.empty((m, 0), dtype=np.float32)
+        excluded = [(i, row) for i, row in enumerate(excludes or ()) if row is not None]
+
+        for start in range(0, self.vectors.shape[0], BLOCK_SIZE):
+            block = self.vectors[start:start + BLOCK_SIZE]
+            scores = queries @ block.T
+            if allowed is not None:
+                scores[:, ~allowed[start:start + block.shape[0]]] = -np.inf
+            for i, row in excluded:
+                if start <= row < start + block.shape[0]:
+                    scores[i, row - start] = -np.inf
+            columns, block_scores = top_k_rows(scores, k)
+            # Fusionner les meilleurs du bloc avec les meilleurs des blocs précédents
+            merged_rows = np.concatenate([best_rows, columns + start], axis=1)
+            merged_scores = np.concatenate([best_scores, block_scores], axis=1)
+            positions, best_scores = top_k_rows(merged_scores, k)
+            best_rows = np.take_along_axis(merged_rows, positions, axis=1)
+
+        return best_rows, best_scores
+
+
+class IVFIndex:
+    """
+    Index approché par listes inversées (IVF)
+
+    Les vecteurs sont regroupés autour de centroïdes appris par k-means sphérique.
+    Une recherche ne compare la requête qu'aux vecteurs des `n_probe` listes dont
+    le centroïde est le plus proche, au lieu de parcourir tout le catalogue.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        n_iter: int = 10,
+        sample_size: int = 50000,
+        seed: int = 0,
+    ):
+        self.vectors = vectors
+        self.n_probe = n_probe
+        n_lists = n_lists or max(1, int(np.sqrt(vectors.shape[0])))
+        self.centroids = self._train(vectors, min(n_lists, vectors.shape[0]), n_iter, sample_size, seed)
+
+        assignments = self._assign(vectors)
+        # Lignes regroupées par liste : la liste i occupe rows[offsets[i]:offsets[i + 1]]
+        self.rows = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=self.centroids.shape[0])
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    @classmethod
+    def from_parts(
+        cls,
+        vectors: np.ndarray,
+        centroids: np.ndarray,
+        rows: np.ndarray,
+        offsets: np.ndarray,
+        n_probe: int = 8,
+    ) -> "IVFIndex":
+        """Reconstruit un index à partir de listes déjà calculées (ex: lues sur disque)"""
+        index = cls.__new__(cls)
+        index.vectors = vectors
+        index.n_probe = n_probe
+        index.centroids = centroids
+        index.rows = rows
+        index.offsets = offsets
+        return index
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _train(self, vectors: np.ndarray, n_lists: int, n_iter: int, sample_size: int, seed: int) -> np.ndarray:
+        rng = np.random.default_rng(seed)
+        sample_rows = rng.choice(vectors.shape[0], min(sample_size, vectors.shape[0]), replace=False)
+        sample = np.ascontiguousarray(vectors[np.sort(sample_rows)], dtype=np.float32)
+        centroids = sample[rng.choice(sample.shape[0], n_lists, replace=False)].copy()
+
+        for _ in range(n_iter):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            # Un centroïde sans membre garde sa position précédente
+            empty = np.bincount(assignments, minlength=n_lists) == 0
+            sums[empty] = centroids[empty]
+            centroids = self._normalize(sums).astype(np.float32)
+
+        return centroids
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        assignments = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], BLOCK_SIZE):
+            block = vectors[start:start + BLOCK_SIZE]
+            assignments[start:start + BLOCK_SIZE] = np.argmax(block @ self.centroids.T, axis=1)
+        return assignments
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        exclude: Optional[int] = None,
+        allowed: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Même contrat que FlatIndex.search, limité aux listes les plus proches"""
+        probes = top_k(self.centroids @ query, self.n_probe)
+        candidates = np.concatenate([self.rows[self.offsets[p]:self.offsets[p + 1]] for p in probes])
+        if allowed is not None:
+            candidates = candidates[allowed[candidates]]
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+        scores = self.vectors[candidates] @ query
+        best = top_k(scores, k)
+        return candidates[best], scores[best]
+
+    def search_many(
+        self,
+        queries: np.ndarray,
+        k: int,
+        excludes: Optional[Sequence[Optional[int]]] = None,
+        allowed: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Même contrat que FlatIndex.search_many ; chaque requête sonde ses propres listes"""
+        best_rows = np.zeros((queries.shape[0], k), dtype=np.int64)
+        best_scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        for i, query in enumerate(queries):
+            rows, scores = self.search(query, k, exclude=excludes[i] if excludes else None, allowed=allowed)
+            best_rows[i, :len(rows)] = rows
+            best_scores[i, :len(rows)] = scores
+        return best_rows, best_scores
+
+
+def _grow(array: np.ndarray, capacity: int) -> np.ndarray:
+    grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[:array.shape[0]] = array
+    return grown
+
+
+class DeltaSegment:
+    """
+    Petit segment en mémoire qui reçoit les aventures ajoutées depuis la dernière compaction
+
+    Les vecteurs et les colonnes numériques (latitude, longitude...) sont stockés
+    dans des tampons dont la capacité double à chaque dépassement : un ajout coûte
+    O(1) amorti et la recherche reste exacte. L'index des facettes, petit, est
+    reconstruit à la demande après chaque ajout.
+    """
+
+    def __init__(self, dim: int, column_names: Sequence[str] = (), capacity: int = 64):
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._columns = {name: np.zeros(capacity, dtype=np.float32) for name in column_names}
+        self.titles: List[str] = []
+        self.labels: List[Dict[str, List[str]]] = []
+        self._facet_index: Optional[FacetIndex] = None
+        self.size = 0
+        self._row_by_id: Dict[int, int] = {}
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self.size]
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self.size]
+
+    @property
+    def alive(self) -> np.ndarray:
+        return self._alive[:self.size]
+
+    def column(self, name: str) -> np.ndarray:
+        return self._columns[name][:self.size]
+
+    def __len__(self) -> int:
+        return len(self._row_by_id)
+
+    @property
+    def facet_index(self) -> FacetIndex:
+        if self._facet_index is None or self._facet_index.size != self.size:
+            names = self.labels[0].keys() if self.labels else ()
+            self._facet_index = FacetIndex(
+                self.size,
+                labels={name: build_postings([row_labels[name] for row_labels in self.labels]) for name in names},
+                columns={name: self.column(name) for name in self._columns},
+            )
+        return self._facet_index
+
+    def append(
+        self,
+        adventure_id: int,
+        vector: np.ndarray,
+        title: str,
+        columns: Dict[str, float],
+        labels: Optional[Dict[str, List[str]]] = None,
+    ) -> int:
+        """Ajoute un vecteur, ses colonnes et ses étiquettes, et retourne sa ligne dans le segment"""
+        if self.size == self._vectors.shape[0]:
+            capacity = self._vectors.shape[0] * 2
+            self._vectors = _grow(self._vectors, capacity)
+            self._ids = _grow(self._ids, capacity)
+            self._alive = _grow(self._alive, capacity)
+            self._columns = {name: _grow(values, capacity) for name, values in self._columns.items()}
+        row = self.size
+        self._vectors[row] = vector
+        self._ids[row] = adventure_id
+        self._alive[row] = True
+        for name, values in self._columns.items():
+            values[row] = columns[name]
+        self.titles.append(title)
+        self.labels.append(labels or {})
+        self._row_by_id[adventure_id] = row
+        self.size += 1
+        return row
+
+    def remove(self, adventure_id: int) -> bool:
+        """Marque un vecteur comme supprimé ; retourne False s'il est absent"""
+        row = self._row_by_id.pop(adventure_id, None)
+        if row is None:
+            return False
+        self._alive[row] = False
+        return True
+
+    def vector(self, row: int) -> np.ndarray:
+        return self._vectors[row]
+
+    def row_of(self, adventure_id: int) -> Optional[int]:
+        return self._row_by_id.get(adventure_id)
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        exclude: Optional[int] = None,
+        allowed: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Même contrat que FlatIndex.search, sur les vecteurs non supprimés du segment"""
+        allowed = self.alive if allowed is None else allowed & self.alive
+        return FlatIndex(self.vectors).search(query, k, exclude=exclude, allowed=allowed)
+
+    def search_many(
+        self,
+        queries: np.ndarray,
+        k: int,
+        excludes: Optional[Sequence[Optional[int]]] = None,
+        allowed: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Même contrat que FlatIndex.search_many, sur les vecteurs non supprimés du segment"""
+        allowed = self.alive if allowed is None else allowed & self.alive
+        return FlatIndex(self.vectors).search_many(queries, k, excludes=excludes, allowed=allowed)
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Lignes non supprimées à moins de `radius_km` du point, avec leur distance (parcours complet du delta)"""
+        distances = haversine_km(lat, lon, self.column("latitude"), self.column("longitude"))
+        rows = np.flatnonzero((distances <= radius_km) & self.alive)
+        return rows, distances[rows].astype(np.float32)
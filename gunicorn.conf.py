@@ -0,0 +1,43 @@
+"""
+Configuration gunicorn du serveur de production
+
+Usage:
+    ENVIRONMENT=production gunicorn -c gunicorn.conf.py main:app
+
+Plusieurs workers uvicorn (un par cœur par défaut). Avec SERVER_PRELOAD,
+l'application et les index de similarité sont chargés une fois dans le
+processus maître, avant le fork : les workers partagent ces pages mémoire
+en lecture seule (copie sur écriture) au lieu de reconstruire chacun l'index.
+Sur SIGTERM, chaque worker cesse d'accepter des connexions et termine ses
+requêtes en cours pendant SERVER_GRACEFUL_TIMEOUT secondes.
+"""
+
+import multiprocessing
+
+from app.core.config import settings
+
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = settings.WORKERS or multiprocessing.cpu_count()
+worker_class = "app.core.server.ProductionWorker"
+preload_app = settings.SERVER_PRELOAD
+graceful_timeout = settings.SERVER_GRACEFUL_TIMEOUT
+# Au-delà, un worker bloqué est redémarré (les générations longues restent sous HTTP_TIMEOUT)
+timeout = max(120, int(settings.HTTP_TIMEOUT * 2))
+keepalive = settings.SERVER_KEEPALIVE
+max_requests = settings.SERVER_MAX_REQUESTS
+max_requests_jitter = settings.SERVER_MAX_REQUESTS // 10
+loglevel = settings.LOG_LEVEL
+# Les logs d'accès sont émis par uvicorn dans chaque worker
+accesslog = None
+
+def when_ready(server):
+    """Construit les services partagés dans le maître, juste avant le fork des workers"""
+    if settings.SERVER_PRELOAD:
+        from main import preload
+        preload()
+        server.log.info("Index de similarité préchargé avant le fork des workers")
+
+def post_fork(server, worker):
+    """Relance l'écriture des logs dans le worker : le thread d'écriture du maître n'existe pas après le fork"""
+    from app.core.logging import setup_logging
+    setup_logging()
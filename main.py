@@ -1,14 +1,76 @@
+import asyncio
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from app.api import api_router
+from app.api.routes.adventure import resolve_job_queue
 from app.core.config import settings
 from app.core.logging import setup_logging
 from app.core.exceptions import EmaAIException, ema_exception_handler
+from app.core.http import create_http_client
+from app.core.metrics import MetricsMiddleware, metrics
+from app.core.rate_limit import RateLimitMiddleware, create_bucket_store, create_rate_limit_rules
+from app.services.adventure_generator import AdventureGenerator
+from app.services.similarity_search import SimilaritySearch
 
 # Configurer le logger
 logger = setup_logging()
 
+async def warm_up(app: FastAPI) -> None:
+    """
+    Créer le générateur d'aventures hors de la boucle d'événements
+
+    L'import de LangChain et d'openai et le chargement de l'encodage tiktoken
+    se font dans un thread, sans bloquer les requêtes déjà servies.
+    """
+    try:
+        # Chaque aventure générée devient immédiatement recherchable (dans ce worker)
+        on_generated = app.state.similarity_search.add_adventure if settings.SIMILARITY_INDEX_WRITES else None
+        app.state.adventure_generator = await asyncio.to_thread(
+            AdventureGenerator,
+            http_client=app.state.http_client,
+            on_generated=on_generated
+        )
+        # Remplir le pool d'aventures génériques dès le démarrage plutôt qu'à la première demande
+        if app.state.adventure_generator.pool is not None:
+            app.state.adventure_generator.pool.start()
+        logger.info("Générateur d'aventures prêt")
+    except Exception as e:
+        # Ne pas bloquer le démarrage (ex: clé OpenAI absente) : la route de génération réessaiera
+        logger.error(f"Impossible d'initialiser le générateur d'aventures: {str(e)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Créer les services partagés au démarrage et les libérer à l'arrêt
+    """
+    # Un seul pool de connexions keep-alive pour tout le processus
+    app.state.http_client = create_http_client()
+    # Index déjà construit dans le processus maître si l'application est préchargée (gunicorn.conf.py)
+    if getattr(app.state, "similarity_search", None) is None:
+        app.state.similarity_search = SimilaritySearch()
+    # Index créé hors de la boucle d'événements sans sa table des voisins : la calculer en arrière-plan
+    app.state.similarity_search.start_neighbor_table()
+    # Le générateur (LangChain, openai) se charge en arrière-plan : le serveur accepte
+    # les requêtes tout de suite, /ready indique quand il est disponible
+    app.state.adventure_generator = None
+    app.state.warmup = asyncio.create_task(warm_up(app)) if settings.WARMUP_ON_STARTUP else None
+    # Workers des tâches de génération asynchrones (reprend les tâches en attente du stockage SQLite)
+    resolve_job_queue(app).start()
+    
+    yield
+    
+    await app.state.job_queue.aclose()
+    if app.state.warmup is not None:
+        app.state.warmup.cancel()
+    if app.state.adventure_generator is not None:
+        await app.state.adventure_generator.aclose()
+    await app.state.http_client.aclose()
+    # Vider la file des logs écrits en arrière-plan (LOG_ENQUEUE)
+    await logger.complete()
+
 # Créer l'application FastAPI
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -16,8 +78,16 @@ app = FastAPI(
     version=settings.VERSION,
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
+    # Réponses des routes sans response_model sérialisées avec orjson
+    default_response_class=ORJSONResponse,
 )
 
+# Quotas par client devant la génération et la recherche (refus en 429 avant d'atteindre les routes),
+# ajouté avant CORS pour que les réponses 429 portent les en-têtes CORS
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, store=create_bucket_store(), rules=create_rate_limit_rules())
+
 # Configurer CORS
 app.add_middleware(
     CORSMiddleware,
@@ -27,6 +97,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Mesurer la latence de chaque requête par route et statut
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Ajouter le gestionnaire d'exceptions personnalisées
 app.add_exception_handler(EmaAIException, ema_exception_handler)
 
@@ -41,13 +115,65 @@ async def health_check():
     """
     return {"status": "ok", "version": settings.VERSION}
 
+# Route de disponibilité, distincte de /health : 503 tant que les services chargent
+@app.get("/ready", tags=["health"])
+async def readiness_check():
+    """
+    Vérifier que l'index de similarité et le générateur d'aventures sont chargés
+    """
+    warmup = getattr(app.state, "warmup", None)
+    if getattr(app.state, "adventure_generator", None) is not None:
+        generator_status = "ready"
+    elif warmup is not None and not warmup.done():
+        generator_status = "warming_up"
+    else:
+        # Échec du chargement ou WARMUP_ON_STARTUP=false : chargé à la première génération
+        generator_status = "not_loaded"
+    services = {
+        "similarity_search": "ready" if getattr(app.state, "similarity_search", None) is not None else "not_loaded",
+        "adventure_generator": generator_status,
+    }
+    ready = all(status == "ready" for status in services.values())
+    return ORJSONResponse(
+        {"status": "ready" if ready else "unavailable", "services": services},
+        status_code=200 if ready else 503
+    )
+
+# Métriques au format Prometheus
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+    async def get_metrics():
+        """
+        Exposer les métriques du processus au format texte de Prometheus
+        """
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def preload() -> None:
+    """
+    Construire les services en lecture seule avant le fork des workers
+
+    Appelé par gunicorn dans le processus maître : les workers héritent de
+    l'index de similarité et de sa table des voisins en copie sur écriture au
+    lieu de les reconstruire. Le maître n'a pas de boucle d'événements : la
+    table est calculée ici de façon synchrone. Les clients HTTP et les tâches
+    asyncio restent créés dans chaque worker.
+    """
+    similarity_search = SimilaritySearch()
+    similarity_search.build_neighbor_table_sync()
+    app.state.similarity_search = similarity_search
+
 # Point d'entrée pour exécuter l'application directement
 if __name__ == "__main__":
     logger.info(f"Starting {settings.PROJECT_NAME} v{settings.VERSION}")
+    # En production, préférer gunicorn (gunicorn -c gunicorn.conf.py main:app) pour le préchargement
     uvicorn.run(
         "main:app",
         host=settings.HOST,
         port=settings.PORT,
-        reload=True,
+        reload=settings.RELOAD,
+        workers=None if settings.RELOAD else (settings.WORKERS or None),
+        loop=settings.SERVER_LOOP,
+        http=settings.SERVER_HTTP,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
         log_level=settings.LOG_LEVEL.lower(),
     ) 
\ No newline at end of file
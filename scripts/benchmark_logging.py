@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the per-request logging overhead
+
+Sends similarity search requests to main:app in process (no network) and
+emits one uvicorn-style access log per request, once without any log sink
+and once per logging mode. The overhead is the extra time per request spent
+in the request path, i.e. on the event loop. Logs are written to a temporary
+file instead of stdout.
+
+Usage:
+    python scripts/benchmark_logging.py
+    python scripts/benchmark_logging.py --requests 5000 --level debug
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+# Permettre l'exécution depuis la racine du projet sans installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loguru import logger
+from app.core.config import settings
+from app.services.catalog import load_catalog
+
+# Mode : (LOG_FORMAT, LOG_ENQUEUE)
+MODES = {
+    "text-sync": ("text", False),
+    "text-enqueue": ("text", True),
+    "json-enqueue": ("json", True),
+}
+
+async def run_requests(app, n_requests: int) -> float:
+    """Mean time per request in microseconds, including the access log line"""
+    adventure_ids = [adventure.id for adventure in load_catalog()]
+    access_logger = logging.getLogger("uvicorn.access")
+    # Les logs du client de test ne font pas partie du coût mesuré
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Échauffement : création de l'index et des caches
+        await client.post("/api/search_similar", json={"adventure_id": 1})
+        start = time.perf_counter()
+        for i in range(n_requests):
+            response = await client.post("/api/search_similar", json={"adventure_id": adventure_ids[i % len(adventure_ids)], "k": 5})
+            access_logger.info('%s - "%s %s HTTP/%s" %d', "127.0.0.1:5000", "POST", "/api/search_similar", "1.1", response.status_code)
+        return (time.perf_counter() - start) / n_requests * 1e6
+
+def configure(mode: str, level: str, sample_rate: float) -> None:
+    """Install the logging configuration of a mode, writing to the current sys.stdout"""
+    from app.core.logging import setup_logging
+
+    settings.LOG_LEVEL = level
+    settings.LOG_ACCESS_SAMPLE_RATE = sample_rate
+    if mode == "off":
+        logger.remove()
+        logging.getLogger("uvicorn.access").disabled = True
+        return
+    settings.LOG_FORMAT, settings.LOG_ENQUEUE = MODES[mode]
+    setup_logging()
+    logging.getLogger("uvicorn.access").disabled = sample_rate <= 0
+
+async def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Measure the per-request logging overhead")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per mode")
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds per mode (the fastest is kept)")
+    parser.add_argument("--level", default=settings.LOG_LEVEL, help="Log level")
+    parser.add_argument("--access-sample-rate", type=float, default=1.0, help="Share of access logs kept")
+    parser.add_argument("--modes", default="off," + ",".join(MODES), help="Comma-separated modes, off = no sink")
+    args = parser.parse_args()
+
+    # Toutes les requêtes viennent du même client : ne pas les limiter
+    settings.RATE_LIMIT_ENABLED = False
+    from main import app
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    results = {}
+    lines = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Modes alternés à chaque tour pour répartir le bruit de la machine
+        for _ in range(args.rounds):
+            for mode in modes:
+                log_path = os.path.join(tmp, f"{mode}.log")
+                with open(log_path, "w", encoding="utf-8") as log_file:
+                    stdout, sys.stdout = sys.stdout, log_file
+                    try:
+                        configure(mode, args.level, args.access_sample_rate)
+                        micros = await run_requests(app, args.requests)
+                        # Attendre l'écriture des messages en file (hors mesure)
+                        await logger.complete()
+                        logger.remove()
+                    finally:
+                        sys.stdout = stdout
+                results[mode] = min(micros, results.get(mode, float("inf")))
+                with open(log_path, encoding="utf-8") as log_file:
+                    lines[mode] = sum(1 for _ in log_file) / args.requests
+
+    for mode in modes:
+        print(f"{mode:<14} {results[mode]:>9.1f} us/request  {lines[mode]:>5.2f} lines/request")
+
+    if "off" in results:
+        print(f"\nOverhead vs no logging (level {args.level}, access sample rate {args.access_sample_rate}):")
+        for mode, micros in results.items():
+            if mode != "off":
+                print(f"{mode:<14} {micros - results['off']:>+9.1f} us/request")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Script to compare the full and compact generation prompts
+
+Counts input tokens for a fixed prompt set with both templates. With --live,
+also calls OpenAI and measures latency and output tokens (requires OPENAI_API_KEY).
+
+Usage:
+    python scripts/benchmark_prompts.py
+    python scripts/benchmark_prompts.py --live --max-tokens 400
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Permettre l'exécution depuis la racine du projet sans installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+
+PROMPTS = [
+    "Je cherche une randonnée facile près de Bordeaux",
+    "Une sortie kayak en famille dans le Périgord",
+    "Escalade pour grimpeurs confirmés dans les Pyrénées",
+    "Balade à vélo le long de la Loire avec des châteaux",
+    "Une activité nature au bord de l'océan au coucher du soleil",
+    "Micro-aventure de deux heures en forêt près de Paris",
+    "Randonnée en montagne avec bivouac dans les Alpes",
+    "Découverte des vignobles en Bourgogne à pied",
+]
+
+async def run_mode(mode: str, live: bool) -> dict:
+    """Run the prompt set with one template"""
+    # Import tardif : OPENAI_MAX_TOKENS doit être fixé avant la création du modèle
+    from app.services.adventure_generator import AdventureGenerator
+
+    generator = AdventureGenerator(prompt_mode=mode)
+    latencies = []
+    try:
+        for prompt in PROMPTS:
+            if live:
+                start = time.perf_counter()
+                # Appel direct au modèle, sans cache ni regroupement des requêtes
+                await generator._generate_with_retry(prompt)
+                latencies.append(time.perf_counter() - start)
+            else:
+                generator.token_usage.record(generator._prompt_tokens(prompt), 0)
+    finally:
+        await generator.aclose()
+
+    stats = generator.token_usage.stats()
+    if latencies:
+        stats["latency_p50"] = statistics.median(latencies)
+        stats["latency_max"] = max(latencies)
+    return stats
+
+async def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Compare full and compact generation prompts")
+    parser.add_argument("--live", action="store_true", help="Call OpenAI to measure latency and output tokens")
+    parser.add_argument("--max-tokens", type=int, default=settings.OPENAI_MAX_TOKENS, help="Output token cap (0 = none)")
+    args = parser.parse_args()
+
+    if not settings.OPENAI_API_KEY:
+        if args.live:
+            sys.exit("OPENAI_API_KEY is required with --live")
+        # Le modèle n'est pas appelé : une clé factice suffit pour construire le générateur
+        settings.OPENAI_API_KEY = "sk-benchmark"
+    settings.OPENAI_MAX_TOKENS = args.max_tokens
+
+    print(f"{len(PROMPTS)} prompts, model {settings.OPENAI_MODEL}, max_tokens {args.max_tokens or 'none'}")
+    print(f"{'mode':<8} {'avg in':>8} {'avg out':>8} {'total':>8} {'p50 (s)':>8} {'max (s)':>8}")
+    for mode in ("full", "compact"):
+        stats = await run_mode(mode, args.live)
+        print(
+            f"{mode:<8} {stats['avg_prompt_tokens']:>8.1f} {stats['avg_completion_tokens']:>8.1f} "
+            f"{stats['total_tokens']:>8} {stats.get('latency_p50', float('nan')):>8.2f} "
+            f"{stats.get('latency_max', float('nan')):>8.2f}"
+        )
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the response serialization paths per response size
+
+Compares, for similarity responses of increasing size and for a generated
+adventure:
+- fastapi: FastAPI's default path (response_model revalidation, jsonable_encoder, json.dumps)
+- orjson: orjson.dumps of model_dump(), without revalidation
+- pydantic: model_dump_json(), without revalidation
+- cached: pre-serialized bytes returned as is
+and the cost of building the response with and without validation.
+
+Usage:
+    python scripts/benchmark_serialization.py
+    python scripts/benchmark_serialization.py --sizes 5,20,100 --iterations 5000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Callable
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+# Permettre l'exécution depuis la racine du projet sans installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.responses import JSON_MEDIA_TYPE, json_bytes
+from app.models.adventure import Adventure, SimilarAdventure, SimilarAdventuresResponse
+
+ADVENTURE = Adventure(
+    title="Randonnée dans les vignobles de Saint-Émilion",
+    description="Une belle balade à travers les célèbres vignobles de Saint-Émilion, offrant des vues panoramiques sur la campagne bordelaise.",
+    location="Saint-Émilion, Bordeaux",
+    tags=["randonnée", "vignoble", "nature", "patrimoine"],
+    difficulty="facile",
+    duration=120,
+    distance=8.5,
+    latitude=44.8946,
+    longitude=-0.1556,
+)
+
+def similar_items(size: int) -> list:
+    return [(i, f"Aventure similaire numéro {i}", 1.0 - i / (size + 1), 12.345) for i in range(size)]
+
+def measure(run: Callable[[], object], iterations: int) -> float:
+    """Mean time per call in microseconds"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        run()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def fastapi_default(field, response) -> Callable[[], bytes]:
+    """The work FastAPI does for a route with response_model and the default JSONResponse"""
+    loop = asyncio.new_event_loop()
+
+    def run() -> bytes:
+        content = loop.run_until_complete(serialize_response(field=field, response_content=response))
+        return JSONResponse(content).body
+    return run
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark response serialization paths")
+    parser.add_argument("--sizes", default="5,20,100", help="Comma-separated numbers of similar adventures")
+    parser.add_argument("--iterations", type=int, default=2000, help="Iterations per measurement")
+    args = parser.parse_args()
+
+    similar_field = create_response_field(name="response", type_=SimilarAdventuresResponse)
+    adventure_field = create_response_field(name="response", type_=Adventure)
+
+    print(f"{'response':<16} {'bytes':>7} {'build':>8} {'build*':>8} {'fastapi':>8} {'orjson':>8} {'pydantic':>8} {'cached':>8}")
+    cases = [("adventure", adventure_field, lambda: ADVENTURE.model_copy(), lambda: ADVENTURE.model_copy())]
+    for size in [int(size) for size in args.sizes.split(",") if size.strip()]:
+        items = similar_items(size)
+        cases.append((
+            f"similar k={size}",
+            similar_field,
+            # Construction validée (chaque SimilarAdventure puis la réponse)
+            lambda items=items: SimilarAdventuresResponse(similar_adventures=[
+                SimilarAdventure(id=i, title=t, similarity_score=s, distance_km=d) for i, t, s, d in items
+            ]),
+            # Construction sans validation (valeurs produites par le service)
+            lambda items=items: SimilarAdventuresResponse.model_construct(similar_adventures=[
+                SimilarAdventure.model_construct(id=i, title=t, similarity_score=s, distance_km=d) for i, t, s, d in items
+            ]),
+        ))
+
+    for name, field, build, build_unchecked in cases:
+        response = build()
+        payload = json_bytes(response)
+        results = [
+            measure(build, args.iterations),
+            measure(build_unchecked, args.iterations),
+            measure(fastapi_default(field, response), args.iterations),
+            measure(lambda: orjson.dumps(response.model_dump()), args.iterations),
+            measure(lambda: response.model_dump_json().encode("utf-8"), args.iterations),
+            measure(lambda: Response(content=payload, media_type=JSON_MEDIA_TYPE).body, args.iterations),
+        ]
+        print(f"{name:<16} {len(payload):>7} " + " ".join(f"{micros:>8.1f}" for micros in results))
+
+    print("\nTimes in microseconds per response. build* = model_construct, without validation.")
+
+if __name__ == "__main__":
+    main()
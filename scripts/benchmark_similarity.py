@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks of the similarity search building blocks at several catalog sizes
+
+Uses random unit vectors and synthetic facets, so no catalog or embedding is
+needed. Measures index build time and per-query latency of the flat and IVF
+indexes, with and without a facet filter, batched search and the geo grid.
+Writes a JSON report that can be compared across commits.
+
+Usage:
+    python scripts/benchmark_similarity.py
+    python scripts/benchmark_similarity.py --sizes 10000,100000 --queries 200 --output reports/similarity.json
+
+The 1M size needs about 1 GB of memory per 256 dimensions. Random vectors have
+no cluster structure: the IVF recall measured here is a worst case.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+# Permettre l'exécution depuis la racine du projet sans installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.facet_index import FacetIndex, SearchFilters, build_postings
+from app.services.geo_index import GeoGridIndex
+from app.services.vector_index import FlatIndex, IVFIndex
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DIFFICULTIES = ["facile", "moyen", "difficile"]
+TAGS = ["randonnée", "vélo", "kayak", "escalade", "forêt", "montagne", "mer", "patrimoine"]
+
+def random_unit_vectors(rng: np.random.Generator, n: int, dim: int, block: int = 100_000) -> np.ndarray:
+    """Random unit vectors, generated by blocks to bound the float64 peak memory"""
+    vectors = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, block):
+        chunk = rng.standard_normal((min(block, n - start), dim))
+        vectors[start:start + len(chunk)] = chunk / np.linalg.norm(chunk, axis=1, keepdims=True)
+    return vectors
+
+def time_queries(run: Callable[[int], object], n_queries: int) -> Dict[str, float]:
+    """Per-query latency percentiles, in milliseconds"""
+    latencies = []
+    for i in range(n_queries):
+        start = time.perf_counter()
+        run(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies = np.array(latencies)
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "qps": round(1000 / float(latencies.mean()), 1),
+    }
+
+def benchmark_size(size: int, dim: int, n_queries: int, k: int, batch: int, n_probe: int, seed: int) -> dict:
+    """Run every microbenchmark on one synthetic catalog"""
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    vectors = random_unit_vectors(rng, size, dim)
+    labels = {
+        "difficulty": build_postings([[DIFFICULTIES[i]] for i in rng.integers(0, len(DIFFICULTIES), size)]),
+        "tags": build_postings([
+            [TAGS[j] for j in rng.choice(len(TAGS), 2, replace=False)] for _ in range(size)
+        ]),
+    }
+    columns = {
+        "latitude": rng.uniform(42.0, 51.0, size).astype(np.float32),
+        "longitude": rng.uniform(-4.5, 8.0, size).astype(np.float32),
+        "duration": rng.integers(30, 600, size).astype(np.float32),
+        "distance": rng.uniform(1.0, 40.0, size).astype(np.float32),
+    }
+    data_seconds = time.perf_counter() - start
+
+    rows = rng.integers(0, size, n_queries)
+    queries = vectors[rows]
+    filters = SearchFilters(difficulty=("facile",), tags=("forêt",), max_duration=240)
+    results: Dict[str, object] = {"size": size, "data_seconds": round(data_seconds, 2)}
+
+    flat = FlatIndex(vectors)
+    results["flat_search"] = time_queries(lambda i: flat.search(queries[i], k, exclude=int(rows[i])), n_queries)
+
+    start = time.perf_counter()
+    facets = FacetIndex(size, labels, columns)
+    mask = facets.mask(filters)
+    results["facet_mask"] = {
+        "first_seconds": round(time.perf_counter() - start, 4),
+        "selectivity": round(float(mask.mean()), 4),
+        **time_queries(lambda i: facets.mask(filters), n_queries),
+    }
+    results["flat_search_filtered"] = time_queries(
+        lambda i: flat.search(queries[i], k, exclude=int(rows[i]), allowed=mask), n_queries
+    )
+
+    n_batches = max(1, n_queries // batch)
+    batch_latency = time_queries(
+        lambda i: flat.search_many(queries[(i * batch) % n_queries:][:batch], k), n_batches
+    )
+    results["flat_search_many"] = {"batch": batch, **batch_latency, "qps": round(batch_latency["qps"] * batch, 1)}
+
+    start = time.perf_counter()
+    ivf = IVFIndex(vectors, n_probe=n_probe, seed=seed)
+    results["ivf_build_seconds"] = round(time.perf_counter() - start, 2)
+    results["ivf_search"] = time_queries(lambda i: ivf.search(queries[i], k, exclude=int(rows[i])), n_queries)
+    results["ivf_search_filtered"] = time_queries(
+        lambda i: ivf.search(queries[i], k, exclude=int(rows[i]), allowed=mask), n_queries
+    )
+    truth = [set(flat.search(queries[i], k)[0].tolist()) for i in range(n_queries)]
+    found = [set(ivf.search(queries[i], k)[0].tolist()) for i in range(n_queries)]
+    results["ivf_recall"] = round(float(np.mean([len(t & f) / k for t, f in zip(truth, found)])), 4)
+
+    start = time.perf_counter()
+    geo = GeoGridIndex(columns["latitude"], columns["longitude"], settings.SIMILARITY_GEO_CELL_DEGREES)
+    results["geo_build_seconds"] = round(time.perf_counter() - start, 2)
+    results["geo_radius_50km"] = time_queries(
+        lambda i: geo.query_radius(float(columns["latitude"][rows[i]]), float(columns["longitude"][rows[i]]), 50.0),
+        n_queries,
+    )
+    return results
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the similarity search")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated catalog sizes")
+    parser.add_argument("--dim", type=int, default=settings.SIMILARITY_EMBEDDING_DIM, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=100, help="Queries per measurement")
+    parser.add_argument("--k", type=int, default=settings.SIMILARITY_DEFAULT_K, help="Results per query")
+    parser.add_argument("--batch", type=int, default=32, help="Queries per batched search")
+    parser.add_argument("--nprobe", type=int, default=settings.SIMILARITY_IVF_NPROBE, help="IVF lists probed per query")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", help="Write the JSON report to this file (default: stdout)")
+    args = parser.parse_args()
+
+    sizes: List[int] = [int(size) for size in args.sizes.split(",") if size.strip()]
+    results = []
+    for size in sizes:
+        print(f"Benchmarking {size} adventures...", file=sys.stderr)
+        results.append(benchmark_size(size, args.dim, args.queries, args.k, args.batch, args.nprobe, args.seed))
+
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "config": {"dim": args.dim, "queries": args.queries, "k": args.k, "batch": args.batch, "nprobe": args.nprobe},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Startup time of the service, measured with `python -X importtime`
+
+Imports main:app in fresh interpreters and reports the cumulative import time
+of the application, the slowest top-level packages, and whether the heavy LLM
+stack (LangChain, openai, tiktoken) was loaded. It should only be loaded by the
+background warm-up, never when the module is imported.
+
+Usage:
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --runs 5 --top 15 --output reports/startup.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# Permettre l'exécution depuis la racine du projet sans installation
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Paquets qui ne doivent pas être importés au chargement de l'application
+HEAVY_MODULES = ("langchain", "openai", "tiktoken")
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for each line of the -X importtime output"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|", 2)
+        entries.append((name.strip(), int(own), int(cumulative)))
+    return entries
+
+def measure_import(module: str = "main") -> Dict[str, object]:
+    """Import a module in a fresh interpreter and summarize its import times"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    entries = parse_importtime(result.stderr)
+    modules = {name for name, _, _ in entries}
+    # Temps propre de tous les modules, regroupé par paquet de premier niveau
+    packages: Dict[str, int] = {}
+    for name, own, _ in entries:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + own
+    return {
+        "total_us": next(cumulative for name, _, cumulative in entries if name == module),
+        "packages": packages,
+        "heavy_modules": sorted(heavy for heavy in HEAVY_MODULES if heavy in modules),
+    }
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Measure the import time of main:app")
+    parser.add_argument("--module", default="main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=3, help="Number of fresh interpreters")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest packages to report")
+    parser.add_argument("--output", help="Write the JSON report to this file (default: stdout)")
+    args = parser.parse_args()
+
+    runs = [measure_import(args.module) for _ in range(args.runs)]
+    # Médiane des passages : le premier, à froid, est souvent plus lent
+    packages = {
+        package: statistics.median(run["packages"].get(package, 0) for run in runs) / 1000
+        for package in runs[-1]["packages"]
+    }
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "module": args.module,
+        "runs_ms": [round(run["total_us"] / 1000, 1) for run in runs],
+        "median_ms": round(statistics.median(run["total_us"] for run in runs) / 1000, 1),
+        "heavy_modules_loaded": runs[-1]["heavy_modules"],
+        "slowest_packages_ms": {package: round(ms, 1) for package, ms in slowest},
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
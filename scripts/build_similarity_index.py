@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Script to build the on-disk similarity index used by SimilaritySearch
+
+Usage:
+    python scripts/build_similarity_index.py --catalog adventures.jsonl --output data/similarity_index
+    SIMILARITY_INDEX_PATH=data/similarity_index uvicorn main:app
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Permettre l'exécution depuis la racine du projet sans installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.catalog import load_catalog
+from app.services.embedding_store import write_embedding_store
+from app.services.embeddings import HashingEmbedder
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Build the EMA-AI similarity index")
+    parser.add_argument("--catalog", help="Catalog file (JSON list or JSONL), defaults to the demo catalog")
+    parser.add_argument("--output", required=True, help="Output directory of the index")
+    parser.add_argument("--dim", type=int, default=settings.SIMILARITY_EMBEDDING_DIM, help="Embedding dimension")
+    parser.add_argument("--ivf-lists", type=int, default=0, help="Number of IVF lists to precompute (0 = none)")
+    parser.add_argument("--neighbors", type=int, default=0, help="Number of neighbors to precompute per adventure (0 = none)")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    catalog = load_catalog(args.catalog)
+    print(f"Loaded {len(catalog)} adventures in {time.perf_counter() - start:.2f}s")
+    
+    start = time.perf_counter()
+    write_embedding_store(
+        args.output,
+        catalog,
+        HashingEmbedder(dim=args.dim),
+        ivf_lists=args.ivf_lists or None,
+        neighbors_k=args.neighbors or None
+    )
+    print(f"Index written to {args.output} in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
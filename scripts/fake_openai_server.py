@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Fake OpenAI-compatible server for offline load tests
+
+Answers POST /v1/chat/completions (plain and streaming) with a valid adventure
+JSON after a random latency, and injects server errors and rate limits at the
+configured rates. Point the service at it with OPENAI_API_BASE.
+
+Usage:
+    python scripts/fake_openai_server.py --port 9000 --latency-ms 800 --jitter 0.5 --failure-rate 0.02
+    OPENAI_API_BASE=http://127.0.0.1:9000/v1 OPENAI_API_KEY=sk-fake uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ADVENTURE = {
+    "title": "Boucle des crêtes au départ du village",
+    "description": "Une randonnée à la journée sur les crêtes, avec une vue dégagée sur la vallée et un retour par la forêt.",
+    "location": "Massif du Vercors, Isère",
+    "tags": ["randonnée", "montagne", "panorama"],
+    "difficulty": "moyen",
+    "duration": 240,
+    "distance": 12.5,
+    "latitude": 45.05,
+    "longitude": 5.55,
+}
+
+def create_app(
+    latency_ms: float = 800.0,
+    jitter: float = 0.5,
+    failure_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    chunk_size: int = 16,
+    seed: int = 0,
+) -> FastAPI:
+    """
+    Build the fake server
+
+    Args:
+        latency_ms: Median latency of a completion in milliseconds
+        jitter: Log-normal sigma of the latency (0 = constant latency)
+        failure_rate: Share of requests answered with a 500 error
+        rate_limit_rate: Share of requests answered with a 429 error
+        chunk_size: Characters per chunk in streaming mode
+        seed: Random seed, for reproducible runs
+    """
+    app = FastAPI(title="Fake OpenAI")
+    rng = random.Random(seed)
+    counter = itertools.count(1)
+    app.state.requests = 0
+
+    def error(status_code: int, message: str, error_type: str) -> JSONResponse:
+        return JSONResponse(status_code=status_code, content={"error": {"message": message, "type": error_type}})
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        number = next(counter)
+        model = body.get("model", "gpt-4")
+        latency = latency_ms / 1000 * (rng.lognormvariate(0, jitter) if jitter > 0 else 1.0)
+
+        draw = rng.random()
+        if draw < rate_limit_rate:
+            return error(429, "Rate limit reached (fake server)", "rate_limit_error")
+        if draw < rate_limit_rate + failure_rate:
+            await asyncio.sleep(latency)
+            return error(500, "Internal error (fake server)", "server_error")
+
+        content = json.dumps({**ADVENTURE, "title": f"{ADVENTURE['title']} #{number}"}, ensure_ascii=False)
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in body.get("messages", [])) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        completion_id = f"chatcmpl-fake-{number}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+
+        async def events():
+            pieces = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+            # La latence est répartie entre le premier token et les morceaux suivants
+            await asyncio.sleep(latency / 2)
+            for piece in pieces:
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                await asyncio.sleep(latency / 2 / len(pieces))
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "requests": app.state.requests}
+
+    return app
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server for load tests")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=9000, help="Bind port")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Median completion latency in milliseconds")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Log-normal sigma of the latency (0 = constant)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests failing with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests failing with a 429")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    app = create_app(
+        latency_ms=args.latency_ms,
+        jitter=args.jitter,
+        failure_rate=args.failure_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
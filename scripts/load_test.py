@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Load test of the EMA-AI API against a fake OpenAI backend
+
+Without --target, starts scripts/fake_openai_server.py and main:app with
+uvicorn on local ports, then drives /api/generate and /api/search_similar at
+the requested concurrency. Writes a JSON report (RPS, p50/p95/p99 latency,
+error rate per endpoint) that can be compared across commits.
+
+Usage:
+    python scripts/load_test.py --duration 30 --concurrency 32 --output reports/load.json
+    python scripts/load_test.py --latency-ms 2000 --failure-rate 0.05 --endpoints generate
+    python scripts/load_test.py --target http://localhost:8000 --endpoints search_similar
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+# Permettre l'exécution depuis la racine du projet sans installation
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.services.catalog import load_catalog
+
+PROMPTS = [
+    "Je cherche une randonnée facile près de Bordeaux",
+    "Une sortie kayak en famille dans le Périgord",
+    "Escalade pour grimpeurs confirmés dans les Pyrénées",
+    "Balade à vélo le long de la Loire avec des châteaux",
+    "Micro-aventure de deux heures en forêt près de Paris",
+    "Randonnée en montagne avec bivouac dans les Alpes",
+]
+
+def git_commit() -> Optional[str]:
+    """Current commit, to label the report"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def start_process(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(args, cwd=ROOT, env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+async def wait_ready(url: str, timeout: float = 30.0) -> None:
+    """Poll a health URL until it answers"""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+class Recorder:
+    """Latencies and outcomes per endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, endpoint: str, seconds: float, status: str) -> None:
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status] += 1
+
+    def report(self, elapsed: float) -> Dict[str, dict]:
+        endpoints = {}
+        for endpoint, latencies in self.latencies.items():
+            statuses = self.statuses[endpoint]
+            total = sum(statuses.values())
+            errors = total - statuses.get("200", 0)
+            ms = np.array(latencies) * 1000
+            endpoints[endpoint] = {
+                "requests": total,
+                "rps": round(total / elapsed, 2),
+                "error_rate": round(errors / total, 4) if total else 0.0,
+                "statuses": dict(statuses),
+                "latency_ms": {
+                    "p50": round(float(np.percentile(ms, 50)), 2),
+                    "p95": round(float(np.percentile(ms, 95)), 2),
+                    "p99": round(float(np.percentile(ms, 99)), 2),
+                    "max": round(float(ms.max()), 2),
+                },
+            }
+        return endpoints
+
+async def run_load(base_url: str, endpoints: List[str], concurrency: int, duration: float, k: int) -> dict:
+    """Drive the endpoints with `concurrency` workers for `duration` seconds"""
+    adventure_ids = [adventure.id for adventure in load_catalog()]
+    recorder = Recorder()
+    deadline = time.monotonic() + duration
+
+    async def request(client: httpx.AsyncClient, endpoint: str, n: int) -> httpx.Response:
+        if endpoint == "generate":
+            # Un prompt distinct par requête : mesure les appels au modèle, pas le cache
+            return await client.post("/api/generate", json={"prompt": f"{PROMPTS[n % len(PROMPTS)]} (essai {n})"})
+        return await client.post(
+            "/api/search_similar",
+            json={"adventure_id": adventure_ids[n % len(adventure_ids)], "k": k},
+        )
+
+    async def worker(client: httpx.AsyncClient, worker_id: int) -> None:
+        # Clients répartis également entre les routes testées
+        endpoint = endpoints[worker_id % len(endpoints)]
+        n = worker_id
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                status = str((await request(client, endpoint, n)).status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            recorder.record(endpoint, time.perf_counter() - start, status)
+            n += concurrency
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(client, i) for i in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    return {"elapsed_seconds": round(elapsed, 2), "endpoints": recorder.report(elapsed)}
+
+async def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Load test the EMA-AI API against a fake OpenAI backend")
+    parser.add_argument("--target", help="Base URL of a running service (default: start one locally)")
+    parser.add_argument("--endpoints", default="generate,search_similar", help="Comma-separated: generate, search_similar")
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of concurrent clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="Test duration in seconds")
+    parser.add_argument("--k", type=int, default=5, help="Number of similar adventures requested")
+    parser.add_argument("--app-port", type=int, default=8100, help="Port of the locally started service")
+    parser.add_argument("--fake-port", type=int, default=9100, help="Port of the fake OpenAI server")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Median latency of the fake OpenAI server")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Log-normal sigma of the fake latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of fake completions failing with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of fake completions failing with a 429")
+    parser.add_argument("--cache", action="store_true", help="Keep the generation cache enabled in the local service")
+    parser.add_argument("--output", help="Write the JSON report to this file (default: stdout)")
+    args = parser.parse_args()
+
+    endpoints = [endpoint.strip() for endpoint in args.endpoints.split(",") if endpoint.strip()]
+    processes: List[subprocess.Popen] = []
+    base_url = args.target
+    try:
+        if base_url is None:
+            fake_url = f"http://127.0.0.1:{args.fake_port}"
+            processes.append(start_process([
+                sys.executable, "scripts/fake_openai_server.py", "--port", str(args.fake_port),
+                "--latency-ms", str(args.latency_ms), "--jitter", str(args.jitter),
+                "--failure-rate", str(args.failure_rate), "--rate-limit-rate", str(args.rate_limit_rate),
+            ], {}))
+            await wait_ready(f"{fake_url}/health")
+
+            base_url = f"http://127.0.0.1:{args.app_port}"
+            processes.append(start_process([
+                sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.app_port), "--log-level", "warning",
+            ], {
+                "OPENAI_API_BASE": f"{fake_url}/v1",
+                "OPENAI_API_KEY": "sk-fake",
+                "CACHE_ENABLED": "true" if args.cache else "false",
+                # Tous les clients simulés partagent la même adresse IP
+                "RATE_LIMIT_ENABLED": "false",
+            }))
+            await wait_ready(f"{base_url}/health")
+
+        results = await run_load(base_url, endpoints, args.concurrency, args.duration, args.k)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {
+            "target": args.target or "local",
+            "endpoints": endpoints,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "fake_latency_ms": None if args.target else args.latency_ms,
+            "fake_jitter": None if args.target else args.jitter,
+            "fake_failure_rate": None if args.target else args.failure_rate,
+            "fake_rate_limit_rate": None if args.target else args.rate_limit_rate,
+        },
+        **results,
+    }
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Report written to {args.output}")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    asyncio.run(main())
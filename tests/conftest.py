@@ -0,0 +1,19 @@
+import pytest
+from app.models.adventure import Adventure
+
+@pytest.fixture
+def make_adventure():
+    """Fabrique d'aventures de test : seul le titre change d'un appel à l'autre"""
+    def factory(title: str = "Randonnée dans les vignobles de Saint-Émilion") -> Adventure:
+        return Adventure(
+            title=title,
+            description="Une belle balade à travers les vignobles.",
+            location="Saint-Émilion, Bordeaux",
+            tags=["randonnée", "vignoble"],
+            difficulty="facile",
+            duration=120,
+            distance=8.5,
+            latitude=44.8946,
+            longitude=-0.1556
+        )
+    return factory
@@ -1,7 +1,12 @@
+import asyncio
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from app.services.adventure_generator import AdventureGenerator
 from app.models.adventure import Adventure
+from app.core.config import settings
+from app.core.exceptions import InvalidPromptError, OpenAIError
+from app.core.http import create_http_client
+from app.services.cache import AdventureCache, MemoryCacheBackend
 
 @pytest.mark.asyncio
 async def test_adventure_generator_mock():
@@ -21,38 +26,258 @@ async def test_adventure_generator_mock():
     )
     
     # Créer un mock pour la chaîne LLM
-    with patch.object(AdventureGenerator, '__init__', return_value=None) as mock_init:
-        with patch.object(AdventureGenerator, 'chain') as mock_chain:
-            # Configurer le mock pour retourner un résultat JSON
-            mock_chain.arun = MagicMock(return_value="""
-            {
-                "title": "Randonnée dans les vignobles de Saint-Émilion",
-                "description": "Une belle balade à travers les célèbres vignobles de Saint-Émilion, offrant des vues panoramiques sur la campagne bordelaise.",
-                "location": "Saint-Émilion, Bordeaux",
-                "tags": ["randonnée", "vignoble", "nature", "patrimoine"],
-                "difficulty": "facile",
-                "duration": 120,
-                "distance": 8.5,
-                "latitude": 44.8946,
-                "longitude": -0.1556
-            }
-            """)
-            
-            # Configurer le mock pour le parser
-            generator = AdventureGenerator()
-            generator.parser = MagicMock()
-            generator.parser.parse = MagicMock(return_value=mock_adventure)
-            
-            # Appeler la méthode à tester
-            result = await generator.generate_adventure("Je cherche une randonnée près de Bordeaux")
-            
-            # Vérifier que le résultat est correct
-            assert result == mock_adventure
-            assert result.title == "Randonnée dans les vignobles de Saint-Émilion"
-            assert result.location == "Saint-Émilion, Bordeaux"
-            assert "randonnée" in result.tags
-            assert result.difficulty == "facile"
-            assert result.duration == 120
-            assert result.distance == 8.5
-            assert result.latitude == 44.8946
-            assert result.longitude == -0.1556 
\ No newline at end of file
+    with patch.object(settings, "OPENAI_API_KEY", "sk-test"):
+        generator = AdventureGenerator()
+        mock_chain = MagicMock()
+        # Configurer le mock pour retourner un résultat JSON
+        mock_chain.arun = AsyncMock(return_value="""
+        {
+            "title": "Randonnée dans les vignobles de Saint-Émilion",
+            "description": "Une belle balade à travers les célèbres vignobles de Saint-Émilion, offrant des vues panoramiques sur la campagne bordelaise.",
+            "location": "Saint-Émilion, Bordeaux",
+            "tags": ["randonnée", "vignoble", "nature", "patrimoine"],
+            "difficulty": "facile",
+            "duration": 120,
+            "distance": 8.5,
+            "latitude": 44.8946,
+            "longitude": -0.1556
+        }
+        """)
+        generator.chain = mock_chain
+        
+        # Appeler la méthode à tester
+        result = await generator.generate_adventure("Je cherche une randonnée près de Bordeaux")
+        
+        # Vérifier que le résultat est correct
+        assert result == mock_adventure
+        assert result.title == "Randonnée dans les vignobles de Saint-Émilion"
+        assert result.location == "Saint-Émilion, Bordeaux"
+        assert "randonnée" in result.tags
+        assert result.difficulty == "facile"
+        assert result.duration == 120
+        assert result.distance == 8.5
+        assert result.latitude == 44.8946
+        assert result.longitude == -0.1556 
+
+@pytest.mark.asyncio
+async def test_adventure_generator_shared_http_client():
+    """Tester que le générateur réutilise le client HTTP partagé sans le fermer"""
+    http_client = create_http_client()
+    
+    with patch.object(settings, "OPENAI_API_KEY", "sk-test"):
+        generator = AdventureGenerator(http_client=http_client)
+    
+    assert generator.llm.async_client._client._client is http_client
+    
+    # Le client appartient à l'appelant : aclose() ne doit pas le fermer
+    await generator.aclose()
+    assert not http_client.is_closed
+    await http_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_adventure_generator_uses_cache():
+    """Tester qu'un prompt proche d'un prompt déjà traité n'appelle pas le LLM"""
+    on_generated = MagicMock()
+    with patch.object(settings, "OPENAI_API_KEY", "sk-test"):
+        generator = AdventureGenerator(
+            cache=AdventureCache(MemoryCacheBackend(max_size=10)),
+            on_generated=on_generated
+        )
+    
+    generator.chain = MagicMock()
+    generator.chain.arun = AsyncMock(return_value=Adventure(
+        title="Randonnée dans les vignobles de Saint-Émilion",
+        description="Une belle balade à travers les vignobles.",
+        location="Saint-Émilion, Bordeaux",
+        tags=["randonnée", "vignoble"],
+        difficulty="facile",
+        duration=120,
+        distance=8.5,
+        latitude=44.8946,
+        longitude=-0.1556
+    ).model_dump_json())
+    
+    first = await generator.generate_adventure("rando facile près de Bordeaux")
+    second = await generator.generate_adventure("randonnée facile autour de Bordeaux")
+    
+    assert second == first
+    assert generator.chain.arun.await_count == 1
+    assert generator.cache.stats()["semantic_hits"] == 1
+    # Seule l'aventure réellement générée est transmise pour indexation
+    on_generated.assert_called_once_with(first)
+
+
+class FakeChunk:
+    """Morceau de réponse streamée par le modèle"""
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeStreamingLLM:
+    """Faux modèle qui diffuse une réponse JSON par petits morceaux"""
+    def __init__(self, text: str, chunk_size: int = 7):
+        self.text = text
+        self.chunk_size = chunk_size
+    
+    async def astream(self, messages):
+        for i in range(0, len(self.text), self.chunk_size):
+            yield FakeChunk(self.text[i:i + self.chunk_size])
+
+
+@pytest.mark.asyncio
+async def test_adventure_generator_stream():
+    """Tester la diffusion des champs puis de l'aventure validée"""
+    adventure = Adventure(
+        title="Kayak sur la Dordogne",
+        description="Descente tranquille de la Dordogne en kayak.",
+        location="Dordogne",
+        tags=["kayak", "rivière"],
+        difficulty="facile",
+        duration=180,
+        distance=12.0,
+        latitude=44.8,
+        longitude=1.2
+    )
+    with patch.object(settings, "OPENAI_API_KEY", "sk-test"):
+        generator = AdventureGenerator(cache=AdventureCache(MemoryCacheBackend(max_size=10)))
+    generator.llm = FakeStreamingLLM(adventure.model_dump_json())
+    
+    events = [event async for event in generator.stream_adventure("kayak en Dordogne")]
+    
+    fields = [data["name"] for event, data in events if event == "field"]
+    assert fields == list(Adventure.model_fields)
+    assert events[-1] == ("adventure", adventure)
+    
+    # La seconde demande est servie depuis le cache
+    generator.llm = FakeStreamingLLM("")
+    events = [event async for event in generator.stream_adventure("kayak en Dordogne")]
+    assert events[-1] == ("adventure", adventure)
+
+
+@pytest.mark.asyncio
+async def test_stream_fields_are_repaired():
+    """Tester que les champs diffusés sont réparés comme l'aventure finale"""
+    text = (
+        '{"title": "Kayak", "description": "Descente de rivière.", "location": "Dordogne", '
+        '"tags": "kayak, rivière", "difficulty": "Easy", "duration": "2h30", "distance": "12,5 km", '
+        '"latitude": 60.0, "longitude": 1.2}'
+    )
+    with patch.object(settings, "OPENAI_API_KEY", "sk-test"):
+        generator = AdventureGenerator()
+    generator.llm = FakeStreamingLLM(text)
+    
+    events = [event async for event in generator.stream_adventure("kayak en Dordogne")]
+    
+    fields = {data["name"]: data["value"] for event, data in events if event == "field"}
+    adventure = events[-1][1]
+    assert fields == adventure.model_dump()
+    assert fields["latitude"] == 51.1
+    assert fields["difficulty"] == "facile"
+
+
+@pytest.mark.asyncio
+async def test_adventure_generator_generate_many():
+    """Tester la génération par lots : ordre conservé, erreurs par élément, concurrence bornée"""
+    with patch.object(settings, "OPENAI_API_KEY", "sk-test"):
+        generator = AdventureGenerator(cache=AdventureCache(MemoryCacheBackend(max_size=10)))
+    
+    running = 0
+    max_running = 0
+    
+    async def fake_generate(prompt, max_tokens=None, slot_timeout=0):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01 if "kayak" in prompt else 0.001)
+        running -= 1
+        if "erreur" in prompt:
+            raise OpenAIError("OpenAI indisponible")
+        return Adventure(
+            title=prompt,
+            description="Description",
+            location="France",
+            tags=[],
+            difficulty="facile",
+            duration=60,
+            distance=5.0,
+            latitude=45.0,
+            longitude=0.5
+        )
+    
+    generator._generate_with_retry = fake_generate
+    prompts = ["kayak sur la Dordogne", "", "escalade dans les Pyrénées", "erreur upstream", "vélo en Loire"]
+    
+    results = await generator.generate_many(prompts, concurrency=2)
+    
+    assert [getattr(result, "title", None) for result in results] == [
+        "kayak sur la Dordogne", None, "escalade dans les Pyrénées", None, "vélo en Loire"
+    ]
+    assert isinstance(results[1], InvalidPromptError)
+    assert isinstance(results[3], OpenAIError)
+    assert max_running <= 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_key_includes_call_parameters():
+    """Tester que seuls les appels au même plafond de tokens et à la même attente sont regroupés"""
+    with patch.object(settings, "OPENAI_API_KEY", "sk-test"):
+        generator = AdventureGenerator()
+    calls = []
+    
+    async def fake_generate(prompt, max_tokens=None, slot_timeout=0):
+        calls.append((max_tokens, slot_timeout))
+        await asyncio.sleep(0.01)
+        if slot_timeout == 0:
+            raise OpenAIError("Limite de concurrence atteinte", retry_after=1)
+        return Adventure(
+            title=prompt,
+            description="Description",
+            location="France",
+            tags=[],
+            difficulty="facile",
+            duration=60,
+            distance=5.0,
+            latitude=45.0,
+            longitude=0.5
+        )
+    
+    generator._generate_with_retry = fake_generate
+    prompt = "kayak sur la Dordogne"
+    results = await asyncio.gather(
+        generator.generate_adventure(prompt),
+        generator.generate_adventure(prompt, slot_timeout=30),
+        generator.generate_adventure(prompt, slot_timeout=30),
+        generator.generate_adventure(prompt, max_tokens=2000, slot_timeout=30),
+        return_exceptions=True
+    )
+    
+    # Le refus de l'appel interactif n'atteint pas les appelants qui acceptent d'attendre
+    assert isinstance(results[0], OpenAIError)
+    assert [result.title for result in results[1:]] == [prompt] * 3
+    assert sorted(calls, key=str) == sorted([(None, 0), (None, 30), (2000, 30)], key=str)
+
+
+@pytest.mark.asyncio
+async def test_adventure_generator_token_accounting():
+    """Tester le comptage des tokens et le prompt compact"""
+    with patch.object(settings, "OPENAI_API_KEY", "sk-test"):
+        full = AdventureGenerator(prompt_mode="full")
+        compact = AdventureGenerator(prompt_mode="compact")
+    
+    # Le prompt compact garde tous les champs de l'aventure
+    for field in Adventure.model_fields:
+        assert field in compact.prompt.format(prompt="rando")
+    assert compact._template_tokens < full._template_tokens / 4
+    
+    compact.chain = MagicMock()
+    compact.chain.arun = AsyncMock(return_value=Adventure(
+        title="Randonnée", description="Balade.", location="Bordeaux", tags=["randonnée"],
+        difficulty="facile", duration=60, distance=3.0, latitude=44.8, longitude=-0.5
+    ).model_dump_json())
+    await compact._generate_with_retry("Je cherche une randonnée près de Bordeaux")
+    
+    stats = compact.token_usage.stats()
+    assert stats["requests"] == 1
+    assert stats["prompt_tokens"] > compact._template_tokens
+    assert stats["completion_tokens"] > 0
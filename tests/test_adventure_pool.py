@@ -0,0 +1,64 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.core.config import settings
+from app.services.adventure_generator import AdventureGenerator
+from app.services.adventure_pool import AdventurePool, IntentClassifier, load_pool_categories
+from app.services.cache import AdventureCache, MemoryCacheBackend
+
+def test_intent_classifier_routes_generic_prompts_only():
+    """Tester que les demandes génériques ont une catégorie et que les demandes précises n'en ont pas"""
+    classifier = IntentClassifier(load_pool_categories())
+    
+    assert classifier.classify("Une sortie kayak en famille") == "kayak"
+    assert classifier.classify("Sortie escalade dans les Pyrénées") == "escalade_pyrenees"
+    assert classifier.classify("Je cherche une randonnée dans les vignobles") == "vignobles"
+    assert classifier.classify("Balade à vélo sur les bords de Loire") == "velo_loire"
+    # Un lieu ou un public absent des exemples : la demande est générée par le LLM
+    assert classifier.classify("Une sortie kayak en famille dans le Périgord") is None
+    assert classifier.classify("Sortie kayak en famille à Annecy") is None
+    assert classifier.classify("Randonnée dans les vignobles en Alsace avec des enfants") is None
+    assert classifier.classify("Marche en bord de mer en Bretagne") is None
+    assert classifier.classify("Escalade pour grimpeurs confirmés dans les Pyrénées") is None
+    assert classifier.classify("Micro-aventure de deux heures en forêt près de Paris") is None
+    assert classifier.classify("Kayak de mer de nuit en Bretagne avec observation des phoques") is None
+
+@pytest.mark.asyncio
+async def test_pool_refill_and_take(make_adventure):
+    """Tester le remplissage par catégorie, le service unique de chaque aventure et la priorité au trafic"""
+    categories = load_pool_categories()
+    generate = AsyncMock(side_effect=lambda prompt: make_adventure(prompt))
+    busy = False
+    pool = AdventurePool(categories, generate, size=2, is_busy=lambda: busy)
+    
+    assert await pool.refill() == 2 * len(categories)
+    assert await pool.refill() == 0
+    
+    first = pool.take("une sortie en kayak")
+    second = pool.take("une sortie en kayak")
+    assert first.title != second.title
+    assert pool.take("une sortie en kayak") is None
+    assert pool.take("parapente au-dessus du lac d'Annecy") is None
+    assert pool.stats()["categories"]["kayak"] == 0
+    
+    # Service amont occupé : pas de remplissage
+    busy = True
+    assert await pool.refill() == 0
+    busy = False
+    assert await pool.refill() == 2
+    assert pool.stats()["served"] == 2
+
+@pytest.mark.asyncio
+async def test_generator_serves_pool_without_llm_call(make_adventure):
+    """Tester qu'un prompt générique est servi depuis le pool puis depuis le cache, sans appel au LLM"""
+    with patch.object(settings, "OPENAI_API_KEY", "sk-test"), patch.object(settings, "POOL_ENABLED", True):
+        generator = AdventureGenerator(cache=AdventureCache(MemoryCacheBackend(max_size=10)))
+    generator.chain = MagicMock()
+    generator.chain.arun = AsyncMock(side_effect=AssertionError("LLM appelé"))
+    generator.pool.generate = AsyncMock(return_value=make_adventure("Kayak sur la Dordogne"))
+    await generator.pool.refill()
+    
+    prompt = "Une sortie kayak en famille"
+    assert (await generator.generate_adventure(prompt)).title == "Kayak sur la Dordogne"
+    assert (await generator.generate_adventure(prompt)).title == "Kayak sur la Dordogne"
+    assert generator.pool.stats()["served"] == 1
+    await generator.aclose()
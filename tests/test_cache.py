@@ -0,0 +1,68 @@
+from unittest.mock import patch
+from app.models.adventure import Adventure
+from app.services.cache import AdventureCache, MemoryCacheBackend, DiskCacheBackend
+
+def test_cache_exact_and_semantic_hits(make_adventure):
+    """Tester les correspondances exactes (prompt normalisé) et approchées"""
+    cache = AdventureCache(MemoryCacheBackend(max_size=10), similarity_threshold=0.9)
+    cache.set("rando facile près de Bordeaux", make_adventure())
+    
+    assert cache.get("Rando facile  PRÈS de Bordeaux !") == make_adventure()
+    assert cache.get("randonnée facile autour de Bordeaux") == make_adventure()
+    assert cache.get("escalade difficile dans les Pyrénées") is None
+    
+    stats = cache.stats()
+    assert stats["exact_hits"] == 1
+    assert stats["semantic_hits"] == 1
+    assert stats["misses"] == 1
+
+def test_cache_get_json_returns_stored_payload(make_adventure):
+    """Tester que le JSON en cache est servi tel quel, sans resérialisation"""
+    cache = AdventureCache(MemoryCacheBackend(max_size=10))
+    cache.set("kayak sur la Dordogne", make_adventure("Kayak"))
+    
+    with patch.object(Adventure, "model_validate_json") as model_validate_json:
+        payload = cache.get_json("Kayak sur la  Dordogne")
+    # Aucune reconstruction du modèle à la lecture
+    model_validate_json.assert_not_called()
+    assert Adventure.model_validate_json(payload) == make_adventure("Kayak")
+    assert cache.get_json("surf à Biarritz") is None
+    assert cache.stats()["exact_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_cache_ttl_and_lru_eviction(make_adventure):
+    """Tester l'expiration des entrées et l'éviction LRU"""
+    cache = AdventureCache(MemoryCacheBackend(max_size=2), ttl=60)
+    cache.set("kayak sur la Dordogne", make_adventure("Kayak"))
+    cache.set("vélo dans la vallée de la Loire", make_adventure("Vélo"))
+    
+    # Accéder au kayak le rend plus récent que le vélo, qui sera évincé
+    assert cache.get("kayak sur la Dordogne").title == "Kayak"
+    cache.set("escalade dans les Pyrénées", make_adventure("Escalade"))
+    assert len(cache.backend) == 2
+    assert cache.get("vélo dans la vallée de la Loire") is None
+    
+    cache.ttl = -1
+    cache.set("surf à Biarritz", make_adventure("Surf"))
+    assert cache.get("surf à Biarritz") is None
+
+def test_disk_cache_backend_persistence(tmp_path, make_adventure):
+    """Tester que le backend disque conserve les entrées entre deux instances"""
+    path = str(tmp_path / "cache.sqlite3")
+    AdventureCache(DiskCacheBackend(path, max_size=10)).set("rando facile près de Bordeaux", make_adventure())
+    
+    cache = AdventureCache(DiskCacheBackend(path, max_size=10))
+    assert cache.get("randonnée facile autour de Bordeaux") == make_adventure()
+
+def test_disk_cache_validates_stored_payload(tmp_path, make_adventure):
+    """Tester qu'une entrée persistante invalide (schéma obsolète, corruption) n'est jamais servie"""
+    backend = DiskCacheBackend(str(tmp_path / "cache.sqlite3"), max_size=10)
+    cache = AdventureCache(backend)
+    cache.set("kayak sur la Dordogne", make_adventure("Kayak"))
+    assert Adventure.model_validate_json(cache.get_json("kayak sur la Dordogne")).title == "Kayak"
+    
+    entry = backend.get("kayak sur la dordogne")
+    entry.payload = '{"title": "Kayak"}'
+    backend.set(entry)
+    assert cache.get_json("kayak sur la Dordogne") is None
+    assert len(backend) == 0
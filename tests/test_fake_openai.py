@@ -0,0 +1,65 @@
+import json
+import httpx
+import pytest
+from unittest.mock import patch
+from app.core.config import settings
+from app.core.exceptions import OpenAIError
+from app.core.metrics import LLM_TOKENS
+from app.services.adventure_generator import AdventureGenerator
+from scripts.fake_openai_server import create_app
+
+def fake_generator(event_hooks=None, **server_options) -> AdventureGenerator:
+    """Générateur branché sur le faux serveur OpenAI, sans passer par le réseau"""
+    transport = httpx.ASGITransport(app=create_app(latency_ms=0, jitter=0, **server_options))
+    http_client = httpx.AsyncClient(transport=transport, event_hooks=event_hooks)
+    with patch.object(settings, "OPENAI_API_KEY", "sk-fake"), \
+            patch.object(settings, "OPENAI_API_BASE", "http://fake-openai/v1"):
+        generator = AdventureGenerator(http_client=http_client)
+    generator.cache = None
+    return generator
+
+@pytest.mark.asyncio
+async def test_fake_server_serves_adventures():
+    """Tester la génération complète contre le faux serveur OpenAI (client, chaîne, parsing)"""
+    generator = fake_generator()
+    
+    adventure = await generator.generate_adventure("Une randonnée en montagne")
+    events = [event async for event in generator.stream_adventure("Une randonnée en montagne")]
+    
+    assert adventure.title.startswith("Boucle des crêtes")
+    assert events[-1][0] == "adventure"
+    assert any(name == "field" for name, _ in events)
+    assert generator.token_usage.stats()["requests"] == 2
+    await generator.http_client.aclose()
+
+@pytest.mark.asyncio
+async def test_fake_server_injects_failures():
+    """Tester l'injection d'erreurs du faux serveur"""
+    generator = fake_generator(failure_rate=1.0)
+    generator.llm.max_retries = 0
+    
+    with pytest.raises(OpenAIError):
+        async for _ in generator.stream_adventure("Une randonnée en montagne"):
+            pass
+    
+    assert generator.resilience_stats()["circuit_breaker"]["consecutive_failures"] == 1
+    await generator.http_client.aclose()
+
+@pytest.mark.asyncio
+async def test_fake_server_receives_request_max_tokens():
+    """Tester que le plafond de tokens d'une requête est transmis à l'API et que les tokens sont exportés"""
+    bodies = []
+    
+    async def capture(request):
+        bodies.append(json.loads(request.content))
+    
+    generator = fake_generator(event_hooks={"request": [capture]})
+    completion_tokens = LLM_TOKENS.value(model=settings.OPENAI_MODEL, kind="completion")
+    
+    await generator.generate_adventure("Une randonnée en montagne", max_tokens=300)
+    await generator.generate_adventure("Une randonnée en forêt")
+    
+    assert bodies[0]["max_tokens"] == 300
+    assert "max_tokens" not in bodies[1]
+    assert LLM_TOKENS.value(model=settings.OPENAI_MODEL, kind="completion") > completion_tokens
+    await generator.http_client.aclose()
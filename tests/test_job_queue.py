@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from app.api.routes.adventure import get_job_queue
+from app.core.exceptions import JobNotFoundError, OpenAIError, ServiceOverloadedError
+from app.models.adventure import Adventure
+from app.services.job_queue import FAILED, PENDING, RUNNING, SUCCEEDED, Job, JobQueue, MemoryJobStore, SQLiteJobStore
+
+@pytest.mark.asyncio
+async def test_jobs_run_by_priority_and_record_errors(make_adventure):
+    """Tester l'ordre de priorité, le résultat des tâches et l'erreur d'une tâche échouée"""
+    order = []
+    
+    async def run(prompt):
+        order.append(prompt)
+        if prompt == "échec":
+            raise OpenAIError("OpenAI indisponible")
+        return make_adventure(prompt)
+    
+    queue = JobQueue(MemoryJobStore(), run, workers=1)
+    low = await queue.submit("basse", priority=0)
+    failing = await queue.submit("échec", priority=1)
+    high = await queue.submit("haute", priority=9)
+    
+    assert (await queue.wait(low.id, timeout=5)).status == SUCCEEDED
+    assert order == ["haute", "échec", "basse"]
+    assert Adventure.model_validate_json((await queue.get(high.id)).result).title == "haute"
+    assert (await queue.get(failing.id)).status == FAILED
+    assert (await queue.get(failing.id)).error_code == "OPENAI_API_ERROR"
+    assert (await queue.stats())["succeeded"] == 2
+    
+    with pytest.raises(JobNotFoundError):
+        await queue.get("inconnue")
+    await queue.aclose()
+
+@pytest.mark.asyncio
+async def test_queue_depth_backpressure_and_sqlite_resume(tmp_path, make_adventure):
+    """Tester le refus au-delà de max_pending et la reprise des tâches en attente après redémarrage"""
+    path = str(tmp_path / "jobs.sqlite3")
+    started = asyncio.Event()
+    
+    async def blocked(prompt):
+        started.set()
+        await asyncio.Event().wait()
+    
+    queue = JobQueue(SQLiteJobStore(path), blocked, workers=1, max_pending=1)
+    running = await queue.submit("kayak sur la Dordogne")
+    await started.wait()
+    waiting = await queue.submit("vélo le long de la Loire")
+    with pytest.raises(ServiceOverloadedError):
+        await queue.submit("escalade dans les Pyrénées")
+    # Stockage partagé : la limite compte les tâches en attente de tous les workers
+    other = JobQueue(SQLiteJobStore(path), blocked, workers=1, max_pending=1)
+    with pytest.raises(ServiceOverloadedError):
+        await other.submit("escalade dans les Pyrénées")
+    await other.aclose()
+    
+    # Arrêt : la tâche interrompue et celle jamais commencée restent en attente
+    await queue.aclose()
+    assert {job.id for job in SQLiteJobStore(path).pending()} == {running.id, waiting.id}
+    
+    async def run(prompt):
+        return make_adventure(prompt)
+    
+    restarted = JobQueue(SQLiteJobStore(path), run, workers=2)
+    restarted.start()
+    assert (await restarted.wait(running.id, timeout=5)).status == SUCCEEDED
+    assert (await restarted.wait(waiting.id, timeout=5)).status == SUCCEEDED
+    await restarted.aclose()
+
+def test_generation_job_routes(make_adventure):
+    """Tester la création d'une tâche puis la consultation de son résultat en long polling"""
+    async def run(prompt):
+        await asyncio.sleep(0.05)
+        return make_adventure("Kayak sur la Dordogne")
+    
+    queue = JobQueue(MemoryJobStore(), run, workers=1)
+    app.dependency_overrides[get_job_queue] = lambda: queue
+    try:
+        with TestClient(app) as lifespan_client:
+            response = lifespan_client.post("/api/generate/jobs", json={"prompt": "kayak en Dordogne", "priority": 3})
+            assert response.status_code == 202
+            job = response.json()
+            assert job["status"] == PENDING
+            
+            response = lifespan_client.get(f"/api/generate/jobs/{job['id']}", params={"wait": 5})
+            assert response.status_code == 200
+            assert response.json()["status"] == SUCCEEDED
+            assert response.json()["adventure"]["title"] == "Kayak sur la Dordogne"
+            
+            assert lifespan_client.post("/api/generate/jobs", json={"prompt": "abc"}).status_code == 400
+            response = lifespan_client.get("/api/generate/jobs/inconnue")
+            assert response.status_code == 404
+            assert response.json()["code"] == "JOB_NOT_FOUND"
+    finally:
+        app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_temporary_refusals_are_retried_and_running_jobs_recovered(tmp_path, make_adventure):
+    """Tester la remise en file des refus temporaires (Retry-After) et la reprise des tâches abandonnées en cours"""
+    calls = []
+    
+    async def run(prompt):
+        calls.append(prompt)
+        if prompt == "toujours refusée" or len(calls) == 1:
+            raise OpenAIError("Service OpenAI indisponible", retry_after=0)
+        return make_adventure(prompt)
+    
+    queue = JobQueue(MemoryJobStore(), run, workers=1, max_attempts=3, retry_backoff=0.01)
+    recovered = await queue.submit("kayak sur la Dordogne")
+    done = await queue.wait(recovered.id, timeout=5)
+    assert done.status == SUCCEEDED
+    assert done.attempts == 2
+    
+    refused = await queue.submit("toujours refusée")
+    done = await queue.wait(refused.id, timeout=5)
+    assert done.status == FAILED
+    assert done.error_code == "OPENAI_API_ERROR"
+    assert done.attempts == 3
+    assert (await queue.stats())["retried"] == 3
+    await queue.aclose()
+    
+    # Tâche restée en cours après un arrêt brutal du processus : reprise au démarrage suivant
+    path = str(tmp_path / "jobs.sqlite3")
+    crashed = Job(id="abandonnée", prompt="vélo le long de la Loire", priority=0, status=RUNNING, created_at=0, updated_at=0)
+    SQLiteJobStore(path).save(crashed)
+    restarted = JobQueue(SQLiteJobStore(path), run, running_timeout=0)
+    restarted.start()
+    assert (await restarted.wait(crashed.id, timeout=5)).status == SUCCEEDED
+    await restarted.aclose()
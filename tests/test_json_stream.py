@@ -0,0 +1,15 @@
+from app.services.json_stream import IncrementalJSONParser
+
+def test_incremental_parser_emits_complete_fields():
+    """Tester que chaque champ est émis dès que sa valeur est complète"""
+    parser = IncrementalJSONParser()
+    chunks = ['Voici ```json\n{"tit', 'le": "Rando, ', 'vignes \\"bio\\"", "tags": ["vin", ', '"nature"], "dur', 'ation": 120', '}\n```']
+    
+    emitted = [parser.feed(chunk) for chunk in chunks]
+    
+    assert emitted[1] == []
+    assert emitted[2] == [("title", 'Rando, vignes "bio"')]
+    assert emitted[3] == [("tags", ["vin", "nature"])]
+    assert emitted[4] == []
+    assert emitted[5] == [("duration", 120)]
+    assert parser.done
@@ -0,0 +1,59 @@
+import io
+import json
+import logging
+import threading
+import pytest
+from loguru import logger
+from app.core.logging import AccessLogSampler, BackgroundWriter, _json_format
+
+@pytest.mark.asyncio
+async def test_background_writer_writes_json_lines():
+    """Tester l'écriture en arrière-plan au format JSON, contexte et exception compris"""
+    stream = io.StringIO()
+    handler_id = logger.add(BackgroundWriter(stream), format=_json_format, level="INFO")
+    try:
+        logger.bind(request_id="abc").info("Aventure générée: {}", "Boucle des crêtes")
+        logger.debug("Ignoré sous le niveau configuré: {}", "prompt")
+        try:
+            raise ValueError("réponse invalide")
+        except ValueError:
+            logger.exception("Échec du parsing")
+        await logger.complete()
+    finally:
+        logger.remove(handler_id)
+    
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [record["message"] for record in records] == ["Aventure générée: Boucle des crêtes", "Échec du parsing"]
+    assert records[0]["request_id"] == "abc"
+    assert records[0]["level"] == "INFO"
+    assert "ValueError: réponse invalide" in records[1]["exception"]
+
+def test_access_log_sampler():
+    """Tester l'échantillonnage des logs d'accès"""
+    record = logging.LogRecord("uvicorn.access", logging.INFO, __file__, 1, "GET /health", None, None)
+    
+    assert all(AccessLogSampler(1.0).filter(record) for _ in range(100))
+    assert not any(AccessLogSampler(0.0).filter(record) for _ in range(100))
+    kept = sum(AccessLogSampler(0.2).filter(record) for _ in range(5000))
+    assert 700 < kept < 1300
+
+def test_background_writer_drops_overflow():
+    """Tester que la file d'écriture est bornée et que les messages perdus sont comptés puis signalés"""
+    class BlockedStream(io.StringIO):
+        def __init__(self):
+            super().__init__()
+            self.unblocked = threading.Event()
+        
+        def write(self, text):
+            self.unblocked.wait()
+            return super().write(text)
+    
+    stream = BlockedStream()
+    writer = BackgroundWriter(stream, max_size=2)
+    for index in range(10):
+        writer.write(f"message {index}\n")
+    
+    assert writer.dropped >= 7
+    stream.unblocked.set()
+    writer.stop()
+    assert f"{writer.dropped} messages de log perdus" in stream.getvalue()
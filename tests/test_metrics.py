@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+from main import app
+from app.core.metrics import HTTP_REQUESTS, MetricsRegistry
+
+client = TestClient(app)
+
+def test_registry_renders_prometheus_text():
+    """Tester le format d'exposition des compteurs et histogrammes"""
+    registry = MetricsRegistry()
+    counter = registry.counter("test_requests_total", "Requêtes", ("route",))
+    histogram = registry.histogram("test_duration_seconds", "Durées", ("stage",), buckets=(0.1, 1.0))
+    
+    counter.inc(route="/api/generate")
+    counter.inc(2, route="/api/generate")
+    histogram.observe(0.05, stage="parse")
+    histogram.observe(0.5, stage="parse")
+    histogram.observe(3.0, stage="parse")
+    
+    lines = registry.render().splitlines()
+    assert "# TYPE test_requests_total counter" in lines
+    assert 'test_requests_total{route="/api/generate"} 3' in lines
+    assert 'test_duration_seconds_bucket{stage="parse",le="0.1"} 1' in lines
+    assert 'test_duration_seconds_bucket{stage="parse",le="1"} 2' in lines
+    assert 'test_duration_seconds_bucket{stage="parse",le="+Inf"} 3' in lines
+    assert 'test_duration_seconds_count{stage="parse"} 3' in lines
+    assert 'test_duration_seconds_sum{stage="parse"} 3.55' in lines
+
+def test_metrics_endpoint_reports_routes_and_stages():
+    """Tester que /metrics expose les requêtes par route, les étapes, les caches et les codes d'erreur"""
+    before = HTTP_REQUESTS.value(method="DELETE", route="/api/adventures/{adventure_id}", status="404")
+    
+    client.post("/api/search_similar", json={"adventure_id": 2, "k": 4})
+    client.post("/api/search_similar", json={"adventure_id": 2, "k": 4})
+    client.delete("/api/adventures/999999")
+    
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'ema_http_requests_total{method="POST",route="/api/search_similar",status="200"}' in text
+    assert 'ema_stage_duration_seconds_count{component="similarity",stage="index_search"}' in text
+    assert 'ema_cache_requests_total{cache="similarity",result="hit"}' in text
+    assert 'ema_errors_total{code="ADVENTURE_NOT_FOUND"}' in text
+    assert HTTP_REQUESTS.value(method="DELETE", route="/api/adventures/{adventure_id}", status="404") == before + 1
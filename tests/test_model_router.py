@@ -0,0 +1,141 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, patch
+from app.core.config import settings
+from app.core.metrics import LLM_TOKENS
+from app.models.adventure import Adventure
+from app.services.adventure_generator import AdventureGenerator
+from app.services.model_router import ModelRouter, prompt_complexity
+
+class FakeBackend:
+    """Faux modèle : répond après un délai, ou échoue"""
+    def __init__(self, name: str, delay: float, fail: bool = False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+    
+    async def __call__(self) -> str:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError(f"{self.name} indisponible")
+        return self.name
+
+def make_call(backends):
+    return lambda model: backends[model]()
+
+def test_complexity_routes_to_capable_model():
+    """Tester le choix du modèle selon la complexité du prompt"""
+    router = ModelRouter(["fast", "strong"], complexity_threshold=0.3, latency_budget=5)
+    simple = "Une balade en forêt"
+    complex_prompt = (
+        "Un itinéraire de plusieurs jours en bivouac dans les Alpes, avec des enfants de 8 et 10 ans, "
+        "accessible en train, sans matériel d'escalade et avec un budget de 200 euros"
+    )
+    
+    assert prompt_complexity(simple) < prompt_complexity(complex_prompt)
+    assert router.choose(simple) == ["fast", "strong"]
+    assert router.choose(complex_prompt) == ["strong", "fast"]
+
+def test_latency_budget_demotes_slow_model():
+    """Tester qu'un modèle dont le p95 dépasse le budget cède la place"""
+    router = ModelRouter(["fast", "strong"], complexity_threshold=0.0, latency_budget=2)
+    for _ in range(20):
+        router.tracker.record("strong", 5.0)
+        router.tracker.record("fast", 0.5)
+    
+    assert router.choose("rando") == ["fast", "strong"]
+    assert router.stats()["strong"]["p95"] == pytest.approx(5.0)
+
+@pytest.mark.asyncio
+async def test_hedge_returns_first_response():
+    """Tester la requête de couverture quand le modèle principal tarde"""
+    backends = {"fast": FakeBackend("fast", 1.0), "strong": FakeBackend("strong", 0.01)}
+    router = ModelRouter(["fast", "strong"], complexity_threshold=1.1, latency_budget=5, hedge_delay=0.05)
+    
+    assert await router.run("rando", make_call(backends)) == "strong"
+    await asyncio.sleep(0)
+    # L'appel lent est annulé dès que l'autre a répondu
+    assert backends["fast"].cancelled == 1
+
+@pytest.mark.asyncio
+async def test_no_hedge_toward_slower_model():
+    """Tester que la couverture n'est pas lancée vers un modèle plus lent que le budget restant"""
+    backends = {"fast": FakeBackend("fast", 0.2), "strong": FakeBackend("strong", 0.01)}
+    router = ModelRouter(["fast", "strong"], complexity_threshold=1.1, latency_budget=2, hedge_delay=0.05)
+    for _ in range(20):
+        router.tracker.record("strong", 5.0)
+    
+    assert await router.run("rando", make_call(backends)) == "fast"
+    assert backends["strong"].calls == 0
+
+@pytest.mark.asyncio
+async def test_fallback_on_error():
+    """Tester le repli immédiat quand le modèle principal échoue"""
+    backends = {"fast": FakeBackend("fast", 0.01, fail=True), "strong": FakeBackend("strong", 0.01)}
+    router = ModelRouter(["fast", "strong"], complexity_threshold=1.1, latency_budget=5, hedge_delay=5)
+    
+    assert await router.run("rando", make_call(backends)) == "strong"
+    assert router.stats()["fast"]["errors"] == 1
+    
+    backends["strong"].fail = True
+    with pytest.raises(RuntimeError):
+        await router.run("rando", make_call(backends))
+
+@pytest.mark.asyncio
+async def test_generator_uses_router():
+    """Tester l'intégration du routeur dans le générateur avec de faux modèles"""
+    adventure = Adventure(
+        title="Randonnée", description="Balade.", location="Bordeaux", tags=["randonnée"],
+        difficulty="facile", duration=60, distance=3.0, latitude=44.8, longitude=-0.5
+    )
+    with patch.object(settings, "OPENAI_API_KEY", "sk-test"), \
+         patch.object(settings, "OPENAI_MODEL_TIERS", ["fast", "strong"]):
+        generator = AdventureGenerator()
+    
+    failing = FakeBackend("fast", 0.01, fail=True)
+    generator.chains["fast"] = MagicMock(arun=lambda prompt: failing())
+    generator.chains["strong"] = MagicMock(arun=lambda prompt: asyncio.sleep(0.01, adventure.model_dump_json()))
+    
+    strong_tokens = LLM_TOKENS.value(model="strong", kind="completion")
+    
+    result = await generator._generate_with_retry("Je cherche une randonnée près de Bordeaux")
+    
+    assert result == adventure
+    assert generator.router.stats()["strong"]["calls"] == 1
+    # Les tokens sont attribués au modèle qui a répondu, après le repli
+    assert LLM_TOKENS.value(model="strong", kind="completion") > strong_tokens
+    assert LLM_TOKENS.value(model="fast", kind="completion") == 0
+
+@pytest.mark.asyncio
+async def test_each_model_has_its_own_circuit_breaker():
+    """Tester qu'un modèle en panne n'ouvre pas le circuit des autres et que ses refus ne comptent pas comme erreurs"""
+    adventure = Adventure(
+        title="Randonnée", description="Balade.", location="Bordeaux", tags=["randonnée"],
+        difficulty="facile", duration=60, distance=3.0, latitude=44.8, longitude=-0.5
+    )
+    with patch.object(settings, "OPENAI_API_KEY", "sk-test"), \
+         patch.object(settings, "OPENAI_MODEL_TIERS", ["fast", "strong"]), \
+         patch.object(settings, "CIRCUIT_FAILURE_THRESHOLD", 1):
+        generator = AdventureGenerator()
+    
+    failing = FakeBackend("fast", 0.01, fail=True)
+    generator.chains["fast"] = MagicMock(arun=lambda prompt: failing())
+    generator.chains["strong"] = MagicMock(arun=lambda prompt: asyncio.sleep(0.01, adventure.model_dump_json()))
+    
+    assert await generator._generate_with_retry("rando près de Bordeaux") == adventure
+    models = generator.resilience_stats()["models"]
+    assert models["fast"]["circuit_breaker"]["state"] == "open"
+    assert models["strong"]["circuit_breaker"]["state"] == "closed"
+    
+    # Circuit ouvert : le modèle n'est pas appelé et le refus n'est pas une erreur du modèle
+    assert await generator._generate_with_retry("rando près de Bordeaux") == adventure
+    assert failing.calls == 1
+    assert generator.router.stats()["fast"]["errors"] == 1
+    assert generator.router.stats()["strong"]["calls"] == 2
@@ -0,0 +1,87 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.core.exceptions import EmaAIException, ema_exception_handler
+from app.core.rate_limit import MemoryBucketStore, RateLimitMiddleware, RateLimitRule, SQLiteBucketStore
+
+def make_app(store) -> FastAPI:
+    """Créer une application limitée à 2 générations, 5 prompts et 3 recherches par lot, sans limite sur la recherche"""
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, store=store, rules=[
+        RateLimitRule(name="generate_batch", method="POST", path_prefix="/api/generate/batch",
+                      per_minute=6, burst=5, cost_field="prompts"),
+        RateLimitRule(name="generate", method="POST", path_prefix="/api/generate", per_minute=6, burst=2),
+        RateLimitRule(name="search", method="POST", path_prefix="/api/search_similar/batch",
+                      per_minute=6, burst=3, cost_field="adventure_ids"),
+        RateLimitRule(name="search", method="POST", path_prefix="/api/search_similar", per_minute=0, burst=0),
+    ])
+    app.add_exception_handler(EmaAIException, ema_exception_handler)
+    
+    @app.post("/api/generate")
+    async def generate():
+        return {"ok": True}
+    
+    @app.post("/api/generate/batch")
+    async def generate_batch(request: Request):
+        return {"count": len((await request.json())["prompts"])}
+    
+    @app.post("/api/search_similar")
+    async def search():
+        return {"ok": True}
+    
+    @app.post("/api/search_similar/batch")
+    async def search_batch():
+        return {"ok": True}
+    
+    return app
+
+def test_rate_limit_per_client():
+    """Tester le refus en 429 avec Retry-After, par clé d'API ou adresse IP"""
+    client = TestClient(make_app(MemoryBucketStore(max_keys=10)))
+    
+    assert [client.post("/api/generate").status_code for _ in range(2)] == [200, 200]
+    response = client.post("/api/generate")
+    assert response.status_code == 429
+    assert response.json()["code"] == "RATE_LIMITED"
+    # 6 requêtes par minute : un jeton toutes les 10 secondes
+    assert 1 <= int(response.headers["Retry-After"]) <= 10
+    
+    # Une autre clé d'API a son propre seau ; la recherche n'est pas limitée
+    assert client.post("/api/generate", headers={"X-API-Key": "client-b"}).status_code == 200
+    assert client.post("/api/generate", headers={"Authorization": "Bearer client-b"}).status_code == 200
+    assert client.post("/api/generate", headers={"X-API-Key": "client-b"}).status_code == 429
+    assert all(client.post("/api/search_similar").status_code == 200 for _ in range(10))
+
+def test_sqlite_buckets_are_shared(tmp_path):
+    """Tester que deux processus (deux stockages sur le même fichier) partagent le quota d'un client"""
+    path = str(tmp_path / "rate_limits.sqlite3")
+    first, second = SQLiteBucketStore(path), SQLiteBucketStore(path)
+    
+    assert first.take("generate:ip:1.2.3.4", rate=0.1, capacity=2) == 0
+    assert second.take("generate:ip:1.2.3.4", rate=0.1, capacity=2) == 0
+    assert 9 < first.take("generate:ip:1.2.3.4", rate=0.1, capacity=2) <= 10
+    assert second.take("generate:ip:5.6.7.8", rate=0.1, capacity=2) == 0
+
+def test_batch_requests_are_charged_per_prompt(tmp_path):
+    """Tester qu'un lot coûte un jeton par prompt, sur un stockage SQLite appelé hors de la boucle"""
+    client = TestClient(make_app(SQLiteBucketStore(str(tmp_path / "rate_limits.sqlite3"))))
+    
+    response = client.post("/api/generate/batch", json={"prompts": ["a", "b", "c", "d"]})
+    assert response.status_code == 200
+    # Le corps lu par le middleware est rejoué pour la route
+    assert response.json() == {"count": 4}
+    
+    response = client.post("/api/generate/batch", json={"prompts": ["a", "b"]})
+    assert response.status_code == 429
+    assert "generate_batch" in response.json()["message"]
+    # Le quota des générations unitaires est distinct
+    assert client.post("/api/generate").status_code == 200
+    
+    # Un lot plus grand que la rafale n'est jamais accepté : refus immédiat, sans consommer de jetons
+    response = client.post("/api/generate/batch", json={"prompts": ["a"] * 6}, headers={"X-API-Key": "client-b"})
+    assert response.status_code == 429
+    assert "split" in response.json()["message"]
+    
+    # Une recherche par lot coûte un jeton par aventure
+    assert client.post("/api/search_similar/batch", json={"adventure_ids": [1, 2]}).status_code == 200
+    assert client.post("/api/search_similar/batch", json={"adventure_ids": [3, 4]}).status_code == 429
+    assert client.post("/api/search_similar/batch", json={"adventure_ids": [1] * 4}).status_code == 429
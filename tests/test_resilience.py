@@ -0,0 +1,121 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.core.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from app.core.concurrency_limiter import AIMDLimiter
+from app.core.config import settings
+from app.core.exceptions import OpenAIError
+from app.services.adventure_generator import AdventureGenerator
+
+def test_aimd_limiter_adjusts_limit():
+    """Tester l'augmentation additive et la diminution multiplicative de la limite"""
+    limiter = AIMDLimiter(initial_limit=2, min_limit=1, max_limit=4, latency_target=1.0, backoff=0.5)
+
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+    assert limiter.rejected == 1
+
+    limiter.release(0.1, success=True)
+    assert limiter.limit == pytest.approx(2.5)
+    limiter.release(5.0, success=True)  # trop lent : traité comme une surcharge
+    assert limiter.limit == pytest.approx(1.25)
+    assert limiter.in_flight == 0
+
+    limiter.try_acquire()
+    limiter.release(success=None)  # annulé : pas d'ajustement
+    assert limiter.limit == pytest.approx(1.25)
+
+    limiter.try_acquire()
+    limiter.release(0.1, success=False)
+    assert limiter.limit == 1.0
+
+def test_circuit_breaker_opens_and_recovers():
+    """Tester l'ouverture du circuit après des échecs consécutifs puis sa fermeture après un appel de test"""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, half_open_max_calls=1)
+
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.acquire() == pytest.approx(30, abs=1)
+
+    # Délai écoulé : un seul appel de test passe
+    breaker.opened_at -= 30
+    assert breaker.acquire() is None
+    assert breaker.state == HALF_OPEN
+    assert breaker.acquire() is not None
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.acquire() is None
+
+def test_circuit_breaker_reopens_on_half_open_failure():
+    """Tester qu'un échec de l'appel de test rouvre le circuit"""
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=10)
+    for _ in range(5):
+        breaker.record_failure()
+    breaker.opened_at -= 10
+
+    assert breaker.acquire() is None
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["retry_after"] > 0
+
+@pytest.mark.asyncio
+async def test_generator_fails_fast_when_circuit_open():
+    """Tester que le générateur refuse sans appeler OpenAI quand le circuit est ouvert"""
+    with patch.object(settings, "OPENAI_API_KEY", "sk-test"):
+        generator = AdventureGenerator(cache=None)
+    generator.cache = None
+    generator.chain = AsyncMock()
+    generator.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+
+    with pytest.raises(RuntimeError):
+        async with generator._llm_call():
+            raise RuntimeError("OpenAI indisponible")
+
+    with pytest.raises(OpenAIError) as exc_info:
+        await generator.generate_adventure("Une randonnée facile près de Bordeaux")
+
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "30"
+    generator.chain.arun.assert_not_called()
+    assert generator.resilience_stats()["circuit_breaker"]["state"] == OPEN
+    await generator.aclose()
+
+@pytest.mark.asyncio
+async def test_generator_rejects_over_concurrency_limit():
+    """Tester le refus immédiat (503 avec Retry-After) quand la limite de concurrence est atteinte"""
+    with patch.object(settings, "OPENAI_API_KEY", "sk-test"):
+        generator = AdventureGenerator(cache=None)
+    generator.cache = None
+    generator.chain = AsyncMock()
+    generator.limiter = AIMDLimiter(initial_limit=1)
+    generator.limiter.try_acquire()
+
+    with pytest.raises(OpenAIError) as exc_info:
+        await generator.generate_adventure("Une randonnée facile près de Bordeaux")
+    
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "1"
+
+    generator.chain.arun.assert_not_called()
+    assert generator.resilience_stats()["concurrency"]["rejected"] == 1
+    await generator.aclose()
+
+@pytest.mark.asyncio
+async def test_limiter_queues_internal_callers():
+    """Tester l'attente bornée d'une place : attribuée dans l'ordre à la libération, refusée à l'expiration"""
+    limiter = AIMDLimiter(initial_limit=1)
+    assert await limiter.acquire()
+    
+    waiter = asyncio.ensure_future(limiter.acquire(timeout=1))
+    await asyncio.sleep(0)
+    assert limiter.snapshot()["waiting"] == 1
+    assert not limiter.try_acquire()
+    
+    limiter.release(success=None)
+    assert await waiter
+    assert limiter.in_flight == 1
+    assert not await limiter.acquire(timeout=0.01)
+    assert limiter.snapshot()["waiting"] == 0
@@ -1,6 +1,13 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
-from main import app
+from unittest.mock import patch
+from main import app, preload
+from app.core.config import settings
+from app.api.routes.adventure import get_adventure_generator, get_similarity_search
+from app.services.similarity_search import SimilaritySearch
+from app.core.exceptions import OpenAIError
+from app.models.adventure import Adventure
 
 # Créer un client de test
 client = TestClient(app)
@@ -52,4 +59,155 @@ def test_search_similar_adventures():
         adventure = data["similar_adventures"][0]
         assert "id" in adventure
         assert "title" in adventure
-        assert "similarity_score" in adventure 
\ No newline at end of file
+        assert "similarity_score" in adventure
+
+
+def test_services_are_shared_between_requests():
+    """Tester que les services sont créés une seule fois par processus"""
+    with TestClient(app) as lifespan_client:
+        similarity_search = app.state.similarity_search
+        
+        for _ in range(2):
+            response = lifespan_client.post("/api/search_similar", json={"adventure_id": 1})
+            assert response.status_code == 200
+        
+        assert app.state.similarity_search is similarity_search
+        assert not app.state.http_client.is_closed
+    
+    # Le pool de connexions est fermé à l'arrêt
+    assert app.state.http_client.is_closed
+
+def test_preloaded_similarity_search_is_reused():
+    """Tester que l'index préchargé avant le fork des workers n'est pas reconstruit au démarrage"""
+    with patch.object(settings, "SIMILARITY_NEIGHBORS_K", 4):
+        preload()
+    preloaded = app.state.similarity_search
+    # Sans boucle d'événements dans le maître, la table des voisins est calculée au préchargement
+    assert preloaded._main.neighbors is not None
+    
+    with TestClient(app) as lifespan_client:
+        response = lifespan_client.post("/api/search_similar", json={"adventure_id": 1})
+        assert response.status_code == 200
+        assert app.state.similarity_search is preloaded
+
+def test_generate_adventure_stream():
+    """Tester le format Server-Sent Events de la route de génération en streaming"""
+    class FakeGenerator:
+        def validate_prompt(self, prompt):
+            pass
+        
+        async def stream_adventure(self, prompt, max_tokens=None):
+            yield "field", {"name": "title", "value": "Kayak sur la Dordogne"}
+            raise OpenAIError("OpenAI indisponible")
+    
+    app.dependency_overrides[get_adventure_generator] = lambda: FakeGenerator()
+    try:
+        response = client.post("/api/generate/stream", json={"prompt": "kayak en Dordogne"})
+    finally:
+        app.dependency_overrides.clear()
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    assert events[0][0] == "event: field"
+    assert json.loads(events[0][1][len("data: "):]) == {"name": "title", "value": "Kayak sur la Dordogne"}
+    assert events[1][0] == "event: error"
+    assert json.loads(events[1][1][len("data: "):])["code"] == "OPENAI_API_ERROR"
+
+def test_generate_adventures_batch():
+    """Tester la route de génération par lots, avec et sans streaming"""
+    class FakeGenerator:
+        async def iter_many(self, prompts, concurrency=None):
+            yield 1, OpenAIError("OpenAI indisponible")
+            yield 0, Adventure(
+                title="Kayak sur la Dordogne",
+                description="Descente de la Dordogne en kayak.",
+                location="Dordogne",
+                tags=["kayak"],
+                difficulty="facile",
+                duration=180,
+                distance=12.0,
+                latitude=44.8,
+                longitude=1.2
+            )
+        
+        async def generate_many(self, prompts, concurrency=None):
+            results = [None] * len(prompts)
+            async for index, result in self.iter_many(prompts, concurrency):
+                results[index] = result
+            return results
+    
+    app.dependency_overrides[get_adventure_generator] = lambda: FakeGenerator()
+    try:
+        prompts = ["kayak en Dordogne", "escalade dans les Pyrénées"]
+        response = client.post("/api/generate/batch", json={"prompts": prompts})
+        streamed = client.post("/api/generate/batch", json={"prompts": prompts, "stream": True})
+    finally:
+        app.dependency_overrides.clear()
+    
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [item["index"] for item in results] == [0, 1]
+    assert results[0]["adventure"]["title"] == "Kayak sur la Dordogne"
+    assert results[1]["error"]["code"] == "OPENAI_API_ERROR"
+    
+    # En streaming, les résultats arrivent dans l'ordre de fin
+    lines = [json.loads(line) for line in streamed.text.splitlines()]
+    assert [item["index"] for item in lines] == [1, 0]
+
+def test_index_and_remove_adventure():
+    """Tester l'indexation puis le retrait d'une aventure via l'API"""
+    adventure = {
+        "title": "Dégustation dans les vignobles de Saint-Émilion",
+        "description": "Balade entre les vignes et les caves de Saint-Émilion, avec dégustation de vin.",
+        "location": "Saint-Émilion, Gironde",
+        "tags": ["balade", "vignoble", "vin", "dégustation"],
+        "difficulty": "facile",
+        "duration": 120,
+        "distance": 4.0,
+        "latitude": 44.89,
+        "longitude": -0.15
+    }
+    app.dependency_overrides[get_similarity_search] = lambda: similarity_search
+    similarity_search = SimilaritySearch()
+    try:
+        response = client.post("/api/adventures", json={**adventure, "id": 42})
+        assert response.status_code == 201
+        assert response.json() == {"id": 42}
+        
+        similar = client.post("/api/search_similar", json={"adventure_id": 42, "k": 2}).json()
+        assert {a["id"] for a in similar["similar_adventures"]} == {1, 3}
+        
+        assert client.delete("/api/adventures/42").status_code == 204
+        assert client.delete("/api/adventures/42").status_code == 404
+        
+        # Plusieurs workers : chacun a son index, les mises à jour sont refusées
+        size = len(similarity_search)
+        with patch.object(settings, "SIMILARITY_INDEX_WRITES", False):
+            response = client.post("/api/adventures", json={**adventure, "id": 43})
+            assert response.status_code == 409
+            assert response.json()["code"] == "INDEX_READ_ONLY"
+            assert client.delete("/api/adventures/1").status_code == 409
+        assert len(similarity_search) == size
+    finally:
+        app.dependency_overrides.clear()
+
+def test_search_similar_adventures_batch():
+    """Tester la recherche par lots : mêmes résultats qu'à l'unité, erreurs par élément"""
+    response = client.post("/api/search_similar/batch", json={"adventure_ids": [1, 999, 3, 1], "k": 3})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    
+    assert [item["adventure_id"] for item in results] == [1, 999, 3, 1]
+    assert results[1]["error"]["code"] == "ADVENTURE_NOT_FOUND"
+    assert results[0]["similar_adventures"] == results[3]["similar_adventures"]
+    single = client.post("/api/search_similar", json={"adventure_id": 3, "k": 3}).json()
+    assert [a["id"] for a in results[2]["similar_adventures"]] == [a["id"] for a in single["similar_adventures"]]
+
+def test_search_similar_rejects_inverted_ranges():
+    """Tester le refus des filtres dont le minimum dépasse le maximum"""
+    response = client.post("/api/search_similar", json={"adventure_id": 1, "min_duration": 120, "max_duration": 60})
+    assert response.status_code == 422
+    response = client.post("/api/search_similar/batch", json={"adventure_ids": [1], "min_distance": 10, "max_distance": 5})
+    assert response.status_code == 422
+    assert client.post("/api/search_similar", json={"adventure_id": 1, "min_distance": 5, "max_distance": 5}).status_code == 200
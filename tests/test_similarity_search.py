@@ -0,0 +1,274 @@
+import numpy as np
+import orjson
+import pytest
+from unittest.mock import patch
+from app.core.config import settings
+from app.core.exceptions import AdventureNotFoundError
+from app.models.adventure import Adventure
+from app.services.catalog import load_catalog
+from app.services.embedding_store import write_embedding_store
+from app.services.embeddings import HashingEmbedder
+from app.services.facet_index import SearchFilters
+from app.services.geo_index import GeoGridIndex, haversine_km
+from app.services.similarity_search import SimilaritySearch
+from app.services.vector_index import FlatIndex, IVFIndex, top_k
+
+@pytest.mark.asyncio
+async def test_find_similar_adventures_scores():
+    """Tester que les scores sont des cosinus réels, triés par ordre décroissant"""
+    similarity_search = SimilaritySearch()
+    
+    response = await similarity_search.find_similar_adventures(1, k=3)
+    
+    ids = [adventure.id for adventure in response.similar_adventures]
+    scores = [adventure.similarity_score for adventure in response.similar_adventures]
+    # Les aventures viticoles (Pomerol, Fronsac) sont les plus proches de Saint-Émilion
+    assert set(ids[:2]) == {3, 7}
+    assert 1 not in ids
+    assert scores == sorted(scores, reverse=True)
+    assert scores[0] == pytest.approx(float(similarity_search._main.embeddings[0] @ similarity_search._main.embeddings[ids[0] - 1]))
+
+@pytest.mark.asyncio
+async def test_find_similar_adventures_not_found():
+    """Tester l'erreur pour une aventure inexistante"""
+    with pytest.raises(AdventureNotFoundError):
+        await SimilaritySearch().find_similar_adventures(999)
+
+def test_top_k_matches_full_sort():
+    """Tester la sélection top-k par argpartition"""
+    scores = np.random.default_rng(0).random(1000).astype(np.float32)
+    
+    assert list(top_k(scores, 10)) == list(np.argsort(-scores)[:10])
+
+def test_ivf_index_recall():
+    """Tester que l'index approché retrouve l'essentiel des voisins exacts"""
+    # Vecteurs regroupés autour de 20 thèmes, comme des aventures d'activités proches
+    rng = np.random.default_rng(0)
+    themes = rng.normal(size=(20, 64))
+    vectors = themes[rng.integers(0, 20, 2000)] + 0.5 * rng.normal(size=(2000, 64))
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+    flat = FlatIndex(vectors)
+    ivf = IVFIndex(vectors, n_lists=20, n_probe=5)
+    
+    recalls = []
+    for row in range(0, 2000, 100):
+        exact, _ = flat.search(vectors[row], 10, exclude=row)
+        approx, _ = ivf.search(vectors[row], 10, exclude=row)
+        assert row not in approx
+        recalls.append(len(set(exact) & set(approx)) / 10)
+    
+    assert np.mean(recalls) >= 0.9
+
+@pytest.mark.asyncio
+async def test_similarity_search_from_embedding_store(tmp_path):
+    """Tester que l'index ouvert par memmap donne les mêmes résultats que l'index en mémoire"""
+    in_memory = SimilaritySearch()
+    write_embedding_store(tmp_path / "index", load_catalog(), in_memory.embedder, ivf_lists=2)
+    
+    mapped = SimilaritySearch(store_path=str(tmp_path / "index"), index_mode="flat")
+    
+    assert isinstance(mapped._main.embeddings, np.memmap)
+    assert isinstance(mapped._main.index, IVFIndex)
+    assert mapped._main.titles[0] == in_memory._main.titles[0]
+    for adventure_id in (1, 4, 7):
+        expected = await in_memory.find_similar_adventures(adventure_id, k=10)
+        response = await mapped.find_similar_adventures(adventure_id, k=10)
+        assert [a.id for a in response.similar_adventures] == [a.id for a in expected.similar_adventures]
+        assert [a.similarity_score for a in response.similar_adventures] == pytest.approx(
+            [a.similarity_score for a in expected.similar_adventures], abs=1e-5
+        )
+    
+    with pytest.raises(AdventureNotFoundError):
+        await mapped.find_similar_adventures(999)
+
+@pytest.mark.asyncio
+async def test_incremental_updates_and_compaction():
+    """Tester l'ajout et la suppression sans reconstruction, puis la compaction en arrière-plan"""
+    similarity_search = SimilaritySearch()
+    adventure = Adventure(
+        title="Dégustation dans les vignobles de Saint-Émilion",
+        description="Balade entre les vignes et les caves de Saint-Émilion, avec dégustation de vin.",
+        location="Saint-Émilion, Gironde",
+        tags=["balade", "vignoble", "vin", "dégustation"],
+        difficulty="facile",
+        duration=120,
+        distance=4.0,
+        latitude=44.89,
+        longitude=-0.15
+    )
+    
+    new_id = similarity_search.add_adventure(adventure)
+    assert new_id == 8
+    response = await similarity_search.find_similar_adventures(1, k=1)
+    assert response.similar_adventures[0].id == new_id
+    # La nouvelle aventure peut elle-même servir de référence
+    response = await similarity_search.find_similar_adventures(new_id, k=3)
+    assert new_id not in [a.id for a in response.similar_adventures]
+    
+    similarity_search.remove_adventure(3)
+    with pytest.raises(AdventureNotFoundError):
+        await similarity_search.find_similar_adventures(3)
+    
+    await similarity_search.compact()
+    
+    assert len(similarity_search._delta) == 0
+    assert len(similarity_search) == 7
+    response = await similarity_search.find_similar_adventures(1, k=10)
+    ids = [a.id for a in response.similar_adventures]
+    assert ids[0] == new_id
+    assert 3 not in ids
+
+@pytest.mark.asyncio
+async def test_compaction_triggered_by_delta_size():
+    """Tester que la compaction démarre d'elle-même quand le delta est plein"""
+    similarity_search = SimilaritySearch()
+    adventure = Adventure(**load_catalog()[0].model_dump(exclude={"id"}))
+    
+    with patch.object(settings, "SIMILARITY_DELTA_MAX_SIZE", 3):
+        for i in range(3):
+            similarity_search.add_adventure(adventure, adventure_id=100 if i == 0 else None)
+    
+    # Les recherches restent servies pendant la compaction
+    await similarity_search.find_similar_adventures(100)
+    await similarity_search._compaction_task
+    
+    assert len(similarity_search._main.ids) == 10
+    assert len(similarity_search._delta) == 0
+
+def test_geo_grid_index_matches_brute_force():
+    """Tester que la grille retourne exactement les points du rayon"""
+    rng = np.random.default_rng(0)
+    latitudes = rng.uniform(42, 51, 5000).astype(np.float32)
+    longitudes = rng.uniform(-5, 8, 5000).astype(np.float32)
+    grid = GeoGridIndex(latitudes, longitudes)
+    
+    rows, distances = grid.query_radius(45.76, 4.84, 80)
+    
+    expected = np.flatnonzero(haversine_km(45.76, 4.84, latitudes, longitudes) <= 80)
+    assert sorted(rows.tolist()) == expected.tolist()
+    assert np.all(distances <= 80)
+
+@pytest.mark.asyncio
+async def test_find_similar_adventures_near():
+    """Tester le filtrage par rayon et le score mélangé similarité/proximité"""
+    similarity_search = SimilaritySearch()
+    # Aventure ajoutée au delta, près de Saint-Émilion
+    adventure = Adventure(**load_catalog()[2].model_dump(exclude={"id"}))
+    adventure.latitude, adventure.longitude = 44.90, -0.16
+    new_id = similarity_search.add_adventure(adventure)
+    
+    response = await similarity_search.find_similar_adventures(1, k=10, radius_km=30)
+    
+    results = {a.id: a for a in response.similar_adventures}
+    # Pomerol, Fronsac et la nouvelle aventure ; pas Biarritz ni la Dordogne
+    assert set(results) == {3, 7, new_id}
+    assert all(a.distance_km <= 30 for a in response.similar_adventures)
+    # La plus proche géographiquement passe devant Pomerol, dont le texte est identique
+    assert results[new_id].similarity_score > results[3].similarity_score
+    
+    # Un centre explicite loin de toute aventure ne retourne rien
+    response = await similarity_search.find_similar_adventures(1, near=(45.76, 4.84), radius_km=50)
+    assert response.similar_adventures == []
+
+@pytest.mark.asyncio
+async def test_find_similar_adventures_filters():
+    """Tester que les filtres sont appliqués avant le classement, y compris sur le delta"""
+    similarity_search = SimilaritySearch()
+    adventure = Adventure(**load_catalog()[0].model_dump(exclude={"id"}))
+    adventure.duration = 60
+    new_id = similarity_search.add_adventure(adventure)
+    
+    filters = SearchFilters(difficulty=("Facile",), max_duration=120)
+    response = await similarity_search.find_similar_adventures(1, k=1, filters=filters)
+    
+    # Le meilleur résultat satisfaisant les filtres, pas le meilleur résultat filtré ensuite
+    assert [a.id for a in response.similar_adventures] == [new_id]
+    
+    filters = SearchFilters(tags=("vin", "patrimoine"), min_distance=1)
+    response = await similarity_search.find_similar_adventures(1, k=10, filters=filters)
+    catalog = {a.id: a for a in load_catalog()}
+    for similar in response.similar_adventures:
+        source = catalog.get(similar.id, adventure)
+        assert {"vin", "patrimoine"} <= {tag.lower() for tag in source.tags}
+        assert source.distance >= 1
+
+@pytest.mark.asyncio
+async def test_facet_index_survives_compaction_and_store(tmp_path):
+    """Tester que les listes de lignes restent justes après compaction et relecture sur disque"""
+    catalog = load_catalog()
+    write_embedding_store(tmp_path / "index", catalog, HashingEmbedder(dim=settings.SIMILARITY_EMBEDDING_DIM))
+    mapped = SimilaritySearch(store_path=str(tmp_path / "index"))
+    compacted = SimilaritySearch(catalog=catalog)
+    compacted.remove_adventure(2)
+    compacted.add_adventure(catalog[3].model_copy(update={"id": 10}))
+    await compacted.compact()
+    
+    filters = SearchFilters(difficulty=("moyen",))
+    assert set(mapped._main.ids[mapped._main.facet_index.mask(filters)].tolist()) == {2, 4, 6}
+    assert set(compacted._main.ids[compacted._main.facet_index.mask(filters)].tolist()) == {4, 6, 10}
+
+def test_flat_index_search_many_matches_search():
+    """Tester que la recherche multi-requêtes par blocs équivaut aux recherches unitaires"""
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(1000, 16)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = FlatIndex(vectors)
+    allowed = rng.random(1000) > 0.3
+    
+    with patch("app.services.vector_index.BLOCK_SIZE", 128):
+        rows, scores = index.search_many(vectors[:5], 10, excludes=[0, None, 2, None, 4], allowed=allowed)
+    
+    for i in range(5):
+        expected_rows, expected_scores = index.search(vectors[i], 10, exclude=i if i % 2 == 0 else None, allowed=allowed)
+        assert rows[i].tolist() == expected_rows.tolist()
+        assert scores[i] == pytest.approx(expected_scores, abs=1e-6)
+
+@pytest.mark.asyncio
+async def test_neighbor_table_matches_search(tmp_path):
+    """Tester que la table des voisins donne les mêmes résultats que le calcul, et se persiste"""
+    similarity_search = SimilaritySearch()
+    expected = await similarity_search.find_similar_adventures(2, k=3)
+    
+    await similarity_search.build_neighbor_table(k=4)
+    with patch.object(similarity_search._main, "search", side_effect=AssertionError("search appelé")):
+        response = await similarity_search.find_similar_adventures(2, k=3)
+    assert [a.id for a in response.similar_adventures] == [a.id for a in expected.similar_adventures]
+    assert [a.similarity_score for a in response.similar_adventures] == pytest.approx(
+        [a.similarity_score for a in expected.similar_adventures]
+    )
+    
+    # Un voisin supprimé invalide la lecture de la table : retour au calcul
+    similarity_search.remove_adventure(expected.similar_adventures[0].id)
+    response = await similarity_search.find_similar_adventures(2, k=3)
+    assert expected.similar_adventures[0].id not in [a.id for a in response.similar_adventures]
+    
+    write_embedding_store(tmp_path / "index", load_catalog(), HashingEmbedder(dim=settings.SIMILARITY_EMBEDDING_DIM), neighbors_k=4)
+    mapped = SimilaritySearch(store_path=str(tmp_path / "index"))
+    assert mapped._main.neighbors.k == 4
+    assert [a.id for a in (await mapped.find_similar_adventures(2, k=3)).similar_adventures] == [a.id for a in expected.similar_adventures]
+
+@pytest.mark.asyncio
+async def test_response_cache_invalidated_on_catalog_change():
+    """Tester le cache des réponses sérialisées et son invalidation"""
+    similarity_search = SimilaritySearch()
+    
+    first = await similarity_search.find_similar_adventures_json(1, k=2)
+    assert await similarity_search.find_similar_adventures_json(1, k=2) is first
+    assert similarity_search.cache_stats()["hits"] == 1
+    
+    similarity_search.add_adventure(Adventure(**load_catalog()[0].model_dump(exclude={"id"})))
+    assert await similarity_search.find_similar_adventures_json(1, k=2) != first
+    
+    # Une aventure qui ne peut pas entrer dans les résultats ne vide pas le cache
+    second = await similarity_search.find_similar_adventures_json(1, k=2)
+    filtered = await similarity_search.find_similar_adventures_json(1, k=2, filters=SearchFilters(tags=("vin",)))
+    similarity_search.add_adventure(Adventure(**load_catalog()[4].model_dump(exclude={"id"})), adventure_id=100)
+    assert await similarity_search.find_similar_adventures_json(1, k=2) is second
+    assert await similarity_search.find_similar_adventures_json(1, k=2, filters=SearchFilters(tags=("vin",))) is filtered
+    
+    # Retirer une aventure absente des résultats non plus ; retirer un résultat, si
+    similarity_search.remove_adventure(100)
+    assert await similarity_search.find_similar_adventures_json(1, k=2) is second
+    result_id = orjson.loads(second)["similar_adventures"][0]["id"]
+    similarity_search.remove_adventure(result_id)
+    assert result_id not in [a["id"] for a in orjson.loads(await similarity_search.find_similar_adventures_json(1, k=2))["similar_adventures"]]
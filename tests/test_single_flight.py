@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from app.core.exceptions import ServiceOverloadedError, OpenAIError
+from app.services.single_flight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_call():
+    """Tester que les appels concurrents sur la même clé partagent un seul appel"""
+    single_flight = SingleFlight(max_waiters=10)
+    calls = 0
+    
+    async def generate():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "aventure"
+    
+    results = await asyncio.gather(*[single_flight.run("rando bordeaux", generate) for _ in range(5)])
+    
+    assert results == ["aventure"] * 5
+    assert calls == 1
+    assert single_flight.in_flight() == 0
+
+@pytest.mark.asyncio
+async def test_single_flight_fans_out_errors():
+    """Tester que l'erreur de l'appel est propagée à tous les appelants"""
+    single_flight = SingleFlight(max_waiters=10)
+    
+    async def generate():
+        await asyncio.sleep(0.01)
+        raise OpenAIError("OpenAI indisponible")
+    
+    results = await asyncio.gather(
+        *[single_flight.run("rando bordeaux", generate) for _ in range(3)],
+        return_exceptions=True
+    )
+    
+    assert all(isinstance(result, OpenAIError) for result in results)
+
+@pytest.mark.asyncio
+async def test_single_flight_bounds_waiters():
+    """Tester le rejet des appelants au-delà du nombre maximal d'attentes"""
+    single_flight = SingleFlight(max_waiters=2)
+    release = asyncio.Event()
+    
+    async def generate():
+        await release.wait()
+        return "aventure"
+    
+    waiters = [asyncio.ensure_future(single_flight.run("rando bordeaux", generate)) for _ in range(2)]
+    await asyncio.sleep(0)
+    
+    with pytest.raises(ServiceOverloadedError) as exc_info:
+        await single_flight.run("rando bordeaux", generate)
+    assert exc_info.value.headers["Retry-After"] == "1"
+    
+    # L'annulation d'un appelant n'interrompt pas l'appel partagé
+    waiters[0].cancel()
+    release.set()
+    assert await waiters[1] == "aventure"
@@ -0,0 +1,29 @@
+import time
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from main import app
+from scripts.benchmark_startup import measure_import
+
+def test_import_does_not_load_llm_stack():
+    """Tester que l'import de l'application ne charge ni LangChain, ni openai, ni tiktoken"""
+    report = measure_import("main")
+    assert report["heavy_modules"] == []
+    assert report["total_us"] > 0
+
+def test_ready_flips_after_warm_up():
+    """Tester que /ready répond 503 pendant le chargement du générateur, puis 200"""
+    with patch.object(settings, "OPENAI_API_KEY", "sk-test"), TestClient(app) as lifespan_client:
+        assert lifespan_client.get("/health").status_code == 200
+        
+        deadline = time.monotonic() + 30
+        response = lifespan_client.get("/ready")
+        while response.status_code != 200 and time.monotonic() < deadline:
+            assert response.status_code == 503
+            assert response.json()["services"]["adventure_generator"] == "warming_up"
+            time.sleep(0.05)
+            response = lifespan_client.get("/ready")
+        
+        assert response.status_code == 200
+        assert response.json()["services"] == {"similarity_search": "ready", "adventure_generator": "ready"}
+        assert app.state.adventure_generator is not None
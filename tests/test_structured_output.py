@@ -0,0 +1,45 @@
+import pytest
+from app.services.structured_output import parse_adventure
+
+def test_parse_adventure_repairs_common_format_errors():
+    """Tester la réparation locale d'une réponse entourée de texte et mal typée"""
+    text = """Voici une aventure pour toi :
+```json
+{
+    "title": "Randonnée dans les vignobles de Saint-Émilion",
+    "description": "Une belle balade à travers les vignobles.",
+    "location": "Saint-Émilion, Bordeaux",
+    "tags": "randonnée, vignoble",
+    "difficulty": "Easy",
+    "duration": "2h30",
+    "distance": "8,5 km",
+    "latitude": "44.8946",
+    "longitude": -12.5,
+}
+```
+Bonne balade !"""
+    
+    adventure = parse_adventure(text)
+    
+    assert adventure.tags == ["randonnée", "vignoble"]
+    assert adventure.difficulty == "facile"
+    assert adventure.duration == 150
+    assert adventure.distance == 8.5
+    assert adventure.latitude == 44.8946
+    # Coordonnée ramenée dans l'emprise de la France
+    assert adventure.longitude == -5.2
+
+def test_parse_adventure_rejects_unrepairable_response():
+    """Tester qu'une réponse sans objet JSON reste une erreur"""
+    with pytest.raises(ValueError):
+        parse_adventure("Désolé, je ne peux pas répondre.")
+
+def test_parse_adventure_clamps_valid_response():
+    """Tester que les coordonnées d'une réponse directement valide sont aussi ramenées en France"""
+    adventure = parse_adventure(
+        '{"title": "Kayak", "description": "Descente en kayak.", "location": "Dordogne", "tags": ["kayak"], '
+        '"difficulty": "facile", "duration": 180, "distance": 12.0, "latitude": 60.0, "longitude": 1.2}'
+    )
+    
+    assert adventure.latitude == 51.1
+    assert adventure.longitude == 1.2
@@ -0,0 +1,29 @@
+import sys
+from unittest.mock import MagicMock, patch
+
+from app.services import token_counter
+from app.services.token_counter import count_tokens, estimate_tokens
+
+def test_encoding_failure_is_retried_after_backoff():
+    """Tester qu'un échec de chargement de l'encodage n'est pas mis en cache indéfiniment"""
+    model = "modele-de-test"
+    broken = MagicMock()
+    broken.encoding_for_model.side_effect = OSError("pas de réseau")
+    working = MagicMock()
+    working.encoding_for_model.return_value.encode.return_value = [1, 2, 3]
+    
+    with patch.dict(sys.modules, {"tiktoken": broken}), patch.object(token_counter.time, "monotonic", return_value=1000.0):
+        assert count_tokens("bonjour le monde", model) == estimate_tokens("bonjour le monde")
+    
+    # Pendant le délai d'attente, pas de nouvelle tentative
+    with patch.dict(sys.modules, {"tiktoken": working}), patch.object(token_counter.time, "monotonic", return_value=1010.0):
+        assert count_tokens("bonjour le monde", model) == estimate_tokens("bonjour le monde")
+    working.encoding_for_model.assert_not_called()
+    
+    # Après le délai, l'encodage est rechargé puis gardé en cache
+    retry_at = 1000.0 + token_counter.ENCODING_RETRY_SECONDS
+    with patch.dict(sys.modules, {"tiktoken": working}), patch.object(token_counter.time, "monotonic", return_value=retry_at):
+        assert count_tokens("bonjour le monde", model) == 3
+        assert count_tokens("bonjour", model) == 3
+    working.encoding_for_model.assert_called_once_with(model)
+    token_counter._encodings.pop(model, None)